@@ -0,0 +1,357 @@
+"""Walk-forward backtest of the ensemble score.
+
+Replays rebalance dates across a universe of tickers. At each date every model
+is refit on data up to that date only (incrementally: sequence models are
+fine-tuned from their previous weights, XGBoost grows extra trees on the new
+rows, GARCH starts from the last fit), the score is computed exactly as
+analyze_stock does, and the realized outcome over the horizon is recorded.
+P&L, hit rate and rank IC are then computed in one pass over the
+(dates x tickers) panels, and each model's forecast error and mean fit
+time are reported.
+
+'Trend' is the closed-form trend/seasonality engine (fintrix_trend.py). Run
+it next to Prophet to compare the two; the report then gets a
+seasonal_comparison section. Trend stands in for Prophet in the score only
+when Prophet itself isn't run.
+
+Usage:
+    python fintrix_backtest.py --tickers RELIANCE.NS TCS.NS INFY.NS
+    python fintrix_backtest.py --universe 200 --period 5y --workers 8
+    python fintrix_backtest.py --universe 50 --models Prophet Trend
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import torch
+import xgboost as xgb
+from arch import arch_model
+from numpy.lib.stride_tricks import sliding_window_view
+from prophet import Prophet
+from sklearn.metrics import mean_squared_error
+
+from fintrix_investment import (
+    DataCollector, DataPreprocessor, LSTMModel, TransformerModel,
+    PRICE_MODELS, TABULAR_FEATURES, compute_score, config, fit_sequence_model, horizon_checkpoints
+)
+from fintrix_batch import to_yahoo_symbol
+from fintrix_panel import DTYPE
+import fintrix_trend
+
+MODELS = ('LSTM', 'Transformer', 'XGBoost', 'Prophet', 'Trend', 'GARCH')
+PATH_MODELS = PRICE_MODELS + ('Trend',)  # scored on price error
+DEFAULT_MODELS = ('LSTM', 'XGBoost', 'GARCH')  # Prophet/Transformer are opt-in: they dominate runtime
+MIN_HISTORY = 252  # bars before the first rebalance date
+REFIT_EPOCHS = 5
+XGB_REFIT_TREES = 10
+BUY_THRESHOLD = 60  # "Buy" or better
+
+class TickerWalk:
+    """Model state for one ticker, refit incrementally as the walk moves forward"""
+
+    def __init__(self, df, days, models, lookback):
+        self.df = df
+        self.close = df['close'].values.astype(np.float64)
+        self.close32 = df['close'].to_numpy(DTYPE)  # sequence model inputs, fed to torch as is
+        self.days = days
+        self.models = models
+        self.lookback = lookback
+        self.steps = np.array(horizon_checkpoints(days))
+
+        # Cached once per ticker and sliced by position at every rebalance date
+        self.windows = sliding_window_view(self.close32, lookback)
+        self.features = DataPreprocessor().tabular_features(df, lookback=lookback)
+        self.feature_pos = df.index.get_indexer(self.features.index)
+        self.X_tab = self.features[TABULAR_FEATURES].values
+        self.y_tab = self.features['target'].values
+
+        self.seq_models = {}
+        self.xgb_model = None
+        self.xgb_rows = 0
+        self.garch_params = None
+
+    def _fit_sequence(self, name, p):
+        """Fine-tune (or first train) a direct multi-horizon model on data up to bar p"""
+        last_i = p - self.steps[-1] + 1  # last window whose furthest target is known
+        if last_i <= self.lookback:
+            return None
+        lo, hi = self.close32[:p + 1].min(), self.close32[:p + 1].max()
+        scale = (hi - lo) or 1.0
+        i = np.arange(self.lookback, last_i + 1)
+        X = (self.windows[i - self.lookback] - lo) / scale
+        y = (self.close32[(i - 1)[:, None] + self.steps[None, :]] - lo) / scale
+
+        X = X[..., None]
+        model = self.seq_models.get(name)
+        if model is None:
+            # First fit: the serving routine, early-stopped on the latest windows
+            cls = LSTMModel if name == 'LSTM' else TransformerModel
+            model = cls(output_size=len(self.steps))
+            split = int(len(X) * (1 - config.TEST_SIZE))
+            fit_sequence_model(model, X[:split], y[:split], X[split:], y[split:])
+        else:
+            fit_sequence_model(model, X, y, max_epochs=REFIT_EPOCHS)
+        self.seq_models[name] = model
+
+        latest = (self.windows[p - self.lookback + 1] - lo) / scale
+        with torch.no_grad():
+            out = model(torch.from_numpy(latest).view(1, -1, 1)).numpy().reshape(-1)
+        return float(out[-1] * scale + lo)
+
+    def _fit_xgboost(self, p):
+        """Grow the booster on rows whose next-day label is known at bar p"""
+        rows = int(np.searchsorted(self.feature_pos, p))  # feature rows strictly before p
+        if rows < self.lookback:
+            return None
+        X, y = self.X_tab, self.y_tab
+        if self.xgb_model is None:
+            self.xgb_model = xgb.XGBClassifier(
+                objective='binary:logistic', n_estimators=100, max_depth=3,
+                learning_rate=0.1, random_state=config.RANDOM_STATE, n_jobs=1
+            )
+            self.xgb_model.fit(X[:rows], y[:rows])
+            self.xgb_rows = rows
+        elif rows > self.xgb_rows and len(np.unique(y[self.xgb_rows:rows])) == 2:
+            model = xgb.XGBClassifier(
+                objective='binary:logistic', n_estimators=XGB_REFIT_TREES, max_depth=3,
+                learning_rate=0.1, random_state=config.RANDOM_STATE, n_jobs=1
+            )
+            model.fit(X[self.xgb_rows:rows], y[self.xgb_rows:rows], xgb_model=self.xgb_model.get_booster())
+            self.xgb_model = model
+            self.xgb_rows = rows
+        if rows >= len(self.feature_pos) or self.feature_pos[rows] != p:
+            return None
+        return float(self.xgb_model.predict_proba(X[rows:rows + 1])[0][1])
+
+    def _fit_garch(self, p):
+        returns = pd.Series(self.close[:p + 1]).pct_change().dropna() * 100
+        model = arch_model(returns.values, vol='Garch', p=1, q=1)
+        fitted = model.fit(disp='off', starting_values=self.garch_params)
+        self.garch_params = fitted.params.values
+        return np.sqrt(fitted.forecast(horizon=self.days).variance.values[-1, :])
+
+    def _fit_prophet(self, p):
+        prophet_df = pd.DataFrame({'ds': self.df.index[:p + 1].tz_localize(None), 'y': self.close[:p + 1]})
+        model = Prophet(yearly_seasonality=True, weekly_seasonality=True,
+                        daily_seasonality=False, changepoint_prior_scale=0.05)
+        model.fit(prophet_df)
+        target_date = self.df.index[p + self.days].tz_localize(None)
+        return float(model.predict(pd.DataFrame({'ds': [target_date]}))['yhat'].iloc[0])
+
+    def _fit_trend(self, p):
+        model = fintrix_trend.fit(self.df.index[:p + 1], self.close[:p + 1], changepoint_prior_scale=0.05)
+        return float(model.predict(self.df.index[p + self.days:p + self.days + 1])[0, 0])
+
+    def step(self, p, horizon):
+        """Refit on bars [0, p], score at p and return the realized outcome"""
+        predictions, row = {}, {}
+        for name in self.models:
+            started = time.perf_counter()
+            try:
+                if name in ('LSTM', 'Transformer'):
+                    value = self._fit_sequence(name, p)
+                elif name == 'Prophet':
+                    value = self._fit_prophet(p)
+                elif name == 'Trend':
+                    value = self._fit_trend(p)
+                elif name == 'XGBoost':
+                    value = self._fit_xgboost(p)
+                else:
+                    value = self._fit_garch(p)
+            except Exception as e:
+                print(f"{name} failed at bar {p}: {e}")
+                value = None
+            if value is None:
+                continue
+            row[f"{name}_ms"] = (time.perf_counter() - started) * 1000
+            if name == 'Trend':
+                if 'Prophet' not in self.models:
+                    predictions['Prophet'] = np.array([value])
+                row[name] = value
+            elif name in PRICE_MODELS:
+                predictions[name] = np.array([value])
+                row[name] = value
+            elif name == 'XGBoost':
+                predictions[name] = row[name] = value
+            else:
+                predictions[name] = value
+                row[name] = float(np.mean(value))
+
+        price = self.close[p]
+        row['score'] = compute_score(predictions, price, horizon)[0] if predictions else np.nan
+        row['price'] = price
+        row['realized_price'] = self.close[p + self.days]
+        row['realized_up'] = float(self.close[p + 1] > price)
+        daily = np.diff(self.close[p:p + self.days + 1]) / self.close[p:p + self.days] * 100
+        row['realized_vol'] = float(np.std(daily))
+        return row
+
+def walk_ticker(ticker, df, rebalance_dates, horizon, models, lookback):
+    """Run the walk for one ticker; returns {field: array aligned to rebalance_dates}"""
+    days = config.SHORT_TERM_DAYS if horizon == 'short' else config.LONG_TERM_DAYS
+    df = df.dropna()
+    fields = (('score', 'price', 'realized_price', 'realized_up', 'realized_vol') + tuple(models)
+              + tuple(f"{name}_ms" for name in models))
+    out = {field: np.full(len(rebalance_dates), np.nan) for field in fields}
+    if len(df) < MIN_HISTORY + days:
+        return ticker, out
+
+    walk = TickerWalk(df, days, models, lookback)
+    positions = df.index.searchsorted(rebalance_dates, side='right') - 1
+    for k, p in enumerate(positions):
+        if p < MIN_HISTORY or p + days >= len(df):
+            continue
+        for field, value in walk.step(p, horizon).items():
+            out[field][k] = value
+    return ticker, out
+
+def _init_worker():
+    torch.set_num_threads(1)  # one process per core already
+
+def summarize(panels, models, step):
+    """Vectorized P&L, hit rate, rank IC and per-model error over (dates x tickers) panels"""
+    score = panels['score']
+    fwd = panels['realized_price'] / panels['price'] - 1
+    valid = ~np.isnan(score) & ~np.isnan(fwd)
+
+    # Hit rate: score above/below neutral vs realized direction
+    hits = (np.sign(score - 50) == np.sign(fwd)) & valid
+    hit_rate = hits.sum() / max(valid.sum(), 1)
+
+    # Equal-weight long book of Buy-or-better signals; cash when there are none
+    signal = (score >= BUY_THRESHOLD) & valid
+    n_long = signal.sum(axis=1)
+    long_ret = np.where(n_long > 0, np.where(signal, fwd, 0).sum(axis=1) / np.maximum(n_long, 1), 0.0)
+    universe_ret = np.nanmean(np.where(valid, fwd, np.nan), axis=1)
+    universe_ret = np.nan_to_num(universe_ret)
+
+    # Rank IC per date (Spearman between score and forward return)
+    masked_score = pd.DataFrame(np.where(valid, score, np.nan)).rank(axis=1).values
+    masked_fwd = pd.DataFrame(np.where(valid, fwd, np.nan)).rank(axis=1).values
+    xs = masked_score - np.nanmean(masked_score, axis=1, keepdims=True)
+    ys = masked_fwd - np.nanmean(masked_fwd, axis=1, keepdims=True)
+    denom = np.sqrt(np.nansum(xs ** 2, axis=1) * np.nansum(ys ** 2, axis=1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ic = np.nansum(xs * ys, axis=1) / denom
+    ic = ic[np.isfinite(ic)]
+
+    periods_per_year = 252 / step
+    std = long_ret.std()
+    report = {
+        'dates': int(score.shape[0]),
+        'tickers': int(score.shape[1]),
+        'observations': int(valid.sum()),
+        'hit_rate': float(hit_rate),
+        'mean_period_return': float(long_ret.mean()),
+        'cumulative_return': float(np.prod(1 + long_ret) - 1),
+        'universe_cumulative_return': float(np.prod(1 + universe_ret) - 1),
+        'sharpe': float(long_ret.mean() / std * np.sqrt(periods_per_year)) if std > 0 else None,
+        'rank_ic_mean': float(ic.mean()) if len(ic) else None,
+        'models': {}
+    }
+
+    for name in models:
+        pred = panels[name]
+        if name in PATH_MODELS:
+            ok = valid & ~np.isnan(pred)
+            pred_ret = pred[ok] / panels['price'][ok] - 1
+            real_ret = fwd[ok]
+            metrics = {
+                'return_rmse': float(np.sqrt(mean_squared_error(real_ret, pred_ret))) if ok.any() else None,
+                'mape': float(np.mean(np.abs(pred[ok] / panels['realized_price'][ok] - 1))) if ok.any() else None,
+                'directional_accuracy': float(np.mean(np.sign(pred_ret) == np.sign(real_ret))) if ok.any() else None,
+            }
+        elif name == 'XGBoost':
+            ok = ~np.isnan(pred) & ~np.isnan(panels['realized_up'])
+            up = panels['realized_up'][ok]
+            metrics = {
+                'brier': float(mean_squared_error(up, pred[ok])) if ok.any() else None,
+                'accuracy': float(np.mean((pred[ok] > 0.5) == (up > 0.5))) if ok.any() else None,
+            }
+        else:
+            ok = ~np.isnan(pred) & ~np.isnan(panels['realized_vol'])
+            metrics = {
+                'vol_rmse': float(np.sqrt(mean_squared_error(panels['realized_vol'][ok], pred[ok]))) if ok.any() else None,
+            }
+        metrics['n'] = int(ok.sum())
+        fit_ms = panels[f"{name}_ms"]
+        metrics['fit_ms'] = float(np.nanmean(fit_ms)) if np.isfinite(fit_ms).any() else None
+        report['models'][name] = metrics
+
+    if 'Prophet' in models and 'Trend' in models:
+        prophet, trend = report['models']['Prophet'], report['models']['Trend']
+        report['seasonal_comparison'] = {
+            metric: {'Prophet': prophet.get(metric), 'Trend': trend.get(metric)}
+            for metric in ('mape', 'return_rmse', 'directional_accuracy', 'fit_ms')
+        }
+        if prophet.get('fit_ms') and trend.get('fit_ms'):
+            report['seasonal_comparison']['speedup'] = prophet['fit_ms'] / trend['fit_ms']
+    return report
+
+def run_backtest(frames, horizon='short', models=DEFAULT_MODELS, step=None,
+                 lookback=None, workers=None):
+    """Walk-forward backtest over {ticker: OHLCV DataFrame}"""
+    days = config.SHORT_TERM_DAYS if horizon == 'short' else config.LONG_TERM_DAYS
+    step = step or days  # non-overlapping holding periods
+    lookback = lookback or config.LOOKBACK_WINDOW
+    tickers = list(frames)
+
+    calendar = pd.DataFrame({t: frames[t]['close'] for t in tickers}).index
+    rebalance_dates = calendar[MIN_HISTORY:len(calendar) - days:step]
+    if len(rebalance_dates) == 0:
+        raise ValueError("Not enough history for a single rebalance date")
+
+    start = time.time()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(walk_ticker, t, frames[t], rebalance_dates, horizon, tuple(models), lookback)
+            for t in tickers
+        ]
+        for future in futures:
+            ticker, out = future.result()
+            results[ticker] = out
+            print(f"{ticker}: done ({len(results)}/{len(tickers)})")
+
+    fields = results[tickers[0]].keys()
+    panels = {f: np.column_stack([results[t][f] for t in tickers]) for f in fields}
+    report = summarize(panels, models, step)
+    report.update({
+        'horizon': horizon,
+        'step': step,
+        'start': str(rebalance_dates[0].date()),
+        'end': str(rebalance_dates[-1].date()),
+        'runtime_s': round(time.time() - start, 1)
+    })
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the ensemble score")
+    parser.add_argument('--tickers', nargs='+', default=None)
+    parser.add_argument('--universe', type=int, default=None, help="Use the first N NSE symbols")
+    parser.add_argument('--period', default='5y')
+    parser.add_argument('--horizon', choices=('short', 'long'), default='short')
+    parser.add_argument('--models', nargs='+', choices=MODELS, default=list(DEFAULT_MODELS))
+    parser.add_argument('--step', type=int, default=None, help="Bars between rebalance dates")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=config.BACKTEST_REPORT_PATH)
+    args = parser.parse_args()
+
+    collector = DataCollector()
+    tickers = args.tickers or [to_yahoo_symbol(t) for t in collector.nse_tickers]
+    if args.universe:
+        tickers = tickers[:args.universe]
+    frames = collector.get_bulk_stock_data(tickers, period=args.period)
+
+    report = run_backtest(frames, args.horizon, args.models, args.step, workers=args.workers)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""End-of-day batch scoring for the NSE universe.
+
+Runs StockAnalyzer.score_stock for every symbol in DataCollector.nse_tickers
+for both horizons and stores the results in the stock_scores table, so the
+Flask API can answer /api/finance/analyze without re-training every model.
+Every score is also appended to the score history (fintrix_history.py).
+
+Usage:
+    python fintrix_batch.py                  # resume today's run
+    python fintrix_batch.py --restart        # start today's run from scratch
+    python fintrix_batch.py --horizons short --limit 50
+    python fintrix_batch.py --processes 8    # fan out over a shared price panel
+    python fintrix_batch.py --engine trend   # closed-form seasonal model instead of Prophet
+"""
+import os
+import argparse
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import fintrix_investment
+import fintrix_trend
+from fintrix_investment import DataCollector, SEASONAL_ENGINES, StockAnalyzer, config
+from fintrix_calendar import previous_session_close
+from fintrix_history import ScoreHistory
+from fintrix_panel import PricePanel
+from fintrix_resources import ResourceGovernor
+
+HORIZONS = ('short', 'long')
+
+def to_yahoo_symbol(symbol):
+    """NSE master lists bare symbols (RELIANCE); Yahoo wants RELIANCE.NS"""
+    symbol = symbol.strip().upper()
+    if '.' not in symbol:
+        symbol += '.NS'
+    return symbol
+
+class ScoreStore:
+    """Latest score per (ticker, horizon), backed by SQLite"""
+
+    def __init__(self, db_path=None, request_flush_s=30):
+        self.db_path = db_path or config.DB_PATH
+        self.request_flush_s = request_flush_s
+        self._requests = Counter()  # (day, ticker) -> analyze requests not yet written
+        self._requests_lock = threading.Lock()
+        self._requests_pid = None  # process whose flusher thread is running
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS stock_scores (
+                    ticker TEXT NOT NULL,
+                    horizon TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    recommendation TEXT NOT NULL,
+                    current_price REAL,
+                    expected_return REAL,
+                    volatility REAL,
+                    as_of TEXT,
+                    computed_at TEXT NOT NULL,
+                    PRIMARY KEY (ticker, horizon)
+                );
+                CREATE INDEX IF NOT EXISTS ix_stock_scores_horizon_score
+                    ON stock_scores (horizon, score DESC);
+                CREATE TABLE IF NOT EXISTS batch_checkpoints (
+                    run_date TEXT NOT NULL,
+                    horizon TEXT NOT NULL,
+                    ticker TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    PRIMARY KEY (run_date, horizon, ticker)
+                );
+                CREATE TABLE IF NOT EXISTS analyze_requests (
+                    day TEXT NOT NULL,
+                    ticker TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (day, ticker)
+                );
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection, commit on success and always close it"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _upsert(self, conn, result):
+        conn.execute("""
+            INSERT OR REPLACE INTO stock_scores
+                (ticker, horizon, score, recommendation, current_price,
+                 expected_return, volatility, as_of, computed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            result['ticker'], result['horizon'], result['score'], result['recommendation'],
+            result['current_price'], result['expected_return'], result['volatility'],
+            result['as_of'], datetime.now().isoformat(timespec='seconds')
+        ))
+
+    def save(self, result):
+        """Store a score_stock() result"""
+        with self._connect() as conn:
+            self._upsert(conn, result)
+
+    def _fresh_after(self, max_age_hours=None):
+        """computed_at cutoff (local time, ISO format) below which scores are stale"""
+        if max_age_hours is None:
+            max_age_hours = config.SCORE_MAX_AGE_HOURS
+        oldest = datetime.now() - timedelta(hours=max_age_hours)
+        last_close = previous_session_close().astimezone().replace(tzinfo=None)
+        return max(oldest, last_close).isoformat(timespec='seconds')
+
+    def get(self, ticker, horizon, max_age_hours=None):
+        """Return the stored result, or None if unknown or stale.
+        
+        A score is stale once a session has closed after it was computed, or
+        when it is older than max_age_hours (Config.SCORE_MAX_AGE_HOURS).
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM stock_scores WHERE ticker = ? AND horizon = ? AND computed_at >= ?",
+                (ticker, horizon, self._fresh_after(max_age_hours))
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def scored(self, horizon, limit=None, max_age_hours=None):
+        """Fresh scores for a horizon, best first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM stock_scores WHERE horizon = ? AND computed_at >= ? ORDER BY score DESC LIMIT ?",
+                (horizon, self._fresh_after(max_age_hours), -1 if limit is None else limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_request(self, ticker):
+        """Count an analyze request, for the warm-up hot list.
+        
+        Only an in-memory increment; a background thread writes the counts
+        every request_flush_s seconds, so the request path never waits on SQLite.
+        """
+        with self._requests_lock:
+            if self._requests_pid != os.getpid():
+                # First count in this process (or after a fork): start our own flusher
+                self._requests_pid = os.getpid()
+                self._requests.clear()
+                threading.Thread(target=self._flush_requests_loop, name='request-counts', daemon=True).start()
+            self._requests[(datetime.now().strftime('%Y-%m-%d'), ticker)] += 1
+
+    def _flush_requests_loop(self):
+        while True:
+            time.sleep(self.request_flush_s)
+            self.flush_requests()
+
+    def flush_requests(self):
+        """Write the buffered request counts in one transaction"""
+        with self._requests_lock:
+            counts, self._requests = self._requests, Counter()
+        if not counts:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany("""
+                    INSERT INTO analyze_requests (day, ticker, count) VALUES (?, ?, ?)
+                    ON CONFLICT (day, ticker) DO UPDATE SET count = count + excluded.count
+                """, [(day, ticker, count) for (day, ticker), count in counts.items()])
+        except sqlite3.Error as e:
+            print(f"Could not write request counts: {e}")
+            with self._requests_lock:
+                self._requests.update(counts)  # retried on the next flush
+
+    def most_requested(self, limit, days=14):
+        """Tickers with the most analyze requests over the last ``days`` days"""
+        self.flush_requests()
+        since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ticker FROM analyze_requests WHERE day >= ? GROUP BY ticker "
+                "ORDER BY SUM(count) DESC LIMIT ?",
+                (since, limit)
+            ).fetchall()
+        return [row['ticker'] for row in rows]
+
+    def completed(self, run_date, horizon):
+        """Tickers already processed in the given run; failed ones are retried"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ticker FROM batch_checkpoints WHERE run_date = ? AND horizon = ? "
+                "AND status IN ('done', 'no_data')",
+                (run_date, horizon)
+            ).fetchall()
+        return {row['ticker'] for row in rows}
+
+    def record(self, run_date, result=None, ticker=None, horizon=None, status='done'):
+        """Save a result and its checkpoint in one transaction"""
+        ticker = ticker or result['ticker']
+        horizon = horizon or result['horizon']
+        with self._connect() as conn:
+            if result is not None:
+                self._upsert(conn, result)
+            conn.execute(
+                "INSERT OR REPLACE INTO batch_checkpoints (run_date, horizon, ticker, status) VALUES (?, ?, ?, ?)",
+                (run_date, horizon, ticker, status)
+            )
+
+    def reset_run(self, run_date):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM batch_checkpoints WHERE run_date = ?", (run_date,))
+
+def run_batch(analyzer, store, tickers, horizons=HORIZONS, run_date=None, history=None):
+    """Score every ticker for every horizon, skipping work already checkpointed"""
+    run_date = run_date or datetime.now().strftime('%Y-%m-%d')
+    summary = {'scored': 0, 'failed': 0, 'skipped': 0}
+
+    for horizon in horizons:
+        done = store.completed(run_date, horizon)
+        pending = [t for t in tickers if t not in done]
+        summary['skipped'] += len(tickers) - len(pending)
+        print(f"[{horizon}] {len(pending)} tickers to score ({len(done)} already done)")
+
+        for i, ticker in enumerate(pending, 1):
+            start = time.time()
+            try:
+                result = analyzer.score_stock(ticker, horizon)
+                if result['current_price'] is None:
+                    # Keep unscorable tickers out of the API table, but don't retry them
+                    store.record(run_date, ticker=ticker, horizon=horizon, status='no_data')
+                    summary['skipped'] += 1
+                else:
+                    store.record(run_date, result)
+                    if history is not None:
+                        history.append(result)
+                    summary['scored'] += 1
+                print(f"[{horizon}] {i}/{len(pending)} {ticker}: {result['score']:.1f} "
+                      f"{result['recommendation']} ({time.time() - start:.1f}s)")
+            except Exception as e:
+                store.record(run_date, ticker=ticker, horizon=horizon, status='failed')
+                summary['failed'] += 1
+                print(f"[{horizon}] {i}/{len(pending)} {ticker}: failed - {e}")
+
+    return summary
+
+# Per-process state of run_batch_parallel workers
+_worker_panel = None
+_worker_analyzer = None
+
+def _init_worker(panel_handle, processes, engine, db_path, trend_fits):
+    global _worker_panel, _worker_analyzer
+    # Split the cores between worker processes instead of each taking them all
+    cores = max(1, (os.cpu_count() or 1) // processes)
+    fintrix_investment.governor = ResourceGovernor(max_heavy_jobs=1, total_cores=cores)
+    config.SEASONAL_ENGINE = engine
+    config.DB_PATH = db_path  # the analyzer's caches share the batch's database
+    _worker_panel = PricePanel.attach(panel_handle)
+    _worker_analyzer = StockAnalyzer(data_collector=DataCollector(load_tickers=False))
+    if trend_fits:
+        _worker_analyzer.model_cache_size += len(trend_fits)  # room for every prefitted ticker
+        _worker_analyzer.use_trend_fits(trend_fits)
+
+def _score_from_panel(ticker, horizon):
+    df = _worker_panel.frame(ticker)
+    return _worker_analyzer.score_stock(ticker, horizon, df=df, current_price=float(df['close'].iloc[-1]))
+
+def run_batch_parallel(collector, store, tickers, horizons=HORIZONS, run_date=None, processes=4, history=None):
+    """Like run_batch, but scores on a process pool fed from a shared-memory price panel.
+    
+    Histories are downloaded once in this process; workers attach to the panel
+    and each task only carries a ticker symbol.
+    """
+    run_date = run_date or datetime.now().strftime('%Y-%m-%d')
+    summary = {'scored': 0, 'failed': 0, 'skipped': 0}
+    pending = {h: [t for t in tickers if t not in store.completed(run_date, h)] for h in horizons}
+    for horizon in horizons:
+        summary['skipped'] += len(tickers) - len(pending[horizon])
+    needed = sorted(set(t for ts in pending.values() for t in ts))
+    if not needed:
+        return summary
+
+    frames = collector.get_bulk_stock_data(needed)
+    panel = PricePanel.create(frames)
+    print(f"Price panel: {panel.data.shape} float32 prices + float64 volume, {panel.nbytes / 1e6:.1f} MB shared")
+    trend_fits = None
+    if config.SEASONAL_ENGINE == 'trend':
+        # Every ticker's trend model in one solve here, instead of one fit per task
+        started = time.time()
+        trend_fits = fintrix_trend.fit_frames(frames, **config.MODEL_PARAMS['Prophet'])
+        print(f"Trend fits: {len(trend_fits)} tickers in {(time.time() - started) * 1000:.0f} ms")
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(panel.handle(), processes, config.SEASONAL_ENGINE, store.db_path,
+                                           trend_fits)) as pool:
+            futures = {}
+            for horizon in horizons:
+                for ticker in pending[horizon]:
+                    if ticker in panel:
+                        futures[pool.submit(_score_from_panel, ticker, horizon)] = (ticker, horizon)
+                    else:
+                        store.record(run_date, ticker=ticker, horizon=horizon, status='no_data')
+                        summary['skipped'] += 1
+            for future in as_completed(futures):
+                ticker, horizon = futures[future]
+                try:
+                    result = future.result()
+                    if result['current_price'] is None:
+                        store.record(run_date, ticker=ticker, horizon=horizon, status='no_data')
+                        summary['skipped'] += 1
+                    else:
+                        store.record(run_date, result)
+                        if history is not None:
+                            history.append(result)
+                        summary['scored'] += 1
+                    print(f"[{horizon}] {ticker}: {result['score']:.1f} {result['recommendation']}")
+                except Exception as e:
+                    store.record(run_date, ticker=ticker, horizon=horizon, status='failed')
+                    summary['failed'] += 1
+                    print(f"[{horizon}] {ticker}: failed - {e}")
+    finally:
+        panel.close()
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the NSE universe and store results for the API")
+    parser.add_argument('--horizons', nargs='+', choices=HORIZONS, default=list(HORIZONS))
+    parser.add_argument('--limit', type=int, default=None, help="Only score the first N tickers")
+    parser.add_argument('--run-date', default=None, help="Checkpoint key (defaults to today)")
+    parser.add_argument('--restart', action='store_true', help="Ignore checkpoints of this run")
+    parser.add_argument('--db', default=None, help="SQLite file (defaults to Config.DB_PATH)")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Score on N worker processes sharing one in-memory price panel")
+    parser.add_argument('--engine', choices=list(SEASONAL_ENGINES), default=None,
+                        help="Seasonal model (defaults to Config.SEASONAL_ENGINE)")
+    args = parser.parse_args()
+    if args.engine:
+        config.SEASONAL_ENGINE = args.engine
+    if args.db:
+        config.DB_PATH = args.db  # before the analyzer builds its caches on it
+
+    store = ScoreStore(args.db)
+    history = ScoreHistory(store.db_path, config.HISTORY_BATCH_SIZE, config.HISTORY_FLUSH_INTERVAL_S)
+    run_date = args.run_date or datetime.now().strftime('%Y-%m-%d')
+    if args.restart:
+        store.reset_run(run_date)
+
+    analyzer = StockAnalyzer()
+    tickers = list(dict.fromkeys(to_yahoo_symbol(t) for t in analyzer.data_collector.nse_tickers))
+    if args.limit:
+        tickers = tickers[:args.limit]
+
+    try:
+        if args.processes:
+            summary = run_batch_parallel(analyzer.data_collector, store, tickers, args.horizons,
+                                         run_date, args.processes, history)
+        else:
+            summary = run_batch(analyzer, store, tickers, args.horizons, run_date, history)
+    finally:
+        history.close()
+    print(f"Batch {run_date} finished: {summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Market-hours-aware cache for score_stock() results.
+
+Entries are keyed by (ticker, horizon, last bar date) and stay valid until the
+next NSE session close after they were computed, so a score computed on
+Friday evening is served all weekend (and over exchange holidays). When a
+newer bar is seen for a ticker, its older entries are dropped at once.
+
+Two tiers: an in-process LRU, and a SQLite table shared by every worker
+process that points at the same database file.
+"""
+import os
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from fintrix_calendar import next_session_close
+
+PURGE_EVERY = 100  # puts between sweeps of expired SQLite rows
+
+class ResultCache:
+    def __init__(self, db_path, capacity=1024):
+        self.db_path = db_path
+        self.capacity = capacity
+        self._lru = OrderedDict()  # (ticker, horizon) -> (bar_date, expires_at, result)
+        self._lock = threading.Lock()
+        self._counters = {'lru_hits': 0, 'sqlite_hits': 0, 'misses': 0, 'invalidations': 0}
+        self._puts = 0
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    ticker TEXT NOT NULL,
+                    horizon TEXT NOT NULL,
+                    bar_date TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (ticker, horizon, bar_date)
+                );
+                CREATE INDEX IF NOT EXISTS ix_result_cache_expires ON result_cache (expires_at);
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def get(self, ticker, horizon, bar_date=None):
+        """Cached result, or None if missing, expired or older than ``bar_date``"""
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get((ticker, horizon))
+            if entry is not None:
+                cached_bar, expires_at, result = entry
+                if expires_at > now and (bar_date is None or cached_bar >= bar_date):
+                    self._lru.move_to_end((ticker, horizon))
+                    self._counters['lru_hits'] += 1
+                    return result
+                del self._lru[(ticker, horizon)]
+
+        with self._connect() as conn:
+            row = conn.execute("""
+                SELECT bar_date, expires_at, payload FROM result_cache
+                WHERE ticker = ? AND horizon = ? AND expires_at > ?
+                ORDER BY bar_date DESC LIMIT 1
+            """, (ticker, horizon, now)).fetchone()
+        if row is None or (bar_date is not None and row[0] < bar_date):
+            self._count('misses')
+            return None
+
+        result = json.loads(row[2])
+        self._remember(ticker, horizon, row[0], row[1], result)
+        self._count('sqlite_hits')
+        return result
+
+    def _remember(self, ticker, horizon, bar_date, expires_at, result):
+        with self._lock:
+            self._lru[(ticker, horizon)] = (bar_date, expires_at, result)
+            self._lru.move_to_end((ticker, horizon))
+            while len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+
+    def put(self, result):
+        """Cache a score_stock() result until the next session close"""
+        if result.get('as_of') is None:
+            return
+        expires_at = next_session_close().timestamp()
+        ticker, horizon, bar_date = result['ticker'], result['horizon'], result['as_of']
+        self._remember(ticker, horizon, bar_date, expires_at, result)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO result_cache (ticker, horizon, bar_date, expires_at, payload) VALUES (?, ?, ?, ?, ?)",
+                (ticker, horizon, bar_date, expires_at, json.dumps(result))
+            )
+            self._puts += 1
+            if self._puts % PURGE_EVERY == 0:
+                conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (time.time(),))
+
+    def on_new_bar(self, ticker, bar_date):
+        """Drop every entry for ``ticker`` computed from bars older than ``bar_date``"""
+        with self._lock:
+            for key in [k for k in self._lru if k[0] == ticker and self._lru[k][0] < bar_date]:
+                del self._lru[key]
+        with self._connect() as conn:
+            deleted = conn.execute(
+                "DELETE FROM result_cache WHERE ticker = ? AND bar_date < ?", (ticker, bar_date)
+            ).rowcount
+        if deleted:
+            self._count('invalidations')
+
+    def invalidate(self, ticker):
+        """Drop every entry for ``ticker`` (e.g. after its models were retrained)"""
+        with self._lock:
+            for key in [k for k in self._lru if k[0] == ticker]:
+                del self._lru[key]
+        with self._connect() as conn:
+            deleted = conn.execute("DELETE FROM result_cache WHERE ticker = ?", (ticker,)).rowcount
+        if deleted:
+            self._count('invalidations')
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self._counters[k] for k in ('lru_hits', 'sqlite_hits', 'misses'))
+            hits = self._counters['lru_hits'] + self._counters['sqlite_hits']
+            return dict(self._counters, lru_size=len(self._lru),
+                        hit_rate=hits / lookups if lookups else None)
@@ -0,0 +1,75 @@
+"""NSE trading calendar: sessions run 09:15-15:30 IST on weekdays that are not
+exchange holidays.
+
+Holidays are read from instance/nse_holidays.txt (one YYYY-MM-DD per line,
+'#' starts a comment) and from the NSE_HOLIDAYS environment variable
+(comma-separated dates), so the list can be updated without a code change.
+"""
+import os
+from datetime import datetime, date, time, timedelta, timezone
+from functools import lru_cache
+
+IST = timezone(timedelta(hours=5, minutes=30))
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+HOLIDAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'nse_holidays.txt')
+
+@lru_cache(maxsize=1)
+def holidays():
+    days = set()
+    if os.path.exists(HOLIDAYS_PATH):
+        with open(HOLIDAYS_PATH) as f:
+            for line in f:
+                line = line.split('#')[0].strip()
+                if line:
+                    days.add(date.fromisoformat(line))
+    for value in os.getenv('NSE_HOLIDAYS', '').split(','):
+        if value.strip():
+            days.add(date.fromisoformat(value.strip()))
+    return frozenset(days)
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in holidays()
+
+def _now(now):
+    return (now or datetime.now(IST)).astimezone(IST)
+
+def session_close(day):
+    return datetime.combine(day, SESSION_CLOSE, tzinfo=IST)
+
+def is_session_open(now=None):
+    now = _now(now)
+    return is_trading_day(now.date()) and SESSION_OPEN <= now.time() < SESSION_CLOSE
+
+def next_session_close(now=None):
+    """Close of the current session, or of the next one if none is open today"""
+    now = _now(now)
+    day = now.date()
+    if is_trading_day(day) and now < session_close(day):
+        return session_close(day)
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return session_close(day)
+
+def previous_session_close(now=None):
+    """Most recent session close at or before ``now``"""
+    now = _now(now)
+    day = now.date()
+    if is_trading_day(day) and now >= session_close(day):
+        return session_close(day)
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return session_close(day)
+
+def session_date(now=None):
+    """Date of the latest session that has opened (its bar is the newest data)"""
+    now = _now(now)
+    day = now.date()
+    if is_trading_day(day) and now.time() >= SESSION_OPEN:
+        return day
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
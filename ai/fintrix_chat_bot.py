@@ -104,18 +104,19 @@ def get_chat_response(user_input):
     return ai_response
 
 # Main interaction loop
-print("Fintrix: Hello! I'm your financial assistant with NSE data access. Ask about stocks or type 'exit' to quit.")
-while True:
-    try:
-        user_query = input("\nYou: ")
-        if user_query.lower() in ['exit', 'quit']:
-            break
+if __name__ == "__main__":
+    print("Fintrix: Hello! I'm your financial assistant with NSE data access. Ask about stocks or type 'exit' to quit.")
+    while True:
+        try:
+            user_query = input("\nYou: ")
+            if user_query.lower() in ['exit', 'quit']:
+                break
+                
+            response = get_chat_response(user_query)
+            print("\nFintrix:", response)
             
-        response = get_chat_response(user_query)
-        print("\nFintrix:", response)
-        
-    except KeyboardInterrupt:
-        print("\nFintrix: Session ended.")
-        break
-    except Exception as e:
-        print(f"\nFintrix: Error occurred - {str(e)}")
+        except KeyboardInterrupt:
+            print("\nFintrix: Session ended.")
+            break
+        except Exception as e:
+            print(f"\nFintrix: Error occurred - {str(e)}")
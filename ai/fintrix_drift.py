@@ -0,0 +1,311 @@
+"""Drift- and error-triggered model retraining.
+
+StockAnalyzer keeps every fitted model (LSTM/Transformer/XGBoost in its
+cache and the model store, Prophet/GARCH fits too) until it is shown to be
+stale, instead of never refitting some and refitting others on every call.
+A model is stale when either
+
+    drift   the population stability index (PSI) of daily log returns or
+            20-bar realized volatility over the bars since it was trained,
+            against the DRIFT_REFERENCE_BARS bars it was trained on,
+            exceeds DRIFT_PSI_THRESHOLD (measured once DRIFT_MIN_BARS new
+            bars exist), or
+    error   its rolling error over the last FORECAST_ERROR_WINDOW scored
+            forecasts exceeds FORECAST_ERROR_THRESHOLDS[model]: absolute
+            percentage error of the one-step price for the path models,
+            Brier score of the up-probability for XGBoost.
+
+DriftMonitor logs one-step forecasts, scores them once the next bar is
+known, and reports stale models. RetrainScheduler collects those per
+ticker and refits them on a background thread in batches, at most one
+heavy-job slot at a time. Training dates, forecasts and claims live in
+SQLite, so processes sharing the database file split the work: a model is
+retrained by whichever process claims it first.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SEQUENCE_MODELS = ('LSTM', 'Transformer')  # trained per horizon; the others are horizon-free
+PSI_BINS = 10
+PSI_FLOOR = 1e-4  # bin share floor, keeps empty bins finite
+VOLATILITY_WINDOW = 20
+CLAIM_TIMEOUT_S = 3600  # a claim older than this (crashed or failed retrain) can be taken over
+
+def model_days(name, days):
+    """Horizon a model's training depends on (0 for horizon-free models)"""
+    return days if name in SEQUENCE_MODELS else 0
+
+def psi(reference, current, bins=PSI_BINS):
+    """Population stability index of ``current`` against ``reference`` (quantile bins)"""
+    reference = reference[np.isfinite(reference)]
+    current = current[np.isfinite(current)]
+    if len(reference) < bins or len(current) == 0:
+        return 0.0
+    edges = np.unique(np.quantile(reference, np.linspace(0, 1, bins + 1)[1:-1]))
+    expected = np.bincount(np.searchsorted(edges, reference, side='right'), minlength=len(edges) + 1)
+    actual = np.bincount(np.searchsorted(edges, current, side='right'), minlength=len(edges) + 1)
+    expected = np.clip(expected / len(reference), PSI_FLOOR, None)
+    actual = np.clip(actual / len(current), PSI_FLOOR, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+def drift_features(close):
+    """Per-bar log return and trailing realized volatility (NaN where undefined)"""
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.full(len(close), np.nan)
+    returns[1:] = np.diff(np.log(close))
+    volatility = np.full(len(close), np.nan)
+    if len(close) > VOLATILITY_WINDOW:
+        volatility[VOLATILITY_WINDOW:] = sliding_window_view(returns[1:], VOLATILITY_WINDOW).std(axis=1)
+    return {'returns': returns, 'volatility': volatility}
+
+def feature_drift(close, split, reference_bars):
+    """Largest PSI over the drift features: bars from ``split`` on against the ones before"""
+    features = drift_features(close)
+    start = max(0, split - reference_bars)
+    return max(psi(values[start:split], values[split:]) for values in features.values())
+
+class DriftMonitor:
+    def __init__(self, db_path, psi_threshold=0.25, error_thresholds=None, error_window=20,
+                 min_errors=10, min_bars=20, reference_bars=250, check_interval_s=300):
+        self.db_path = db_path
+        self.psi_threshold = psi_threshold
+        self.error_thresholds = error_thresholds or {}
+        self.error_window = error_window
+        self.min_errors = min_errors
+        self.min_bars = min_bars
+        self.reference_bars = reference_bars
+        self.check_interval_s = check_interval_s
+        self._checked = {}  # ticker -> (last bar date, checked at)
+        self._lock = threading.Lock()
+        self._counters = {'checks': 0, 'scored': 0, 'stale_drift': 0, 'stale_error': 0}
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS model_training (
+                    ticker TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    days INTEGER NOT NULL,
+                    trained_on TEXT NOT NULL,
+                    trained_at REAL NOT NULL,
+                    claimed_at REAL,
+                    PRIMARY KEY (ticker, model, days)
+                );
+                CREATE TABLE IF NOT EXISTS forecast_log (
+                    ticker TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    days INTEGER NOT NULL,
+                    as_of TEXT NOT NULL,
+                    predicted REAL NOT NULL,
+                    base_price REAL NOT NULL,
+                    realized REAL,
+                    error REAL,
+                    PRIMARY KEY (ticker, model, days, as_of)
+                );
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, counter, n=1):
+        with self._lock:
+            self._counters[counter] += n
+
+    def record(self, ticker, as_of, days, predictions, base_price):
+        """Log the one-step forecasts of a predict_future() result made on bar ``as_of``.
+
+        Models without a training record (first use, or artifacts older than
+        the monitor) are taken to be trained on ``as_of``.
+        """
+        forecasts, models = [], []
+        for name, prediction in predictions.items():
+            key = (ticker, name, model_days(name, days))
+            models.append(key + (as_of,))
+            if name not in self.error_thresholds:
+                continue
+            value = float(prediction) if name == 'XGBoost' else float(np.asarray(prediction).reshape(-1)[0])
+            forecasts.append(key + (as_of, value, float(base_price)))
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO model_training (ticker, model, days, trained_on, trained_at) VALUES (?, ?, ?, ?, 0)",
+                models
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO forecast_log (ticker, model, days, as_of, predicted, base_price) VALUES (?, ?, ?, ?, ?, ?)",
+                forecasts
+            )
+
+    def trained(self, ticker, name, days, as_of):
+        """Record a (re)training on bars up to ``as_of``; releases the claim"""
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO model_training (ticker, model, days, trained_on, trained_at, claimed_at)
+                VALUES (?, ?, ?, ?, ?, NULL)
+            """, (ticker, name, model_days(name, days), as_of, time.time()))
+
+    def claim(self, ticker, name, days):
+        """True if this process should retrain the model (nobody else is on it)"""
+        now = time.time()
+        with self._connect() as conn:
+            claimed = conn.execute("""
+                UPDATE model_training SET claimed_at = ?
+                WHERE ticker = ? AND model = ? AND days = ? AND (claimed_at IS NULL OR claimed_at < ?)
+            """, (now, ticker, name, model_days(name, days), now - CLAIM_TIMEOUT_S)).rowcount
+        return claimed == 1
+
+    def _score_forecasts(self, conn, ticker, dates, close):
+        """Fill in the error of logged forecasts whose next bar is now known"""
+        rows = conn.execute(
+            "SELECT rowid, model, as_of, predicted, base_price FROM forecast_log "
+            "WHERE ticker = ? AND error IS NULL AND as_of < ?",
+            (ticker, dates[-1])
+        ).fetchall()
+        updates = []
+        for row in rows:
+            position = int(np.searchsorted(dates, row['as_of'], side='right'))
+            if position >= len(close):
+                continue
+            realized = float(close[position])
+            if row['model'] == 'XGBoost':
+                error = (row['predicted'] - float(realized > row['base_price'])) ** 2
+            else:
+                error = abs(row['predicted'] / realized - 1)
+            updates.append((realized, error, row['rowid']))
+        conn.executemany("UPDATE forecast_log SET realized = ?, error = ? WHERE rowid = ?", updates)
+        return len(updates)
+
+    def check(self, ticker, df):
+        """Score pending forecasts and assess every model of ``ticker`` against ``df``.
+
+        Returns one dict per known model (model, days, trained_at, psi, error,
+        stale), or None when the ticker was checked recently on the same bar.
+        """
+        dates = np.array(df.index.strftime('%Y-%m-%d'))
+        close = df['close'].values
+        if len(dates) == 0:
+            return None
+        now = time.time()
+        with self._lock:
+            last = self._checked.get(ticker)
+            if last is not None and last[0] == dates[-1] and now - last[1] < self.check_interval_s:
+                return None
+            self._checked[ticker] = (dates[-1], now)
+        self._count('checks')
+
+        report = []
+        with self._connect() as conn:
+            self._count('scored', self._score_forecasts(conn, ticker, dates, close))
+            models = conn.execute(
+                "SELECT model, days, trained_on, trained_at FROM model_training WHERE ticker = ?", (ticker,)
+            ).fetchall()
+            for row in models:
+                split = int(np.searchsorted(dates, row['trained_on'], side='right'))
+                drift = None
+                if len(close) - split >= self.min_bars:
+                    drift = feature_drift(close, split, self.reference_bars)
+                errors = [r['error'] for r in conn.execute(
+                    "SELECT error FROM forecast_log WHERE ticker = ? AND model = ? AND days = ? "
+                    "AND as_of > ? AND error IS NOT NULL ORDER BY as_of DESC LIMIT ?",
+                    (ticker, row['model'], row['days'], row['trained_on'], self.error_window)
+                )]
+                error = float(np.mean(errors)) if len(errors) >= self.min_errors else None
+                threshold = self.error_thresholds.get(row['model'])
+                stale = None
+                if drift is not None and drift > self.psi_threshold:
+                    stale = 'drift'
+                elif error is not None and threshold is not None and error > threshold:
+                    stale = 'error'
+                if stale:
+                    self._count(f"stale_{stale}")
+                report.append({'model': row['model'], 'days': row['days'], 'trained_at': row['trained_at'],
+                               'psi': drift, 'error': error, 'stale': stale})
+        return report
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, tickers_checked=len(self._checked))
+
+class RetrainScheduler:
+    """Runs retrain(ticker, [(model, days), ...], df) for submitted stale models.
+
+    Jobs are merged per ticker and run in batches of up to ``batch_size``
+    tickers, every ``interval_s`` or as soon as a batch is full.
+    """
+
+    def __init__(self, retrain, interval_s=60, batch_size=8):
+        self._retrain = retrain
+        self.interval_s = interval_s
+        self.batch_size = batch_size
+        self._pending = OrderedDict()  # ticker -> (set of (model, days), newest df)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self._stats = {'submitted': 0, 'batches': 0, 'retrained': 0, 'failed': 0}
+
+    @property
+    def running(self):
+        return self._thread is not None and not self._closed.is_set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='retrain', daemon=True)
+                self._thread.start()
+        return self
+
+    def close(self):
+        self._closed.set()
+        self._wake.set()
+
+    def submit(self, ticker, jobs, df):
+        """Queue (model, days) retrains for a ticker, to be fitted on ``df``"""
+        with self._lock:
+            queued = self._pending.pop(ticker, (set(), None))[0]
+            new = set(jobs) - queued
+            self._pending[ticker] = (queued | new, df)
+            self._stats['submitted'] += len(new)
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def _loop(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            if not self._closed.is_set():
+                self.run_batch()
+
+    def run_batch(self):
+        """Retrain the oldest ``batch_size`` queued tickers; returns how many"""
+        with self._lock:
+            batch = [self._pending.popitem(last=False) for _ in range(min(self.batch_size, len(self._pending)))]
+            if batch:
+                self._stats['batches'] += 1
+        for ticker, (jobs, df) in batch:
+            try:
+                retrained = self._retrain(ticker, sorted(jobs), df)
+                with self._lock:
+                    self._stats['retrained'] += retrained
+            except Exception as e:
+                print(f"Retraining {ticker} failed: {e}")
+                with self._lock:
+                    self._stats['failed'] += len(jobs)
+        return len(batch)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=sum(len(jobs) for jobs, _ in self._pending.values()),
+                        running=self.running)
@@ -1,10 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from fintrix_investment import StockAnalyzer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from fintrix_investment import DataCollector, SEASONAL_ENGINES, StockAnalyzer, apply_budget, config, governor
+from fintrix_portfolio import allocate
+from fintrix_batch import ScoreStore
+from fintrix_history import ScoreHistory
+from fintrix_singleflight import SingleFlight
+from fintrix_warmup import Warmup, hot_tickers
+from fintrix_calendar import session_date
+from fintrix_intraday import RULES as INTRADAY_RULES
 from fintrix_chat_bot import get_chat_response
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import atexit
 import threading
+import sqlite3
+import json
 import os
+from datetime import datetime
 
 app = Flask(__name__)
 
@@ -13,11 +27,32 @@ app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///tasks.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 
+# Task list paging
+DEFAULT_TASK_LIMIT = 100
+MAX_TASK_LIMIT = 1000
+MAX_BULK_TASKS = 1000
+SQLITE_MAX_VARIABLES = 500  # stay well under SQLite's bound-parameter limit
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the writer; the rest trades fsyncs for speed."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, no fsync per commit
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-64000")  # 64 MB page cache
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.close()
+
 # CORS configuration with dynamic origins
 CORS(app, resources={r"/api/*": {
     "origins": os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(","),
     "methods": ["GET", "POST", "DELETE", "OPTIONS"],
     "allow_headers": ["Content-Type"],
+    "expose_headers": ["X-Next-After-Id"],
     "supports_credentials": True
 }})
 
@@ -26,27 +61,107 @@ class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
 
-# Thread-safe StockAnalyzer initialization
+# Shared StockAnalyzer. It is re-entrant, so the lock only guards construction.
 analyzer_lock = threading.Lock()
 analyzer = None
 
 def get_analyzer():
     global analyzer
-    with analyzer_lock:
-        if analyzer is None:
-            analyzer = StockAnalyzer()
+    if analyzer is None:
+        with analyzer_lock:
+            if analyzer is None:
+                instance = StockAnalyzer()
+                instance.data_collector.start_quotes()
+                instance.start_retraining()
+                analyzer = instance
     return analyzer
 
+# Bounded pool for /api/finance/analyze/batch. The analyzer is re-entrant, so
+# all workers share it (and the models it has trained).
+batch_executor = ThreadPoolExecutor(max_workers=config.BATCH_MAX_WORKERS,
+                                    thread_name_prefix='analyze-batch')
+
+# Concurrent live analyses of the same (ticker, horizon, data date) run once;
+# budget-dependent fields are applied per caller afterwards.
+analysis_flight = SingleFlight()
+
+def score_live(ticker, horizon, df=None, current_price=None, latency_budget_ms=None, engine=None):
+    """Run (or join an in-flight) live analysis; returns (result, coalesced)"""
+    engine = engine or config.SEASONAL_ENGINE
+    def compute():
+        result = get_analyzer().score_stock(ticker, horizon, df=df, current_price=current_price,
+                                            latency_budget_ms=latency_budget_ms, engine=engine)
+        if (result['current_price'] is not None and result['mode'] != 'fast'
+                and engine == config.SEASONAL_ENGINE):
+            score_store.save(result)
+            score_history.append(result)
+        return result
+    data_date = session_date().isoformat()
+    return analysis_flight.do((ticker, horizon, data_date, latency_budget_ms, engine), compute)
+
+def score_prefetched(ticker, horizon, df, latency_budget_ms=None, engine=None):
+    return score_live(ticker, horizon, df=df, current_price=float(df['close'].iloc[-1]),
+                      latency_budget_ms=latency_budget_ms, engine=engine)[0]
+
+def parse_latency_budget(data):
+    """Optional latency_budget_ms from a request body; raises ValueError if invalid"""
+    value = data.get('latency_budget_ms')
+    if value is None:
+        return None
+    value = float(value)
+    if value <= 0:
+        raise ValueError('latency_budget_ms must be positive')
+    return value
+
 # Create database tables
 with app.app_context():
     db.create_all()
 
+# Scores written by the nightly batch (fintrix_batch.py); also buffers request counts
+score_store = ScoreStore()
+
+# Append-only score history (fintrix_history.py), written in batches
+score_history = ScoreHistory(config.DB_PATH, config.HISTORY_BATCH_SIZE, config.HISTORY_FLUSH_INTERVAL_S)
+atexit.register(score_history.close)
+atexit.register(score_store.flush_requests)
+
+# Background warm-up of the hot list (fintrix_warmup.py); tickers with a fresh
+# batch score are answered from the table already and are skipped
+warmup = Warmup(lambda ticker, horizon: score_live(ticker, horizon),
+                fresh=lambda ticker, horizon: score_store.get(ticker, horizon) is not None)
+
+def start_warmup():
+    """Start warming the hot list in the background (Config.WARMUP_ENABLED)"""
+    if not config.WARMUP_ENABLED:
+        return None
+    def hot_list():
+        get_analyzer()  # build the analyzer on the warm-up thread, not the caller's
+        return hot_tickers(score_store, DataCollector.FALLBACK_NSE_TICKERS, config.WARMUP_SIZE,
+                           config.WARMUP_LOOKBACK_DAYS, config.WARMUP_TICKERS)
+    return warmup.start(hot_list)
+
 @app.route('/api/tasks', methods=['GET'])
 def get_tasks():
-    """Retrieve all tasks from the database."""
+    """Retrieve a page of tasks ordered by id.
+    
+    Keyset pagination: pass the last id you received as ``after_id``. The id
+    to continue from is returned in the ``X-Next-After-Id`` header when more
+    tasks may follow.
+    """
     try:
-        tasks = Task.query.all()
-        return jsonify([{"id": task.id, "title": task.title} for task in tasks])
+        after_id = request.args.get('after_id', 0, type=int)
+        limit = request.args.get('limit', DEFAULT_TASK_LIMIT, type=int)
+        if limit <= 0 or limit > MAX_TASK_LIMIT:
+            return jsonify({'success': False, 'error': f'limit must be between 1 and {MAX_TASK_LIMIT}'}), 400
+        tasks = (Task.query
+                 .filter(Task.id > after_id)
+                 .order_by(Task.id)
+                 .limit(limit)
+                 .all())
+        response = jsonify([{"id": task.id, "title": task.title} for task in tasks])
+        if len(tasks) == limit:
+            response.headers['X-Next-After-Id'] = str(tasks[-1].id)
+        return response
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -65,6 +180,24 @@ def add_task():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/api/tasks/bulk', methods=['POST'])
+def add_tasks_bulk():
+    """Add many tasks in a single transaction."""
+    try:
+        data = request.get_json()
+        titles = [str(title).strip() for title in data.get('titles', [])]
+        if not titles or not all(titles):
+            return jsonify({'success': False, 'error': 'A list of non-empty titles is required'}), 400
+        if len(titles) > MAX_BULK_TASKS:
+            return jsonify({'success': False, 'error': f'At most {MAX_BULK_TASKS} tasks per request'}), 400
+        tasks = [Task(title=title) for title in titles]
+        db.session.add_all(tasks)
+        db.session.commit()
+        return jsonify([{"id": task.id, "title": task.title} for task in tasks])
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
 def delete_task(task_id):
     """Delete a task by ID."""
@@ -76,6 +209,26 @@ def delete_task(task_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/api/tasks/bulk', methods=['DELETE'])
+def delete_tasks_bulk():
+    """Delete many tasks by ID in a single transaction."""
+    try:
+        data = request.get_json()
+        ids = [int(task_id) for task_id in data.get('ids', [])]
+        if not ids:
+            return jsonify({'success': False, 'error': 'A list of ids is required'}), 400
+        if len(ids) > MAX_BULK_TASKS:
+            return jsonify({'success': False, 'error': f'At most {MAX_BULK_TASKS} tasks per request'}), 400
+        deleted = 0
+        for i in range(0, len(ids), SQLITE_MAX_VARIABLES):
+            chunk = ids[i:i + SQLITE_MAX_VARIABLES]
+            deleted += Task.query.filter(Task.id.in_(chunk)).delete(synchronize_session=False)
+        db.session.commit()
+        return jsonify({'success': True, 'deleted': deleted})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @app.route('/api/finance/chat', methods=['POST'])
 def chat():
     try:
@@ -90,27 +243,368 @@ def chat():
 
 @app.route('/api/finance/analyze', methods=['POST'])
 def analyze_stock():
-    """Analyze a stock based on ticker and budget."""
+    """Analyze a stock based on ticker and budget.
+    
+    Answers from the batch score table when it holds a fresh score and falls
+    back to live analysis for unknown or stale tickers. An optional
+    ``latency_budget_ms`` limits live analysis to the ensemble members that
+    fit in the budget. ``engine`` picks the seasonal model ('prophet' or
+    'trend'); stored batch scores are only used for the configured engine.
+    """
     try:
         data = request.get_json()
         ticker = data.get('ticker', 'RELIANCE.NS').upper().strip()
         budget = float(data.get('budget', 5000))
+        horizon = data.get('horizon', 'short')
+        latency_budget_ms = parse_latency_budget(data)
+        engine = data.get('engine', config.SEASONAL_ENGINE)
         if not ticker or budget <= 0:
             return jsonify({'success': False, 'error': 'Invalid ticker or budget'}), 400
-        analyzer = get_analyzer()
-        score, recommendation = analyzer.analyze_stock(ticker, budget, 'short')
+        if horizon not in ('short', 'long'):
+            return jsonify({'success': False, 'error': 'Horizon must be short or long'}), 400
+        if engine not in SEASONAL_ENGINES:
+            return jsonify({'success': False, 'error': f"Engine must be one of {', '.join(SEASONAL_ENGINES)}"}), 400
+        try:
+            score_store.count_request(ticker)
+        except sqlite3.Error as e:
+            print(f"Could not count request for {ticker}: {e}")
+        result = score_store.get(ticker, horizon) if engine == config.SEASONAL_ENGINE else None
+        source = 'batch'
+        coalesced = False
+        if result is None:
+            result, coalesced = score_live(ticker, horizon, latency_budget_ms=latency_budget_ms, engine=engine)
+            source = 'live'
+        score, recommendation = apply_budget(result, budget)
         return jsonify({
             'success': True,
             'ticker': ticker,
             'score': score,
             'recommendation': recommendation,
-            'current_price': analyzer.data_collector.get_current_price(ticker)
+            'current_price': result['current_price'],
+            'as_of': result['as_of'],
+            'source': source,
+            'models': result.get('models'),
+            'mode': result.get('mode', 'full'),
+            'engine': result.get('engine', config.SEASONAL_ENGINE),
+            'coalesced': coalesced,
+            'queue_ms': result.get('queue_ms', 0.0)
         })
     except ValueError:
         return jsonify({'success': False, 'error': 'Invalid budget format'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': f'Analysis failed: {str(e)}'}), 500
 
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({'success': True, 'status': 'ok', 'pid': os.getpid(), 'warmup': warmup.stats()})
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness: the analyzer is built, so requests don't pay for startup.
+    
+    Warm-up progress is reported but doesn't gate readiness unless the
+    caller passes ``?warm=1`` (e.g. a deploy script that wants hot caches).
+    """
+    checks = {
+        'analyzer': analyzer is not None,
+        'price_panel': analyzer is not None and analyzer.data_collector.panel is not None,
+        'warm': warmup.done
+    }
+    required = ['analyzer', 'warm'] if request.args.get('warm') in ('1', 'true') else ['analyzer']
+    status = 200 if all(checks[name] for name in required) else 503
+    return jsonify({'success': status == 200, 'checks': checks, 'warmup': warmup.stats(),
+                    'pid': os.getpid()}), status
+
+@app.route('/api/finance/resources', methods=['GET'])
+def resource_stats():
+    """Heavy-stage slot configuration and queueing statistics."""
+    quotes = get_analyzer().data_collector.quotes
+    return jsonify({'success': True, 'resources': governor.stats(),
+                    'single_flight': analysis_flight.stats(),
+                    'result_cache': get_analyzer().result_cache.stats(),
+                    'model_cache': get_analyzer().model_cache_stats(),
+                    'model_costs_ms': get_analyzer().cost_tracker.snapshot(),
+                    'warmup': warmup.stats(),
+                    'drift': get_analyzer().drift.stats(),
+                    'retraining': get_analyzer().retrainer.stats(),
+                    'risk': get_analyzer().risk.stats(),
+                    'score_history': score_history.stats(),
+                    'quotes': quotes.stats() if quotes is not None else None})
+
+@app.route('/api/finance/quote/<ticker>', methods=['GET'])
+def get_quote(ticker):
+    """Last trade from the live quote table, with its age and staleness."""
+    ticker = ticker.upper().strip()
+    collector = get_analyzer().data_collector
+    if collector.quotes is None:
+        price = collector.get_current_price(ticker)
+        if price is None:
+            return jsonify({'success': False, 'error': 'Could not fetch current price'}), 404
+        return jsonify({'success': True, 'ticker': ticker, 'price': float(price), 'source': 'poll'})
+    quote = collector.quotes.quote(ticker)
+    if quote is None or quote['stale']:
+        collector.quotes.price(ticker)  # subscribe, and poll if allowed
+        quote = collector.quotes.quote(ticker)
+    if quote is None:
+        return jsonify({'success': False, 'error': 'No quote yet'}), 404
+    return jsonify(dict(quote, success=True))
+
+@app.route('/api/finance/intraday/<ticker>', methods=['GET'])
+def get_intraday(ticker):
+    """Intraday OHLCV bars from the minute-bar store, for charts.
+    
+    Query parameters: ``rule`` (1m, 5m, 15m, 1h or 1d; default 5m), optional
+    ``start``/``end`` (ISO times, naive ones IST) and ``refresh=0`` to skip
+    fetching the latest minute bars first. Columnar arrays, one entry per bar.
+    """
+    ticker = ticker.upper().strip()
+    rule = request.args.get('rule', '5m')
+    if rule not in INTRADAY_RULES:
+        return jsonify({'success': False, 'error': f"rule must be one of {', '.join(INTRADAY_RULES)}"}), 400
+    refresh = request.args.get('refresh', '1') not in ('0', 'false')
+    try:
+        df = get_analyzer().data_collector.get_intraday_data(ticker, rule, request.args.get('start'),
+                                                            request.args.get('end'), refresh=refresh)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Invalid start or end: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Intraday query failed: {str(e)}'}), 500
+    if df is None:
+        return jsonify({'success': False, 'error': 'No intraday bars'}), 404
+    bars = {column: df[column].tolist() for column in df.columns}
+    return jsonify(dict(bars, success=True, ticker=ticker, rule=rule, count=len(df),
+                        time=[t.isoformat() for t in df.index]))
+
+@app.route('/api/finance/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze a watchlist and stream one NDJSON line per ticker as it completes.
+    
+    Histories come from one bulk download; tickers priced above the budget are
+    reported and skipped, as in create_ui. The last line is a summary ranking
+    the affordable tickers by score.
+    """
+    try:
+        data = request.get_json()
+        tickers = list(dict.fromkeys(
+            str(t).upper().strip() for t in data.get('tickers', []) if str(t).strip()
+        ))
+        budget = float(data.get('budget', 5000))
+        horizon = data.get('horizon', 'short')
+        latency_budget_ms = parse_latency_budget(data)
+        engine = data.get('engine', config.SEASONAL_ENGINE)
+        if not tickers or budget <= 0:
+            return jsonify({'success': False, 'error': 'Invalid tickers or budget'}), 400
+        if len(tickers) > config.BATCH_MAX_TICKERS:
+            return jsonify({'success': False, 'error': f'At most {config.BATCH_MAX_TICKERS} tickers per request'}), 400
+        if horizon not in ('short', 'long'):
+            return jsonify({'success': False, 'error': 'Horizon must be short or long'}), 400
+        if engine not in SEASONAL_ENGINES:
+            return jsonify({'success': False, 'error': f"Engine must be one of {', '.join(SEASONAL_ENGINES)}"}), 400
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid budget format'}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    def line(payload):
+        return json.dumps(payload) + '\n'
+
+    def result_line(result, source):
+        score, recommendation = apply_budget(result, budget)
+        return {
+            'type': 'result',
+            'success': result['current_price'] is not None,
+            'ticker': result['ticker'],
+            'score': score,
+            'recommendation': recommendation,
+            'current_price': result['current_price'],
+            'affordable_shares': int(budget / result['current_price']) if result['current_price'] else 0,
+            'as_of': result['as_of'],
+            'mode': result.get('mode', 'full'),
+            'source': source
+        }
+
+    def generate():
+        ranking = []
+        try:
+            pending = {}
+            missing = []
+            for ticker in tickers:
+                stored = score_store.get(ticker, horizon) if engine == config.SEASONAL_ENGINE else None
+                if stored is None:
+                    missing.append(ticker)
+                else:
+                    pending[ticker] = stored
+            histories = get_analyzer().data_collector.get_bulk_stock_data(missing) if missing else {}
+
+            # Budget filter before any model work
+            to_score = {}
+            for ticker in tickers:
+                if ticker in pending:
+                    price = pending[ticker]['current_price']
+                elif ticker in histories:
+                    price = float(histories[ticker]['close'].iloc[-1])
+                else:
+                    yield line({'type': 'result', 'success': False, 'ticker': ticker, 'error': 'No data'})
+                    continue
+                if price > budget:
+                    yield line({'type': 'result', 'success': False, 'ticker': ticker,
+                                'current_price': price, 'error': 'Budget too low for this stock'})
+                elif ticker in pending:
+                    payload = result_line(pending[ticker], 'batch')
+                    ranking.append(payload)
+                    yield line(payload)
+                else:
+                    to_score[ticker] = histories[ticker]
+
+            if engine == 'trend' and len(to_score) > 1:
+                get_analyzer().fit_trend_batch(to_score)  # one solve for the whole watchlist
+            futures = {
+                batch_executor.submit(score_prefetched, ticker, horizon, df, latency_budget_ms, engine): ticker
+                for ticker, df in to_score.items()
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield line({'type': 'result', 'success': False, 'ticker': ticker,
+                                'error': f'Analysis failed: {str(e)}'})
+                    continue
+                payload = result_line(result, 'live')
+                if payload['success']:
+                    ranking.append(payload)
+                yield line(payload)
+        except Exception as e:
+            yield line({'type': 'error', 'success': False, 'error': f'Batch failed: {str(e)}'})
+
+        ranking.sort(key=lambda r: r['score'], reverse=True)
+        yield line({'type': 'summary', 'success': True, 'horizon': horizon, 'budget': budget,
+                    'ranking': [{'ticker': r['ticker'], 'score': r['score'],
+                                 'recommendation': r['recommendation'],
+                                 'current_price': r['current_price'],
+                                 'affordable_shares': r['affordable_shares']} for r in ranking]})
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/finance/risk', methods=['POST'])
+def risk_bands():
+    """Monte Carlo VaR/CVaR, drawdown and loss probability of a position.
+    
+    The position is ``shares`` if given, otherwise what ``budget`` buys.
+    Simulations come from the ticker's GARCH fit and are cached per fit
+    date, so repeated budgets for a ticker return in milliseconds.
+    """
+    try:
+        data = request.get_json()
+        ticker = data.get('ticker', 'RELIANCE.NS').upper().strip()
+        budget = float(data.get('budget', 5000))
+        horizon = data.get('horizon', 'short')
+        shares = data.get('shares')
+        shares = int(shares) if shares is not None else None
+        if not ticker or budget <= 0 or (shares is not None and shares <= 0):
+            return jsonify({'success': False, 'error': 'Invalid ticker, budget or shares'}), 400
+        if horizon not in ('short', 'long'):
+            return jsonify({'success': False, 'error': 'Horizon must be short or long'}), 400
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Invalid budget or shares format'}), 400
+
+    try:
+        risk = get_analyzer().risk_profile(ticker, budget, horizon, shares=shares)
+        if risk is None:
+            return jsonify({'success': False, 'error': 'Not enough history for a GARCH fit'}), 404
+        if risk['shares'] == 0:
+            return jsonify({'success': False, 'error': 'Budget too low for this stock'}), 400
+        return jsonify(dict(risk, success=True))
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Risk simulation failed: {str(e)}'}), 500
+
+@app.route('/api/finance/history/<ticker>', methods=['GET'])
+def score_history_range(ticker):
+    """Stored scores of a ticker over time, for charts; never runs the models.
+    
+    Query parameters: ``horizon`` (short/long), ``start`` and ``end``
+    (YYYY-MM-DD, inclusive) and ``points`` (default and cap
+    Config.HISTORY_MAX_POINTS). Longer ranges are downsampled into date
+    buckets carrying their last score and the bucket's min/max/mean.
+    """
+    ticker = ticker.upper().strip()
+    horizon = request.args.get('horizon', 'short')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    if horizon not in ('short', 'long'):
+        return jsonify({'success': False, 'error': 'Horizon must be short or long'}), 400
+    try:
+        for value in (start, end):
+            if value is not None:
+                datetime.strptime(value, '%Y-%m-%d')
+        points = int(request.args.get('points', config.HISTORY_MAX_POINTS))
+        if not 0 < points <= config.HISTORY_MAX_POINTS:
+            raise ValueError(points)
+    except ValueError:
+        return jsonify({'success': False, 'error': f'Dates must be YYYY-MM-DD and points 1-{config.HISTORY_MAX_POINTS}'}), 400
+
+    try:
+        rows, downsampled = score_history.query(ticker, horizon, start, end, points)
+        return jsonify({'success': True, 'ticker': ticker, 'horizon': horizon, 'downsampled': downsampled,
+                        'count': len(rows), 'history': rows})
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'History query failed: {str(e)}'}), 500
+
+@app.route('/api/finance/portfolio', methods=['POST'])
+def build_portfolio():
+    """Integer-share allocation of a budget across scored tickers.
+    
+    Without ``tickers`` the whole fresh batch-scored universe (best
+    PORTFOLIO_MAX_TICKERS) is considered. With ``tickers``, those lacking a
+    fresh stored score are analyzed live, as in /api/finance/analyze/batch.
+    Price history for the covariance comes from the preloaded price panel.
+    """
+    try:
+        data = request.get_json()
+        tickers = list(dict.fromkeys(
+            str(t).upper().strip() for t in data.get('tickers', []) if str(t).strip()
+        ))
+        budget = float(data.get('budget', 5000))
+        horizon = data.get('horizon', 'short')
+        risk_aversion = float(data.get('risk_aversion', config.PORTFOLIO_RISK_AVERSION))
+        max_weight = float(data.get('max_weight', config.PORTFOLIO_MAX_WEIGHT))
+        if budget <= 0 or risk_aversion <= 0 or not 0 < max_weight <= 1:
+            return jsonify({'success': False, 'error': 'Invalid budget, risk_aversion or max_weight'}), 400
+        if len(tickers) > config.BATCH_MAX_TICKERS:
+            return jsonify({'success': False, 'error': f'At most {config.BATCH_MAX_TICKERS} tickers per request'}), 400
+        if horizon not in ('short', 'long'):
+            return jsonify({'success': False, 'error': 'Horizon must be short or long'}), 400
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Invalid budget format'}), 400
+
+    try:
+        collector = get_analyzer().data_collector
+        if tickers:
+            scores = [s for s in (score_store.get(t, horizon) for t in tickers) if s is not None]
+            missing = [t for t in tickers if t not in {s['ticker'] for s in scores}]
+            histories = collector.get_bulk_stock_data(missing) if missing else {}
+            futures = [batch_executor.submit(score_prefetched, t, horizon, histories[t])
+                       for t in missing if t in histories]
+            for future in as_completed(futures):
+                try:
+                    scores.append(future.result())
+                except Exception as e:
+                    print(f"Portfolio: analysis failed: {e}")
+        else:
+            scores = score_store.scored(horizon, limit=config.PORTFOLIO_MAX_TICKERS)
+
+        # Sliced from the preloaded price panel; only tickers it lacks are downloaded
+        closes = collector.get_closes(list(dict.fromkeys(s['ticker'] for s in scores)),
+                                      config.PORTFOLIO_HISTORY_DAYS + 1)
+        days = config.SHORT_TERM_DAYS if horizon == 'short' else config.LONG_TERM_DAYS
+        portfolio = allocate(scores, closes, budget, days, risk_aversion, max_weight)
+        return jsonify(dict(portfolio, success=True, horizon=horizon))
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Portfolio failed: {str(e)}'}), 500
+
 if __name__ == '__main__':
     print("Starting Flask server on http://127.0.0.1:8888")
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':  # the reloader's serving child only
+        start_warmup()
     app.run(debug=True, host='127.0.0.1', port=8888, threaded=True)
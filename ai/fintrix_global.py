@@ -0,0 +1,147 @@
+"""Nightly training of the global multi-ticker sequence model.
+
+One GlobalLSTMModel is trained on windows pooled from every ticker in the
+universe, each scaled per ticker (DataPreprocessor.relative_windows), with a
+learned ticker and sector embedding. The TorchScript module and its
+vocabularies are saved in the model store, and StockAnalyzer serves 'LSTM'
+from it (config.USE_GLOBAL_LSTM) without any per-request training; tickers
+not seen in training use the shared "unknown" embedding (id 0). That row is
+trained by embedding dropout: each batch replaces a fraction of the ticker
+and sector ids with 0, so the unknown slot learns the universe-wide context.
+
+Usage:
+    python fintrix_global.py --universe 500 --horizon short
+    python fintrix_global.py --tickers RELIANCE.NS TCS.NS INFY.NS --epochs 5
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from fintrix_investment import (
+    DataCollector, DataPreprocessor, GlobalLSTMModel, GLOBAL_MODEL_OWNER,
+    config, horizon_checkpoints
+)
+from fintrix_batch import to_yahoo_symbol
+from fintrix_inference import steps_key, to_torchscript
+from fintrix_model_store import ModelStore
+
+STRIDE = 5  # bars between training windows of one ticker
+BATCH_SIZE = 512
+EPOCHS = 10
+HIDDEN_SIZE = 64
+LEARNING_RATE = 0.001
+EMBEDDING_DROPOUT = 0.1  # share of training ids replaced by the "unknown" id 0
+
+def drop_ids(ids, rate=EMBEDDING_DROPOUT):
+    """``ids`` with a random ``rate`` of them set to 0 (the unknown slot)"""
+    return ids.masked_fill(torch.rand(ids.shape) < rate, 0)
+
+def build_dataset(frames, sectors, lookback, steps, stride=STRIDE):
+    """Pool per-ticker windows; the last TEST_SIZE of each ticker's windows is held out.
+
+    Returns (train tensors, validation tensors, ticker_ids, sector_ids), the
+    tensors being (X, y, ticker id, sector id).
+    """
+    preprocessor = DataPreprocessor()
+    closes = {ticker: df['close'].dropna().values for ticker, df in frames.items()}
+    # Only tickers that contribute windows get an embedding; the rest use id 0
+    closes = {ticker: close for ticker, close in closes.items() if len(close) >= lookback + steps[-1] + 1}
+    if not closes:
+        raise ValueError("Not enough history in any ticker for this horizon")
+    ticker_ids = {ticker: i + 1 for i, ticker in enumerate(sorted(closes))}
+    sector_ids = {sector: i + 1 for i, sector in enumerate(sorted({sectors[t] for t in closes if sectors.get(t)}))}
+    parts = {'train': [], 'val': []}
+    for ticker, close in closes.items():
+        X, y, _ = preprocessor.relative_windows(close, lookback, steps, stride)
+        split = int(len(X) * (1 - config.TEST_SIZE))
+        ids = np.full(len(X), ticker_ids[ticker])
+        sector = np.full(len(X), sector_ids.get(sectors.get(ticker), 0))
+        parts['train'].append((X[:split], y[:split], ids[:split], sector[:split]))
+        parts['val'].append((X[split:], y[split:], ids[split:], sector[split:]))
+
+    def stack(chunks):
+        X, y, ids, sector = (np.concatenate(column) for column in zip(*chunks))
+        return (torch.from_numpy(X), torch.from_numpy(y),
+                torch.from_numpy(ids).long(), torch.from_numpy(sector).long())
+    return stack(parts['train']), stack(parts['val']), ticker_ids, sector_ids
+
+def evaluate(model, tensors, criterion):
+    model.eval()
+    with torch.no_grad():
+        X, y, ids, sector = tensors
+        return float(criterion(model(X, ids, sector), y)) if len(X) else None
+
+def train_global(frames, sectors, horizon='short', lookback=None, epochs=EPOCHS,
+                 hidden_size=HIDDEN_SIZE, store=None):
+    """Train and save the global model for a horizon; returns its metadata"""
+    store = store or ModelStore(config.MODEL_STORE_DIR)
+    days = config.SHORT_TERM_DAYS if horizon == 'short' else config.LONG_TERM_DAYS
+    lookback = lookback or config.LOOKBACK_WINDOW
+    steps = horizon_checkpoints(days)
+    start = time.time()
+
+    train, val, ticker_ids, sector_ids = build_dataset(frames, sectors, lookback, np.array(steps))
+    model = GlobalLSTMModel(len(ticker_ids), len(sector_ids), hidden_size=hidden_size,
+                            output_size=len(steps))
+    optimizer = torch.optim.Adam(model.parameters(), lr=LEARNING_RATE)
+    criterion = nn.MSELoss()
+    loader = DataLoader(TensorDataset(*train), batch_size=BATCH_SIZE, shuffle=True)
+
+    for epoch in range(epochs):
+        model.train()
+        total = 0.0
+        for X, y, ids, sector in loader:
+            optimizer.zero_grad()
+            loss = criterion(model(X, drop_ids(ids), drop_ids(sector)), y)
+            loss.backward()
+            optimizer.step()
+            total += float(loss) * len(X)
+        print(f"epoch {epoch + 1}/{epochs}: train {total / len(train[0]):.4f}, "
+              f"val {evaluate(model, val, criterion)}")
+
+    model.eval()
+    example = (train[0][:1], train[2][:1], train[3][:1])
+    scripted = to_torchscript(model, example)
+    meta = {
+        'horizon': horizon,
+        'lookback': lookback,
+        'steps': list(steps),
+        'hidden_size': hidden_size,
+        'ticker_ids': ticker_ids,
+        'sector_ids': sector_ids,
+        'samples': int(len(train[0])),
+        'train_loss': evaluate(model, train, criterion),
+        'val_loss': evaluate(model, val, criterion),
+        'runtime_s': round(time.time() - start, 1)
+    }
+    store.save_script(GLOBAL_MODEL_OWNER, steps_key('GlobalLSTM', steps), scripted, meta)
+    return meta
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the global multi-ticker LSTM")
+    parser.add_argument('--tickers', nargs='+', default=None)
+    parser.add_argument('--universe', type=int, default=None, help="Use the first N NSE symbols")
+    parser.add_argument('--horizon', choices=('short', 'long'), default='short')
+    parser.add_argument('--period', default='5y')
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--hidden-size', type=int, default=HIDDEN_SIZE)
+    args = parser.parse_args()
+
+    torch.manual_seed(config.RANDOM_STATE)
+    collector = DataCollector()
+    tickers = args.tickers or [to_yahoo_symbol(t) for t in collector.nse_tickers]
+    if args.universe:
+        tickers = tickers[:args.universe]
+    frames = collector.get_bulk_stock_data(tickers, period=args.period)
+    sectors = {ticker: collector.sector(ticker) for ticker in frames}
+
+    meta = train_global(frames, sectors, args.horizon, epochs=args.epochs, hidden_size=args.hidden_size)
+    print(f"Saved global model: {meta['samples']} windows from {len(meta['ticker_ids'])} tickers, "
+          f"val loss {meta['val_loss']} ({meta['runtime_s']}s)")
+
+if __name__ == "__main__":
+    main()
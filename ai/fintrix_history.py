@@ -0,0 +1,190 @@
+"""Append-only history of scores, for charting a ticker over time.
+
+Every score the API or the nightly batch persists to stock_scores (which
+keeps only the latest one per ticker and horizon) is also appended to the
+score_history table: ticker, horizon, bar date (as_of), score and
+recommendation, the ensemble inputs and each model's own output. Rows are
+never updated or deleted.
+
+Writes are buffered and inserted by one background thread, one transaction
+per batch (HISTORY_BATCH_SIZE rows or HISTORY_FLUSH_INTERVAL_S seconds,
+whichever comes first), so a burst of analyses costs one fsync instead of
+one per result. A result identical to the last one appended for its
+ticker and horizon (a cached result served again) is skipped.
+
+query() reads a (ticker, horizon, as_of) range through the table's index.
+When the range holds more rows than requested points, it downsamples in
+SQL into equal-width date buckets, each reported as its last score with the
+bucket's min, max and mean, so a chart of years of history stays a few
+hundred rows and never touches the models.
+"""
+import os
+import json
+import math
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+COLUMNS = ('ticker', 'horizon', 'as_of', 'computed_at', 'score', 'recommendation', 'current_price',
+           'expected_return', 'volatility', 'engine', 'mode', 'model_outputs')
+
+class ScoreHistory:
+    def __init__(self, db_path, batch_size=200, flush_interval_s=2.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pending = []
+        self._last = {}  # (ticker, horizon) -> identity of the last appended result
+        self._thread = None
+        self._pid = None
+        self._stats = {'appended': 0, 'duplicates': 0, 'written': 0, 'flushes': 0, 'errors': 0}
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS score_history (
+                    id INTEGER PRIMARY KEY,
+                    ticker TEXT NOT NULL,
+                    horizon TEXT NOT NULL,
+                    as_of TEXT NOT NULL,
+                    computed_at TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    recommendation TEXT NOT NULL,
+                    current_price REAL,
+                    expected_return REAL,
+                    volatility REAL,
+                    engine TEXT,
+                    mode TEXT,
+                    model_outputs TEXT
+                );
+                CREATE INDEX IF NOT EXISTS ix_score_history_ticker_date
+                    ON score_history (ticker, horizon, as_of);
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def append(self, result):
+        """Queue a score_stock() result; unscored results are ignored"""
+        if result.get('current_price') is None or result.get('as_of') is None:
+            return
+        key = (result['ticker'], result['horizon'])
+        identity = (result['as_of'], result['score'], result['current_price'], result.get('engine'))
+        row = (
+            result['ticker'], result['horizon'], result['as_of'], datetime.now().isoformat(timespec='seconds'),
+            result['score'], result['recommendation'], result['current_price'], result['expected_return'],
+            result['volatility'], result.get('engine'), result.get('mode'),
+            json.dumps(result.get('model_outputs') or {})
+        )
+        with self._lock:
+            if self._pid != os.getpid():
+                # First append in this process (or after a fork): the parent's
+                # buffer and flusher thread aren't ours
+                self._pid = os.getpid()
+                self._pending = []
+                self._thread = threading.Thread(target=self._run, name='score-history', daemon=True)
+                self._thread.start()
+            if self._last.get(key) == identity:
+                self._stats['duplicates'] += 1
+                return
+            self._last[key] = identity
+            self._pending.append(row)
+            self._stats['appended'] += 1
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows in one transaction; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                with self._connect() as conn:
+                    conn.executemany(
+                        f"INSERT INTO score_history ({', '.join(COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(COLUMNS))})", rows
+                    )
+            except sqlite3.Error as e:
+                print(f"Score history: could not write {len(rows)} rows: {e}")
+                with self._lock:
+                    self._pending[:0] = rows  # retried on the next flush
+                    self._stats['errors'] += 1
+                return 0
+            with self._lock:
+                self._stats['written'] += len(rows)
+                self._stats['flushes'] += 1
+            return len(rows)
+
+    def close(self):
+        """Stop the flusher and write what is still buffered"""
+        self._stop.set()
+        self._wake.set()
+        return self.flush()
+
+    def query(self, ticker, horizon, start=None, end=None, points=None):
+        """Scores of a ticker between ``start`` and ``end`` (YYYY-MM-DD, inclusive), oldest first.
+
+        Returns (rows, downsampled). With ``points``, ranges holding more
+        rows are reduced to at most ``points`` date buckets; each bucket row
+        is its latest score plus ``count``, ``score_min``, ``score_max``,
+        ``score_mean`` and the bucket's first and last dates.
+        """
+        where = "ticker = ? AND horizon = ? AND as_of >= ? AND as_of <= ?"
+        args = (ticker, horizon, start or '0000-00-00', end or '9999-99-99')
+        with self._connect() as conn:
+            span = conn.execute(f"SELECT COUNT(*), MIN(as_of), MAX(as_of) FROM score_history WHERE {where}",
+                                args).fetchone()
+            count, first, last = span[0], span[1], span[2]
+            if not points or count <= points:
+                rows = conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM score_history WHERE {where} ORDER BY as_of, id", args
+                ).fetchall()
+                return [self._row(row) for row in rows], False
+            days = conn.execute("SELECT julianday(?) - julianday(?)", (last, first)).fetchone()[0]
+            width = max(1, math.ceil((days + 1) / points))
+            rows = conn.execute(f"""
+                SELECT * FROM (
+                    SELECT {', '.join(COLUMNS)},
+                           ROW_NUMBER() OVER (b ORDER BY as_of DESC, id DESC) AS rank,
+                           COUNT(*) OVER b AS count,
+                           MIN(score) OVER b AS score_min,
+                           MAX(score) OVER b AS score_max,
+                           AVG(score) OVER b AS score_mean,
+                           MIN(as_of) OVER b AS bucket_start,
+                           MAX(as_of) OVER b AS bucket_end
+                    FROM (SELECT *, CAST((julianday(as_of) - julianday(?)) / ? AS INTEGER) AS bucket
+                          FROM score_history WHERE {where})
+                    WINDOW b AS (PARTITION BY bucket)
+                ) WHERE rank = 1 ORDER BY bucket_start
+            """, (first, width) + args).fetchall()
+        return [self._row(row, exclude=('rank',)) for row in rows], True
+
+    @staticmethod
+    def _row(row, exclude=()):
+        row = {k: row[k] for k in row.keys() if k not in exclude}
+        row['model_outputs'] = json.loads(row['model_outputs']) if row['model_outputs'] else {}
+        return row
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
@@ -0,0 +1,124 @@
+"""CPU inference export for the sequence models.
+
+compile_for_cpu() turns a trained LSTMModel/TransformerModel into a TorchScript
+module with its LSTM and Linear layers dynamically quantized to int8. The
+result is only used if it stays within tolerance of the eager model on real
+input windows; otherwise the float TorchScript module (or the eager model
+itself) is used instead.
+
+Usage (accuracy check and benchmark for one ticker):
+    python fintrix_inference.py RELIANCE.NS --horizon short
+"""
+import argparse
+import copy
+import json
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+QUANTIZED_LAYERS = {nn.LSTM, nn.Linear}
+
+def steps_key(name, steps):
+    """Store name for a model trained for the given horizon checkpoints"""
+    if not steps:
+        return f"{name}-h1"
+    return f"{name}-h{len(steps)}x{steps[-1]}"
+
+def quantize(model):
+    """Copy of ``model`` with int8 dynamically quantized LSTM/Linear layers"""
+    model = copy.deepcopy(model).eval()
+    return torch.ao.quantization.quantize_dynamic(model, QUANTIZED_LAYERS, dtype=torch.qint8)
+
+def to_torchscript(model, example):
+    """Script the model, falling back to tracing for modules script can't handle"""
+    model.eval()
+    try:
+        return torch.jit.script(model)
+    except Exception:
+        with torch.no_grad():
+            return torch.jit.trace(model, example, check_trace=False)
+
+def max_abs_error(reference, candidate, inputs):
+    with torch.no_grad():
+        return float((reference(inputs) - candidate(inputs)).abs().max())
+
+def compile_for_cpu(model, sample_inputs, atol):
+    """Compile a trained sequence model for CPU inference.
+
+    ``sample_inputs`` are windows shaped (batch, lookback, 1) used both for
+    tracing and for the accuracy check against the eager model.
+    Returns (module, info) where info records the variant chosen and its error.
+    """
+    inputs = torch.as_tensor(np.asarray(sample_inputs), dtype=torch.float32)
+    example = inputs[:1]
+    model.eval()
+
+    candidates = (
+        ('torchscript-int8', lambda: to_torchscript(quantize(model), example)),
+        ('torchscript-fp32', lambda: to_torchscript(copy.deepcopy(model), example)),
+    )
+    for variant, build in candidates:
+        try:
+            compiled = build()
+            error = max_abs_error(model, compiled, inputs)
+        except Exception as e:
+            print(f"Could not build {variant}: {e}")
+            continue
+        if error <= atol:
+            return compiled, {'variant': variant, 'max_abs_error': error}
+        print(f"{variant} rejected: max abs error {error:.5f} > {atol}")
+    return model, {'variant': 'eager', 'max_abs_error': 0.0}
+
+def benchmark(model, inputs, iterations=200, warmup=20):
+    """Mean latency in milliseconds of one forward pass over ``inputs``"""
+    inputs = torch.as_tensor(np.asarray(inputs), dtype=torch.float32)
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(inputs)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            model(inputs)
+    return (time.perf_counter() - start) / iterations * 1000
+
+def main():
+    from fintrix_investment import StockAnalyzer, config, horizon_checkpoints
+
+    parser = argparse.ArgumentParser(description="Compile, verify and benchmark the sequence models for a ticker")
+    parser.add_argument('ticker')
+    parser.add_argument('--horizon', choices=('short', 'long'), default='short')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    analyzer = StockAnalyzer()
+    days = config.SHORT_TERM_DAYS if args.horizon == 'short' else config.LONG_TERM_DAYS
+    df = analyzer.data_collector.get_stock_data(args.ticker)
+
+    steps = horizon_checkpoints(days) if config.FORECAST_MODE == 'direct' else None
+    X_train, X_test, y_train, y_test, _ = analyzer.preprocessor.prepare_data(df, steps=steps)
+    if X_train is None:
+        print(f"Not enough data for {args.ticker}")
+        return
+
+    report = {}
+    for name, train in (('LSTM', analyzer.train_lstm), ('Transformer', analyzer.train_transformer)):
+        model = train(X_train, y_train, X_test, y_test, steps=steps)
+        compiled, info = compile_for_cpu(model, X_test, config.INFERENCE_ATOL)
+        single = X_test[-1:]
+        eager_ms = benchmark(model, single, args.iterations)
+        compiled_ms = benchmark(compiled, single, args.iterations)
+        info.update({
+            'eager_ms': round(eager_ms, 4),
+            'compiled_ms': round(compiled_ms, 4),
+            'speedup': round(eager_ms / compiled_ms, 2),
+            **model.fit_stats
+        })
+        if info['variant'] != 'eager':
+            analyzer.model_store.save_script(args.ticker, steps_key(name, steps), compiled, info)
+        report[name] = info
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Compact on-disk minute bars, memory-mapped range reads and resampling.
+
+Each ticker has three append-only column files under INTRADAY_DIR/<ticker>/:
+
+    time.i32     int32 epoch seconds (UTC) of the bar open
+    prices.f32   float32 open, high, low, close (4 per bar)
+    volume.d32   int32 volume deltas; every KEYFRAME-th row holds the raw
+                 volume, so any range decodes from its nearest keyframe
+
+That is 24 bytes per minute bar, so a month of the NSE universe fits in a few
+GB, and reads are np.memmap slices located with a binary search on the time
+column: only the pages in the requested range are touched.
+
+resample() aggregates minute arrays to 5m/15m/1h buckets aligned to the 09:15
+IST session open, or to daily bars, with reduceat over bucket boundaries.
+to_frame() gives the OHLCV DataFrame shape DataPreprocessor expects.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+KEYFRAME = 256
+IST_OFFSET_S = 19800  # +05:30
+SESSION_OPEN_MINUTE = 9 * 60 + 15
+RULES = {'1m': 1, '5m': 5, '15m': 15, '1h': 60, '1d': None}
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+
+def _to_epoch(value):
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    ts = pd.Timestamp(value)
+    if ts.tz is None:
+        ts = ts.tz_localize('Asia/Kolkata')
+    return int(ts.timestamp())
+
+def delta_encode(volume, first_row, previous=0):
+    """int32 deltas for rows starting at ``first_row``.
+
+    ``previous`` is the raw volume of the row before; rows on a KEYFRAME
+    boundary store the raw volume instead of a delta.
+    """
+    volume = np.asarray(volume, dtype=np.int64)
+    deltas = np.diff(volume, prepend=previous)
+    keyframes = (first_row + np.arange(len(volume))) % KEYFRAME == 0
+    deltas[keyframes] = volume[keyframes]
+    if np.abs(deltas).max(initial=0) > np.iinfo(np.int32).max:
+        raise ValueError("Volume delta does not fit in int32")
+    return deltas.astype(np.int32)
+
+def delta_decode(deltas, first_row):
+    """Raw volumes for rows starting at ``first_row`` (a KEYFRAME boundary)"""
+    total = np.cumsum(np.asarray(deltas, dtype=np.int64))
+    starts = np.flatnonzero((first_row + np.arange(len(total))) % KEYFRAME == 0)
+    if len(starts) == 0:
+        return total
+    # Each keyframe restarts the running sum: subtract what was reached before it
+    before = np.concatenate(([0], total[starts[1:] - 1]))
+    return total - np.repeat(before, np.diff(np.append(starts, len(total))))
+
+class IntradayStore:
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()  # appends only; reads are lock-free
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, ticker):
+        folder = os.path.join(self.root, ticker)
+        return (os.path.join(folder, 'time.i32'), os.path.join(folder, 'prices.f32'),
+                os.path.join(folder, 'volume.d32'))
+
+    def tickers(self):
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.exists(self._paths(name)[0]))
+
+    def _length(self, ticker):
+        """Rows present in every column (a torn append is ignored)"""
+        time_path, price_path, volume_path = self._paths(ticker)
+        if not os.path.exists(time_path):
+            return 0
+        return min(os.path.getsize(time_path) // 4, os.path.getsize(price_path) // 16,
+                   os.path.getsize(volume_path) // 4)
+
+    def _memmaps(self, ticker, n):
+        time_path, price_path, volume_path = self._paths(ticker)
+        return (np.memmap(time_path, dtype=np.int32, mode='r', shape=(n,)),
+                np.memmap(price_path, dtype=np.float32, mode='r', shape=(n, 4)),
+                np.memmap(volume_path, dtype=np.int32, mode='r', shape=(n,)))
+
+    def append(self, ticker, df):
+        """Append minute bars newer than the last stored one; returns rows written.
+
+        ``df`` is an OHLCV frame with a DatetimeIndex (as from get_minute_bars).
+        """
+        df = df.dropna(subset=['close']).sort_index()
+        df = df[~df.index.duplicated(keep='last')]
+        if df.empty:
+            return 0
+        index = df.index if df.index.tz is not None else df.index.tz_localize('Asia/Kolkata')
+        times = (index.asi8 // 10**9).astype(np.int64)
+        with self._lock:
+            n = self._length(ticker)
+            previous = 0
+            if n:
+                stored_time, _, stored_volume = self._memmaps(ticker, n)
+                keep = times > int(stored_time[-1])
+                start = (n - 1) // KEYFRAME * KEYFRAME
+                previous = int(delta_decode(stored_volume[start:], start)[-1])
+                df, times = df[keep], times[keep]
+            if not len(times):
+                return 0
+            if times.max() > np.iinfo(np.int32).max:
+                raise ValueError("Timestamp does not fit in int32")
+            volume = delta_encode(df['volume'].fillna(0).values, n, previous)
+            prices = df[list(PRICE_FIELDS)].values.astype(np.float32)
+
+            time_path, price_path, volume_path = self._paths(ticker)
+            os.makedirs(os.path.dirname(time_path), exist_ok=True)
+            # Truncate any torn tail, then write the time column last so readers
+            # never see a timestamp without its prices and volume
+            for path, width in ((time_path, 4), (price_path, 16), (volume_path, 4)):
+                if os.path.exists(path) and os.path.getsize(path) != n * width:
+                    os.truncate(path, n * width)
+            with open(price_path, 'ab') as f:
+                f.write(prices.tobytes())
+            with open(volume_path, 'ab') as f:
+                f.write(volume.tobytes())
+            with open(time_path, 'ab') as f:
+                f.write(times.astype(np.int32).tobytes())
+            return len(times)
+
+    def read(self, ticker, start=None, end=None):
+        """Minute bars in [start, end) as (times, prices, volume).
+
+        ``times`` and ``prices`` are read-only memmap slices (int32 epoch
+        seconds, float32 n x 4 OHLC); ``volume`` is decoded to int64. Bounds
+        are timestamps, date strings or epoch seconds; naive ones are IST.
+        """
+        n = self._length(ticker)
+        if n == 0:
+            return (np.empty(0, np.int32), np.empty((0, 4), np.float32), np.empty(0, np.int64))
+        times, prices, deltas = self._memmaps(ticker, n)
+        start, end = _to_epoch(start), _to_epoch(end)
+        lo = int(np.searchsorted(times, start, side='left')) if start is not None else 0
+        hi = int(np.searchsorted(times, end, side='left')) if end is not None else n
+        keyframe = lo // KEYFRAME * KEYFRAME
+        volume = delta_decode(deltas[keyframe:hi], keyframe)[lo - keyframe:]
+        return times[lo:hi], prices[lo:hi], volume
+
+    def bars(self, ticker, rule='1m', start=None, end=None):
+        """Resampled OHLCV DataFrame for [start, end)"""
+        return to_frame(*resample(*self.read(ticker, start, end), rule))
+
+def resample(times, prices, volume, rule):
+    """Aggregate minute bars (sorted by time) into ``rule`` buckets.
+
+    Intraday buckets are aligned to the 09:15 IST open (so 1h bars are
+    09:15-10:15, ...); '1d' buckets are IST calendar days stamped at midnight
+    IST, like Yahoo's daily bars. Returns arrays in the same layout.
+    """
+    if rule not in RULES:
+        raise ValueError(f"Unknown rule {rule}; expected one of {', '.join(RULES)}")
+    if len(times) == 0 or rule == '1m':
+        return np.asarray(times), np.asarray(prices), np.asarray(volume)
+    local = np.asarray(times, dtype=np.int64) + IST_OFFSET_S
+    day = local // 86400
+    width = RULES[rule]
+    if width is None:
+        slot = np.zeros_like(day)
+    else:
+        slot = (local % 86400 // 60 - SESSION_OPEN_MINUTE) // width
+    bucket = day * 10000 + slot
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+    ends = np.append(starts[1:], len(bucket)) - 1
+
+    prices = np.asarray(prices)
+    out = np.empty((len(starts), 4), dtype=np.float32)
+    out[:, 0] = prices[starts, 0]
+    out[:, 1] = np.maximum.reduceat(prices[:, 1], starts)
+    out[:, 2] = np.minimum.reduceat(prices[:, 2], starts)
+    out[:, 3] = prices[ends, 3]
+    bucket_volume = np.add.reduceat(np.asarray(volume, dtype=np.int64), starts)
+    if width is None:
+        local_start = day[starts] * 86400
+    else:
+        local_start = day[starts] * 86400 + (SESSION_OPEN_MINUTE + slot[starts] * width) * 60
+    return (local_start - IST_OFFSET_S).astype(np.int32), out, bucket_volume
+
+def to_frame(times, prices, volume):
+    """OHLCV DataFrame (lower-case columns, IST index) from bar arrays"""
+    index = pd.to_datetime(np.asarray(times, dtype=np.int64), unit='s', utc=True).tz_convert('Asia/Kolkata')
+    df = pd.DataFrame(np.asarray(prices), index=index, columns=list(PRICE_FIELDS))
+    df['volume'] = np.asarray(volume)
+    df.index.name = 'Datetime'
+    return df
@@ -1,5 +1,9 @@
 import os
+import threading
+import time
 import warnings
+from collections import OrderedDict
+from functools import partial
 import numpy as np
 import pandas as pd
 import yfinance as yf
@@ -16,6 +20,20 @@ from arch import arch_model
 import torch
 import torch.nn as nn
 from torch.utils.data import Dataset, DataLoader
+from numpy.lib.stride_tricks import sliding_window_view
+
+from fintrix_model_store import ModelStore
+from fintrix_inference import compile_for_cpu, steps_key
+from fintrix_resources import ResourceGovernor
+from fintrix_cache import ResultCache
+from fintrix_drift import DriftMonitor, RetrainScheduler
+from fintrix_risk import RiskEngine, garch_state, risk_report
+import fintrix_trend
+from fintrix_latency import MODEL_ORDER, ModelCostTracker, load_contributions, plan_models
+from fintrix_quotes import QuoteService, make_adapter
+from fintrix_intraday import IntradayStore
+from fintrix_panel import DTYPE, compact_frame
+from fintrix_calendar import session_date
 
 warnings.filterwarnings('ignore')
 plt.style.use('ggplot')
@@ -33,72 +51,360 @@ class Config:
     LOOKBACK_WINDOW = 60  # days for sequence models
     TEST_SIZE = 0.2
     RANDOM_STATE = 42
+    # Defaults; fintrix_tuning.py saves per-ticker and per-sector overrides
+    MODEL_PARAMS = {
+        'LSTM': {'lookback': LOOKBACK_WINDOW, 'hidden_size': 50, 'num_layers': 2},
+        'Transformer': {'lookback': LOOKBACK_WINDOW},
+        'XGBoost': {'lookback': LOOKBACK_WINDOW, 'max_depth': 3, 'learning_rate': 0.1},
+        'Prophet': {'changepoint_prior_scale': 0.05},
+    }
     
     # Budget constraints (will be set by user)
     MIN_BUDGET = 1000  # INR
     MAX_BUDGET = 100000  # INR
     
+    # Forecasting
+    FORECAST_MODE = 'direct'  # 'direct': whole horizon in one forward pass, 'recursive': one step at a time
+    MAX_HORIZON_OUTPUTS = 32  # horizon checkpoints emitted by the direct heads
+    
+    # Sequence model training (fit_sequence_model): mini-batch Adam, stopped
+    # once the test split's loss hasn't improved for SEQUENCE_PATIENCE epochs
+    SEQUENCE_MAX_EPOCHS = 300
+    SEQUENCE_BATCH_SIZE = 64
+    SEQUENCE_PATIENCE = 15
+    SEQUENCE_LEARNING_RATE = 0.001
+    
+    # CPU inference: TorchScript + int8 dynamic quantization (see fintrix_inference.py)
+    USE_COMPILED_INFERENCE = True
+    INFERENCE_ATOL = 0.01  # max abs error vs the eager model, in scaled (0-1) units
+    
+    # Seasonal ensemble member: 'prophet', or 'trend' for the closed-form engine
+    # in fintrix_trend.py (selectable per analysis)
+    SEASONAL_ENGINE = os.getenv('FINTRIX_SEASONAL_ENGINE', 'prophet')
+    
+    # Serve 'LSTM' from the global multi-ticker model when one is trained (see fintrix_global.py)
+    USE_GLOBAL_LSTM = True
+    
+    # CPU governance (see fintrix_resources.py); None = half the cores
+    MAX_HEAVY_JOBS = None
+    
+    # Prefork server (see fintrix_server.py): daily histories preloaded before forking
+    SERVER_PRELOAD_TICKERS = 500
+    
+    # Warm-up after startup (see fintrix_warmup.py); None = most requested tickers,
+    # topped up with DataCollector.FALLBACK_NSE_TICKERS
+    WARMUP_ENABLED = os.getenv('FINTRIX_WARMUP', '1') != '0'
+    WARMUP_TICKERS = None
+    WARMUP_SIZE = 20
+    WARMUP_LOOKBACK_DAYS = 14  # request history used to rank tickers
+    
+    # Drift-triggered retraining (see fintrix_drift.py)
+    RETRAIN_ENABLED = True
+    DRIFT_PSI_THRESHOLD = 0.25
+    DRIFT_MIN_BARS = 20  # new bars since training before drift is measured
+    DRIFT_REFERENCE_BARS = 250
+    DRIFT_CHECK_INTERVAL_S = 300  # per ticker, unless a newer bar arrives
+    FORECAST_ERROR_WINDOW = 20
+    FORECAST_ERROR_MIN = 10  # scored forecasts needed before error can trigger
+    FORECAST_ERROR_THRESHOLDS = {'LSTM': 0.03, 'Transformer': 0.03, 'Prophet': 0.04, 'Trend': 0.04,
+                                 'XGBoost': 0.3}
+    RETRAIN_INTERVAL_S = 60
+    RETRAIN_BATCH_SIZE = 8  # tickers per batch
+    
+    # Monte Carlo risk bands (see fintrix_risk.py)
+    RISK_PATHS = 10000
+    RISK_CACHE_SIZE = 256  # simulated (ticker, fit, horizon) entries
+    
+    # Batch analysis
+    BATCH_MAX_TICKERS = 50
+    BATCH_MAX_WORKERS = 4
+    
+    # Live quotes (see fintrix_quotes.py): 'yahoo', 'poll', 'replay:<csv>' or 'off'
+    QUOTE_SOURCE = os.getenv('FINTRIX_QUOTE_SOURCE', 'yahoo')
+    QUOTE_MAX_AGE_S = 60  # while the market is open
+    QUOTE_POLL_INTERVAL_S = 15
+    
+    # Intraday minute bars (see fintrix_intraday.py); Yahoo serves 1m bars for the last 7 days
+    INTRADAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'intraday')
+    INTRADAY_FETCH_PERIOD = '7d'
+    
+    # Portfolio allocation (see fintrix_portfolio.py)
+    PORTFOLIO_RISK_AVERSION = 4.0
+    PORTFOLIO_MAX_WEIGHT = 0.2  # per ticker, as a fraction of the budget
+    PORTFOLIO_MAX_TICKERS = 2000
+    PORTFOLIO_HISTORY_DAYS = 250  # daily closes for the correlation estimate
+    
+    # Storage (same SQLite file the Flask app uses)
+    DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'tasks.db')
+    SCORE_MAX_AGE_HOURS = 72  # upper bound; scores also expire at the next session close
+    BACKTEST_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'backtest_report.json')
+    RESULT_CACHE_SIZE = 1024  # in-process LRU entries; the SQLite tier is unbounded
+    MODEL_CACHE_SIZE = 512  # trained models kept per process (LRU); a Prophet fit holds its history
+    HISTORY_BATCH_SIZE = 200  # score history rows per insert transaction (see fintrix_history.py)
+    HISTORY_FLUSH_INTERVAL_S = 2
+    HISTORY_MAX_POINTS = 5000  # per /api/finance/history response
+    MODEL_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'models')
+    SECTORS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'sectors.csv')  # ticker,sector
+    
 config = Config()
+governor = ResourceGovernor(config.MAX_HEAVY_JOBS)
+
+GLOBAL_MODEL_OWNER = '_global'  # model store owner of the multi-ticker models
+
+def sector_owner(sector):
+    """Model store owner name for parameters tuned on a whole sector"""
+    return f"sector-{sector}"
+
+def params_tag(name, params):
+    """Model cache/store key suffix for parameters that differ from the defaults"""
+    defaults = config.MODEL_PARAMS.get(name, {})
+    return ''.join(f"-{k}{v}" for k, v in sorted(params.items()) if defaults.get(k) != v)
+
+def horizon_name(days):
+    """'short' or 'long': the horizon a forecast of ``days`` steps belongs to"""
+    return 'short' if days <= config.SHORT_TERM_DAYS else 'long'
+
+def horizon_checkpoints(days, max_outputs=None):
+    """Forecast steps predicted directly by the multi-output heads.
+    
+    Short horizons get every step; long ones get geometrically spaced
+    checkpoints (dense near term, sparse far out) and are interpolated.
+    """
+    max_outputs = max_outputs or config.MAX_HORIZON_OUTPUTS
+    if days <= max_outputs:
+        return tuple(range(1, days + 1))
+    steps = np.unique(np.round(np.geomspace(1, days, max_outputs)).astype(int))
+    return tuple(int(step) for step in steps)
 
 class DataCollector:
-    def __init__(self):
-        self.nse_tickers = self._load_nse_tickers() 
-        self.bse_tickers = self._load_bse_tickers() 
+    FALLBACK_NSE_TICKERS = ('RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'HDFC.NS')
+
+    def __init__(self, load_tickers=True, quotes=None):
+        # Worker processes that are handed their data skip the symbol download
+        self.nse_tickers = self._load_nse_tickers() if load_tickers else []
+        self.bse_tickers = self._load_bse_tickers() if load_tickers else []
+        self.last_bar_dates = {}  # ticker -> 'YYYY-MM-DD' of the newest daily bar seen
+        self._bar_listeners = []
+        self.quotes = quotes  # QuoteService; None = poll Yahoo on every lookup
+        self._intraday = None
+        self._sectors = None
+        self.panel = None  # PricePanel preloaded by the server master, see attach_panel
+        self._panel_period = None
+        self._panel_as_of = None
+        
+    def start_quotes(self, source=None):
+        """Serve get_current_price from a live QuoteService (no-op if source is 'off')"""
+        adapter = make_adapter(source or config.QUOTE_SOURCE, config.QUOTE_POLL_INTERVAL_S)
+        if adapter is None or self.quotes is not None:
+            return self.quotes
+        self.quotes = QuoteService(adapter, fallback=self.poll_current_quote,
+                                   max_age_s=config.QUOTE_MAX_AGE_S,
+                                   poll_interval_s=config.QUOTE_POLL_INTERVAL_S).start()
+        return self.quotes
+        
+    def add_bar_listener(self, callback):
+        """Call callback(ticker, bar_date) whenever a newer daily bar is seen"""
+        self._bar_listeners.append(callback)
+        
+    def _observe_bars(self, ticker, df):
+        if df is None or df.empty:
+            return
+        bar_date = df.index[-1].strftime('%Y-%m-%d')
+        previous = self.last_bar_dates.get(ticker)
+        if previous is not None and bar_date <= previous:
+            return
+        self.last_bar_dates[ticker] = bar_date
+        for callback in self._bar_listeners:
+            try:
+                callback(ticker, bar_date)
+            except Exception as e:
+                print(f"Bar listener failed for {ticker}: {e}")
         
     def _load_nse_tickers(self):
         try:
             df = pd.read_csv(config.NSE_TICKERS_URL)
             return df['SYMBOL'].unique().tolist()
         except:
-            return ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'HDFC.NS']
+            return list(self.FALLBACK_NSE_TICKERS)
         
     def _load_bse_tickers(self):
         # BSE data is harder to get for free, using common tickers
         return ['RELIANCE.BO', 'TCS.BO', 'HDFCBANK.BO', 'INFY.BO']
     
+    def attach_panel(self, panel, period='5y'):
+        """Serve get_stock_data(ticker, period) from a preloaded PricePanel while it is current"""
+        last = pd.Timestamp(panel.dates[-1])
+        if panel.tz:
+            last = last.tz_localize('UTC').tz_convert(panel.tz)
+        self.panel, self._panel_period, self._panel_as_of = panel, period, last.date()
+        
+    def _from_panel(self, ticker, period):
+        return (self.panel is not None and period == self._panel_period and ticker in self.panel
+                and self._panel_as_of >= session_date())
+    
     def get_stock_data(self, ticker, period='5y'):
-        """Get historical data from Yahoo Finance"""
+        """Get historical data from Yahoo Finance (or the preloaded panel, while current).
+        
+        Both sources give the same frame: float32 prices and float64 volume on the date index.
+        """
+        if self._from_panel(ticker, period):
+            df = self.panel.frame(ticker)
+            self._observe_bars(ticker, df)
+            return df
         try:
             stock = yf.Ticker(ticker)
             df = stock.history(period=period)
             df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
             df.columns = [col.lower() for col in df.columns]
+            df = compact_frame(df)
+            self._observe_bars(ticker, df)
             return df
         except Exception as e:
             print(f"Error fetching data for {ticker}: {e}")
             return None
     
+    def sector(self, ticker):
+        """Sector from config.SECTORS_PATH (ticker,sector CSV), or None"""
+        if self._sectors is None:
+            sectors = {}
+            if os.path.exists(config.SECTORS_PATH):
+                table = pd.read_csv(config.SECTORS_PATH)
+                sectors = dict(zip(table['ticker'].str.upper().str.strip(), table['sector']))
+            self._sectors = sectors
+        return self._sectors.get(ticker)
+    
+    @property
+    def intraday(self):
+        if self._intraday is None:
+            self._intraday = IntradayStore(config.INTRADAY_DIR)
+        return self._intraday
+    
+    def get_minute_bars(self, ticker, period=None):
+        """Fetch recent 1-minute bars and append the new ones to the intraday store"""
+        try:
+            df = yf.Ticker(ticker).history(period=period or config.INTRADAY_FETCH_PERIOD, interval='1m')
+            df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
+            df.columns = [col.lower() for col in df.columns]
+            self.intraday.append(ticker, df)
+            return df
+        except Exception as e:
+            print(f"Error fetching minute bars for {ticker}: {e}")
+            return None
+    
+    def get_intraday_data(self, ticker, rule='5m', start=None, end=None, refresh=True):
+        """Intraday OHLCV bars ('1m', '5m', '15m', '1h' or '1d') from the store.
+        
+        Same columns as get_stock_data, so it can be passed to the preprocessor
+        and models in place of daily history.
+        """
+        if refresh:
+            self.get_minute_bars(ticker)
+        df = self.intraday.bars(ticker, rule, start, end)
+        return compact_frame(df) if not df.empty else None
+    
+    def get_bulk_stock_data(self, tickers, period='5y'):
+        """Get historical data for many tickers with one Yahoo Finance request.
+        
+        Returns {ticker: DataFrame} in the same shape (see compact_frame) as
+        get_stock_data; tickers without data are left out.
+        """
+        frames = {}
+        try:
+            raw = yf.download(tickers, period=period, group_by='ticker',
+                              auto_adjust=True, threads=True, progress=False)
+        except Exception as e:
+            print(f"Error fetching bulk data: {e}")
+            return frames
+        for ticker in tickers:
+            try:
+                df = raw[ticker] if isinstance(raw.columns, pd.MultiIndex) else raw
+                df = df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna(how='all')
+                df.columns = [col.lower() for col in df.columns]
+                if not df.empty:
+                    df = compact_frame(df)
+                    frames[ticker] = df
+                    self._observe_bars(ticker, df)
+            except KeyError:
+                continue
+        return frames
+    
+    def get_closes(self, tickers, days):
+        """(days x tickers) daily closes, sliced from the preloaded panel while it is current.
+        
+        Only tickers missing from the panel are downloaded (one bulk request).
+        """
+        panel_ok = self.panel is not None and self._panel_as_of >= session_date()
+        cached = [t for t in tickers if panel_ok and t in self.panel]
+        columns = [self.panel.closes(cached, days)] if cached else []
+        missing = [t for t in tickers if t not in set(cached)]
+        if missing:
+            frames = self.get_bulk_stock_data(missing, period='1y' if days <= 250 else '5y')
+            downloaded = pd.DataFrame({t: df['close'] for t, df in frames.items()})
+            if not downloaded.empty:
+                columns.append(downloaded)
+        if not columns:
+            return pd.DataFrame()
+        return pd.concat(columns, axis=1).sort_index().tail(days)
+    
     def get_current_price(self, ticker):
-        """Get current market price"""
+        """Get current market price, from the live quote table when one is attached"""
+        if self.quotes is not None:
+            return self.quotes.price(ticker)
+        return self.poll_current_price(ticker)
+        
+    def poll_current_price(self, ticker):
+        """Get current market price with a Yahoo Finance request"""
+        quote = self.poll_current_quote(ticker)
+        return quote[0] if quote is not None else None
+
+    def poll_current_quote(self, ticker):
+        """(last price, epoch time of the bar it came from) with a Yahoo Finance request, or None"""
         try:
             stock = yf.Ticker(ticker)
-            data = stock.history(period='1d')
-            return data['Close'].iloc[-1]
+            close = stock.history(period='1d', interval='1m')['Close'].dropna()
+            return float(close.iloc[-1]), close.index[-1].timestamp()
         except:
             return None
 
+TABULAR_FEATURES = ['returns', 'volatility', 'ma_10', 'ma_50', 'momentum', 'volume']
+PRICE_MODELS = ('LSTM', 'Transformer', 'Prophet')
+SEASONAL_ENGINES = {'prophet': 'Prophet', 'trend': 'Trend'}  # engine -> model serving the 'Prophet' member
+
 class DataPreprocessor:
-    def __init__(self):
-        self.scaler = MinMaxScaler(feature_range=(0, 1))
+    """Stateless: every fitted object (e.g. the scaler) is returned to the caller,
+    so one instance can be shared by concurrent requests."""
+    
+    def prepare_data(self, df, target_col='close', lookback=60, steps=None):
+        """Prepare data for time series models.
         
-    def prepare_data(self, df, target_col='close', lookback=60):
-        """Prepare data for time series models"""
+        With ``steps`` (e.g. from horizon_checkpoints) each target row holds
+        the values 1..N steps after the window, for direct multi-horizon heads;
+        otherwise the target is the next value.
+        
+        Returns (X_train, X_test, y_train, y_test, scaler), the scaler being
+        fitted to this frame only. The arrays are contiguous float32, ready
+        for torch.from_numpy.
+        """
         if df is None or len(df) < lookback * 2:
-            return None, None, None, None
+            return None, None, None, None, None
         
         # Create target variable
-        data = df[[target_col]].values
+        data = df[[target_col]].to_numpy(DTYPE)
         
         # Scale data
-        data_scaled = self.scaler.fit_transform(data)
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        data_scaled = scaler.fit_transform(data).astype(DTYPE, copy=False)[:, 0]
         
-        # Create sequences
-        X, y = [], []
-        for i in range(lookback, len(data_scaled)):
-            X.append(data_scaled[i-lookback:i, 0])
-            y.append(data_scaled[i, 0])
-            
-        X, y = np.array(X), np.array(y)
+        # Create sequences: sample i is the window before bar i
+        offsets = np.array(steps if steps is not None else (1,)) - 1
+        i = np.arange(lookback, len(data_scaled) - offsets[-1])
+        if steps is not None and len(i) < lookback:
+            # Too little history for targets this far out
+            return None, None, None, None, None
+        X = sliding_window_view(data_scaled, lookback)[i - lookback]
+        y = data_scaled[i[:, None] + offsets[None, :]]
+        if steps is None:
+            y = y[:, 0]
         
         # Split into train/test
         split = int(len(X) * (1 - config.TEST_SIZE))
@@ -109,14 +415,19 @@ class DataPreprocessor:
         X_train = X_train.reshape(X_train.shape[0], X_train.shape[1], 1)
         X_test = X_test.reshape(X_test.shape[0], X_test.shape[1], 1)
         
-        return X_train, X_test, y_train, y_test
+        return X_train, X_test, y_train, y_test, scaler
     
-    def prepare_tabular_data(self, df, target_col='close', lookback=60):
-        """Prepare data for XGBoost and other tabular models"""
-        if df is None or len(df) < lookback * 2:
-            return None, None, None, None
+    def latest_window(self, df, scaler, target_col='close', lookback=60):
+        """Most recent window scaled with prepare_data's scaler, shaped (1, lookback, 1)"""
+        data = scaler.transform(df[[target_col]].to_numpy(DTYPE)[-lookback:])
+        return data.astype(DTYPE, copy=False).reshape(1, lookback, 1)
+    
+    def tabular_features(self, df, target_col='close', lookback=60):
+        """Feature frame for tabular models, plus the next-day direction target.
         
-        # Create features
+        Every feature on a row only uses data up to that row, so the frame can
+        be computed once and sliced by date (e.g. by the backtester).
+        """
         df = df.copy()
         df['returns'] = df[target_col].pct_change()
         df['volatility'] = df['returns'].rolling(5).std()
@@ -129,10 +440,17 @@ class DataPreprocessor:
         
         # Target is next day's return (for classification)
         df['target'] = (df[target_col].shift(-1) > df[target_col]).astype(int)
+        return df
+    
+    def prepare_tabular_data(self, df, target_col='close', lookback=60):
+        """Prepare data for XGBoost and other tabular models"""
+        if df is None or len(df) < lookback * 2:
+            return None, None, None, None
+        
+        df = self.tabular_features(df, target_col, lookback)
         
         # Features and target
-        features = ['returns', 'volatility', 'ma_10', 'ma_50', 'momentum', 'volume']
-        X = df[features]
+        X = df[TABULAR_FEATURES]
         y = df['target']
         
         # Split
@@ -141,6 +459,36 @@ class DataPreprocessor:
         y_train, y_test = y[:split], y[split:]
         
         return X_train, X_test, y_train, y_test
+    
+    def log_return_scale(self, close):
+        """Per-ticker input scale for the global model: std of daily log returns"""
+        returns = np.diff(np.log(np.asarray(close, dtype=np.float64)))
+        return max(float(np.std(returns)), 1e-4) if len(returns) > 1 else 0.02
+    
+    def relative_windows(self, close, lookback, steps, stride=1):
+        """Training windows for the global model, scaled per ticker.
+        
+        Inputs and targets are log(price / last price in the window) divided
+        by log_return_scale, so every ticker lands on the same scale. Returns
+        (X shaped (n, lookback, 1), y shaped (n, len(steps)), scale).
+        """
+        log_close = np.log(np.asarray(close, dtype=np.float64))
+        scale = self.log_return_scale(close)
+        steps = np.asarray(steps)
+        i = np.arange(lookback, len(log_close) - steps[-1] + 1, stride)
+        windows = sliding_window_view(log_close, lookback)[i - lookback]
+        anchor = windows[:, -1:]
+        X = (windows - anchor) / scale
+        y = (log_close[(i - 1)[:, None] + steps[None, :]] - anchor) / scale
+        return X[..., None].astype(np.float32), y.astype(np.float32), scale
+    
+    def relative_latest_window(self, close, lookback):
+        """Most recent window scaled like relative_windows, shaped (1, lookback, 1), and its scale"""
+        log_close = np.log(np.asarray(close, dtype=np.float64))
+        scale = self.log_return_scale(close)
+        window = (log_close[-lookback:] - log_close[-1]) / scale
+        return window.reshape(1, lookback, 1).astype(np.float32), scale
+
 class LSTMModel(nn.Module):
     def __init__(self, input_size=1, hidden_size=50, num_layers=2, output_size=1):
         super().__init__()
@@ -156,6 +504,30 @@ class LSTMModel(nn.Module):
         out = self.fc(out[:, -1, :])
         return out
 
+class GlobalLSTMModel(nn.Module):
+    """LSTMModel trained on windows pooled from every ticker.
+    
+    Learned ticker and sector embeddings are appended to each time step;
+    id 0 is reserved for tickers (or sectors) not seen in training.
+    """
+    def __init__(self, num_tickers, num_sectors, ticker_dim=16, sector_dim=4,
+                 hidden_size=64, num_layers=2, output_size=1):
+        super().__init__()
+        self.hidden_size = hidden_size
+        self.num_layers = num_layers
+        self.ticker_embedding = nn.Embedding(num_tickers + 1, ticker_dim)
+        self.sector_embedding = nn.Embedding(num_sectors + 1, sector_dim)
+        self.lstm = nn.LSTM(1 + ticker_dim + sector_dim, hidden_size, num_layers, batch_first=True)
+        self.fc = nn.Linear(hidden_size, output_size)
+        
+    def forward(self, x, ticker_ids, sector_ids):
+        context = torch.cat([self.ticker_embedding(ticker_ids), self.sector_embedding(sector_ids)], dim=1)
+        x = torch.cat([x, context.unsqueeze(1).expand(-1, x.size(1), -1)], dim=2)
+        h0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
+        c0 = torch.zeros(self.num_layers, x.size(0), self.hidden_size)
+        out, _ = self.lstm(x, (h0, c0))
+        return self.fc(out[:, -1, :])
+
 class TransformerModel(nn.Module):
     def __init__(self, input_size=1, num_layers=2, nhead=1, dim_feedforward=64, output_size=1):
         super().__init__()
@@ -172,68 +544,166 @@ class TransformerModel(nn.Module):
         x = self.decoder(x)
         return x
     
+def fit_sequence_model(model, X_train, y_train, X_val=None, y_val=None, max_epochs=None):
+    """Train an LSTM/Transformer in place with mini-batch Adam and early stopping.
+    
+    The best epoch is judged on (X_val, y_val), or on the training loss when
+    there is no validation set, and its weights are restored. Returns
+    {'epochs', 'train_loss', 'val_loss'} and leaves the model in eval mode.
+    """
+    max_epochs = max_epochs or config.SEQUENCE_MAX_EPOCHS
+    X_train = torch.from_numpy(X_train)  # float32 from prepare_data: no copy
+    y_train = torch.from_numpy(y_train).view(len(X_train), -1)
+    validate = X_val is not None and len(X_val) > 0
+    if validate:
+        X_val = torch.from_numpy(X_val)
+        y_val = torch.from_numpy(y_val).view(len(X_val), -1)
+    criterion = nn.MSELoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=config.SEQUENCE_LEARNING_RATE)
+    generator = torch.Generator().manual_seed(config.RANDOM_STATE)
+    batch_size = config.SEQUENCE_BATCH_SIZE
+    
+    best, best_state, best_epoch, train_loss = np.inf, None, 0, np.nan
+    for epoch in range(1, max_epochs + 1):
+        model.train()
+        total = 0.0
+        for batch in torch.randperm(len(X_train), generator=generator).split(batch_size):
+            optimizer.zero_grad()
+            loss = criterion(model(X_train[batch]), y_train[batch])
+            loss.backward()
+            optimizer.step()
+            total += float(loss) * len(batch)
+        train_loss = total / len(X_train)
+        if validate:
+            model.eval()
+            with torch.no_grad():
+                loss = float(criterion(model(X_val), y_val))
+        else:
+            loss = train_loss
+        if loss < best:
+            best, best_epoch = loss, epoch
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+        elif epoch - best_epoch >= config.SEQUENCE_PATIENCE:
+            break
+    
+    if best_state is not None:
+        model.load_state_dict(best_state)
+    model.eval()
+    return {'epochs': best_epoch, 'train_loss': round(train_loss, 6),
+            'val_loss': round(best, 6) if validate else None}
+    
 class StockAnalyzer:
-    def __init__(self):
-        self.data_collector = DataCollector()
+    """Re-entrant: one instance can serve concurrent requests.
+    
+    Per-call state (frames, scalers) lives in local variables. Fitted models
+    go into a per-ticker cache whose entries are never mutated after
+    insertion (a retrain replaces the entry), so threads can share them for
+    inference without a lock around the analysis. Models are refitted only
+    when the drift monitor finds them stale (see fintrix_drift.py).
+    """
+    def __init__(self, data_collector=None):
+        self.data_collector = data_collector or DataCollector()
         self.preprocessor = DataPreprocessor()
-        self.models = {
-            'LSTM': None,
-            'Transformer': None,
-            'XGBoost': None,
-            'Prophet': None,
-            'GARCH': None
-        }
+        self.model_store = ModelStore(config.MODEL_STORE_DIR)
+        self._model_cache = OrderedDict()  # (ticker, model key) -> trained model, least recently used first
+        self._model_cache_lock = threading.Lock()
+        self.model_cache_size = config.MODEL_CACHE_SIZE
+        self.result_cache = ResultCache(config.DB_PATH, config.RESULT_CACHE_SIZE)
+        self.data_collector.add_bar_listener(self.result_cache.on_new_bar)
+        self.cost_tracker = ModelCostTracker()
+        self.drift = DriftMonitor(
+            config.DB_PATH, config.DRIFT_PSI_THRESHOLD, config.FORECAST_ERROR_THRESHOLDS,
+            config.FORECAST_ERROR_WINDOW, config.FORECAST_ERROR_MIN, config.DRIFT_MIN_BARS,
+            config.DRIFT_REFERENCE_BARS, config.DRIFT_CHECK_INTERVAL_S
+        )
+        self.retrainer = RetrainScheduler(self.retrain, config.RETRAIN_INTERVAL_S, config.RETRAIN_BATCH_SIZE)
+        self._built_at = {}  # (ticker, model name) -> when this process last fitted it
+        self.risk = RiskEngine(config.RISK_CACHE_SIZE, config.RISK_PATHS, config.RANDOM_STATE)
         
-    def train_lstm(self, X_train, y_train, epochs=20):
-        model = LSTMModel()
-        criterion = nn.MSELoss()
-        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    def model_cache_stats(self):
+        with self._model_cache_lock:
+            return {'entries': len(self._model_cache), 'capacity': self.model_cache_size}
         
-        X_train = torch.FloatTensor(X_train)
-        y_train = torch.FloatTensor(y_train).view(-1, 1)
+    def start_retraining(self):
+        """Refit stale models in the background (Config.RETRAIN_ENABLED)"""
+        if config.RETRAIN_ENABLED:
+            self.retrainer.start()
+        return self.retrainer
         
-        for epoch in range(epochs):
-            optimizer.zero_grad()
-            outputs = model(X_train)
-            loss = criterion(outputs, y_train)
-            loss.backward()
-            optimizer.step()
-            
-        self.models['LSTM'] = model
+    def _cached_model(self, ticker, key, build, refresh=False):
+        """Return the cached model for (ticker, key), building it on a miss.
+        
+        Training runs outside the lock; if two threads miss at once, the first
+        model inserted wins and both use it. ``refresh`` builds and replaces
+        the cached model unconditionally. The cache is an LRU of
+        Config.MODEL_CACHE_SIZE models, so a long-lived worker stays bounded.
+        """
+        with self._model_cache_lock:
+            model = None if refresh else self._model_cache.get((ticker, key))
+            if model is not None:
+                self._model_cache.move_to_end((ticker, key))
+        if model is None:
+            model = build()
+            with self._model_cache_lock:
+                if refresh or (ticker, key) not in self._model_cache:
+                    self._cache_model(ticker, key, model)
+                else:
+                    model = self._model_cache[(ticker, key)]
+                self._built_at[(ticker, key.split('-')[0])] = time.time()
         return model
     
-    def train_transformer(self, X_train, y_train, epochs=20):
-        model = TransformerModel()
-        criterion = nn.MSELoss()
-        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    def _cache_model(self, ticker, key, model):
+        """Insert as most recently used and evict beyond model_cache_size; hold the lock"""
+        self._model_cache[(ticker, key)] = model
+        self._model_cache.move_to_end((ticker, key))
+        while len(self._model_cache) > self.model_cache_size:
+            self._model_cache.popitem(last=False)
         
-        X_train = torch.FloatTensor(X_train)
-        y_train = torch.FloatTensor(y_train).view(-1, 1)
+    def _evict(self, ticker, name):
+        """Drop this process's fits of a model that another process retrained"""
+        with self._model_cache_lock:
+            for key in [k for k in self._model_cache if k[0] == ticker and k[1].split('-')[0] == name]:
+                del self._model_cache[key]
+            self._built_at.pop((ticker, name), None)
         
-        for epoch in range(epochs):
-            optimizer.zero_grad()
-            outputs = model(X_train)
-            loss = criterion(outputs, y_train)
-            loss.backward()
-            optimizer.step()
-            
-        self.models['Transformer'] = model
+    def model_params(self, ticker, name, horizon='short'):
+        """Hyperparameters for a model: config defaults, overridden by values
+        tuned at ``horizon`` for the ticker's sector and then for the ticker itself"""
+        params = dict(config.MODEL_PARAMS.get(name, {}))
+        sector = self.data_collector.sector(ticker)
+        for owner in ([sector_owner(sector)] if sector else []) + [ticker]:
+            tuned = self.model_store.load_params(owner, horizon).get(name)
+            if tuned:
+                params.update(tuned['params'])
+        return params
+        
+    def train_lstm(self, X_train, y_train, X_val=None, y_val=None, steps=None, hidden_size=50, num_layers=2):
+        model = LSTMModel(hidden_size=hidden_size, num_layers=num_layers, output_size=len(steps) if steps else 1)
+        model.horizon_steps = steps
+        model.fit_stats = fit_sequence_model(model, X_train, y_train, X_val, y_val)
+        return model
+    
+    def train_transformer(self, X_train, y_train, X_val=None, y_val=None, steps=None):
+        model = TransformerModel(output_size=len(steps) if steps else 1)
+        model.horizon_steps = steps
+        model.fit_stats = fit_sequence_model(model, X_train, y_train, X_val, y_val)
         return model
     
-    def train_xgboost(self, X_train, y_train):
+    def train_xgboost(self, X_train, y_train, max_depth=3, learning_rate=0.1):
         model = xgb.XGBClassifier(
             objective='binary:logistic',
             n_estimators=100,
-            max_depth=3,
-            learning_rate=0.1,
-            random_state=config.RANDOM_STATE
+            max_depth=max_depth,
+            learning_rate=learning_rate,
+            random_state=config.RANDOM_STATE,
+            n_jobs=governor.threads_per_job
         )
         model.fit(X_train, y_train)
-        self.models['XGBoost'] = model
         return model
     
-    def train_prophet(self, df):
-        prophet_df = df.reset_index()[['Date', 'close']].rename(columns={'Date': 'ds', 'close': 'y'})
+    def train_prophet(self, df, changepoint_prior_scale=0.05):
+        # Whatever the index is called (daily 'Date', intraday 'Datetime')
+        prophet_df = pd.DataFrame({'ds': df.index, 'y': df['close'].values})
         
         # Remove timezone information if present
         prophet_df['ds'] = prophet_df['ds'].dt.tz_localize(None)
@@ -242,163 +712,511 @@ class StockAnalyzer:
             yearly_seasonality=True,
             weekly_seasonality=True,
             daily_seasonality=False,
-            changepoint_prior_scale=0.05
+            changepoint_prior_scale=changepoint_prior_scale
         )
         model.fit(prophet_df)
-        self.models['Prophet'] = model
         return model
     
     def train_garch(self, df, p=1, q=1):
         if df is None or len(df) < 100:
             return None
             
-        returns = df['close'].pct_change().dropna() * 100  # Percentage returns
+        returns = df['close'].astype(np.float64).pct_change().dropna() * 100  # Percentage returns; arch wants float64
         model = arch_model(returns, vol='Garch', p=p, q=q)
         fitted_model = model.fit(disp='off')
-        self.models['GARCH'] = fitted_model
         return fitted_model
     
-    def predict_future(self, ticker, days=30):
-        """Make predictions using all models"""
-        df = self.data_collector.get_stock_data(ticker)
-        if df is None:
-            return None
-            
-        results = {}
-        
-        # LSTM Prediction
-        X_train, X_test, y_train, y_test = self.preprocessor.prepare_data(df)
-        if X_train is not None:
-            if not self.models['LSTM']:
-                self.train_lstm(X_train, y_train)
-                
-            lstm_model = self.models['LSTM']
-            last_sequence = X_test[-1:]  # Most recent sequence
-            lstm_predictions = []
-            
-            for _ in range(days):
-                next_pred = lstm_model(torch.FloatTensor(last_sequence))
-                lstm_predictions.append(next_pred.item())
-                # Update sequence
-                last_sequence = np.append(last_sequence[:, 1:, :], next_pred.detach().numpy().reshape(1, 1, 1), axis=1)
-                
-            lstm_predictions = self.preprocessor.scaler.inverse_transform(
-                np.array(lstm_predictions).reshape(-1, 1)
-            ).flatten()
-            results['LSTM'] = lstm_predictions
-            
-        # Transformer Prediction
-        if X_train is not None:
-            if not self.models['Transformer']:
-                self.train_transformer(X_train, y_train)
+    def _sequence_model(self, ticker, key, train, X_train, X_test, y_train, y_test, steps, refresh=False):
+        """Model to run inference with, preferring a compiled artifact from the store"""
+        if config.USE_COMPILED_INFERENCE and not refresh and self._has_stored_script(ticker, key):
+            compiled = self.model_store.load_script(ticker, key)
+            if compiled is not None:
+                return compiled
                 
-            transformer_model = self.models['Transformer']
-            last_sequence = X_test[-1:]  # Most recent sequence
-            transformer_predictions = []
-            
-            for _ in range(days):
-                next_pred = transformer_model(torch.FloatTensor(last_sequence))
-                transformer_predictions.append(next_pred.item())
-                # Update sequence
-                last_sequence = np.append(last_sequence[:, 1:, :], next_pred.detach().numpy().reshape(1, 1, 1), axis=1)
-                
-            transformer_predictions = self.preprocessor.scaler.inverse_transform(
-                np.array(transformer_predictions).reshape(-1, 1)
-            ).flatten()
-            results['Transformer'] = transformer_predictions
+        def build():
+            model = train(X_train, y_train, X_test, y_test, steps=steps)
+            if config.USE_COMPILED_INFERENCE:
+                compiled, info = compile_for_cpu(model, X_test, config.INFERENCE_ATOL)
+                if info['variant'] != 'eager':
+                    self.model_store.save_script(ticker, key, compiled, dict(info, **model.fit_stats))
+                    return compiled
+                if refresh:
+                    self.model_store.delete_script(ticker, key)  # don't keep serving the stale artifact
+            return model
+        return self._cached_model(ticker, key, build, refresh)
+    
+    def _has_stored_script(self, ticker, key):
+        """Whether the store holds a compiled artifact to serve for (ticker, key)"""
+        # Artifacts without fit stats predate fit_sequence_model: retrain them
+        return 'epochs' in (self.model_store.load_meta(ticker, key) or {})
+    
+    def _sequence_key(self, ticker, name, df, days):
+        """(params, lookback, horizon steps, cache key) of the model predict_sequence_model uses"""
+        params = self.model_params(ticker, name, horizon_name(days))
+        key_params = dict(params)
+        lookback = params.pop('lookback')
+        steps = horizon_checkpoints(days) if config.FORECAST_MODE == 'direct' else None
+        if steps is not None and len(df) - lookback - (steps[-1] - 1) < lookback:
+            # Not enough history for direct targets this far out; roll forward instead
+            steps = None
+        return params, lookback, steps, steps_key(name, steps) + params_tag(name, key_params)
+    
+    def _direct_forecast(self, model, window, steps, days):
+        """Whole horizon in one forward pass, interpolated between checkpoints"""
+        with torch.no_grad():
+            outputs = model(torch.from_numpy(window)).numpy().reshape(-1)
+        return np.interp(np.arange(1, days + 1), steps, outputs)
+    
+    def _recursive_forecast(self, model, last_sequence, days):
+        """Feed each one-step prediction back in as the next input"""
+        lookback = last_sequence.shape[1]
+        # The window followed by the predictions; each step's input is a view into it
+        path = torch.empty(lookback + days)
+        path[:lookback] = torch.from_numpy(last_sequence.reshape(-1))
+        with torch.no_grad():
+            for t in range(days):
+                path[lookback + t] = model(path[t:t + lookback].view(1, lookback, 1)).reshape(())
+        return path[lookback:].numpy()
+    
+    def predict_sequence_model(self, ticker, df, days, name, refresh=False):
+        """LSTM or Transformer price path for the next ``days`` steps"""
+        params, lookback, steps, key = self._sequence_key(ticker, name, df, days)
+        X_train, X_test, y_train, y_test, scaler = self.preprocessor.prepare_data(df, lookback=lookback, steps=steps)
+        if X_train is None:
+            return None
             
-        # XGBoost Prediction
-        X_train_tab, X_test_tab, y_train_tab, y_test_tab = self.preprocessor.prepare_tabular_data(df)
-        if X_train_tab is not None:
-            if not self.models['XGBoost']:
-                self.train_xgboost(X_train_tab, y_train_tab)
+        train = partial(self.train_lstm if name == 'LSTM' else self.train_transformer, **params)
+        with governor.stage(name):
+            model = self._sequence_model(ticker, key, train, X_train, X_test, y_train, y_test, steps, refresh)
                 
-            # For XGBoost, we'll return the probability of price increase
+            if steps is not None:
+                window = self.preprocessor.latest_window(df, scaler, lookback=lookback)
+                scaled = self._direct_forecast(model, window, steps, days)
+            else:
+                scaled = self._recursive_forecast(model, X_test[-1:], days)  # Most recent sequence
+        return scaler.inverse_transform(scaled.reshape(-1, 1)).flatten()
+    
+    def predict_global_lstm(self, ticker, df, days):
+        """Price path from the nightly global model (fintrix_global.py).
+        
+        Needs no training, only ``lookback`` bars of history; returns None if
+        no global model was trained for this horizon.
+        """
+        steps = horizon_checkpoints(days)
+        key = steps_key('GlobalLSTM', steps)
+        model = self.model_store.load_script(GLOBAL_MODEL_OWNER, key)
+        meta = self.model_store.load_meta(GLOBAL_MODEL_OWNER, key)
+        if model is None or meta is None or len(df) <= meta['lookback']:
+            return None
+        close = df['close'].values
+        window, scale = self.preprocessor.relative_latest_window(close, meta['lookback'])
+        ticker_id = meta['ticker_ids'].get(ticker, 0)
+        sector_id = meta['sector_ids'].get(self.data_collector.sector(ticker) or '', 0)
+        with governor.stage('LSTM'):
+            with torch.no_grad():
+                outputs = model(torch.from_numpy(window), torch.LongTensor([ticker_id]),
+                                torch.LongTensor([sector_id])).numpy().reshape(-1)
+        path = np.interp(np.arange(1, days + 1), steps, outputs)
+        return close[-1] * np.exp(path * scale)
+    
+    def predict_xgboost(self, ticker, df, refresh=False, horizon='short'):
+        """Probability that the next close is higher, or None without enough data"""
+        params = self.model_params(ticker, 'XGBoost', horizon)
+        lookback = params.pop('lookback')
+        X_train_tab, X_test_tab, y_train_tab, y_test_tab = self.preprocessor.prepare_tabular_data(df, lookback=lookback)
+        if X_train_tab is None:
+            return None
+        key = 'XGBoost' + params_tag('XGBoost', dict(params, lookback=lookback))
+        with governor.stage('XGBoost'):
+            model = self._cached_model(ticker, key, lambda: self.train_xgboost(X_train_tab, y_train_tab, **params),
+                                       refresh)
             current_features = X_test_tab.iloc[-1:].values
-            prob_increase = self.models['XGBoost'].predict_proba(current_features)[0][1]
-            results['XGBoost'] = prob_increase
-            
-        # Prophet Prediction
-        prophet_model = self.train_prophet(df)
-        if prophet_model:
-            future = prophet_model.make_future_dataframe(periods=days)
+            return model.predict_proba(current_features)[0][1]
+    
+    def predict_prophet(self, ticker, df, days, refresh=False, **params):
+        """Prophet price path for the ``days`` calendar days after the last bar.
+        
+        The fit is cached; forecasting from a newer bar only extends the
+        dates, and the model is refitted when it is found stale.
+        """
+        key = 'Prophet' + params_tag('Prophet', params)
+        # cmdstan optimizes single-threaded, so one governed slot each
+        with governor.stage('Prophet'):
+            prophet_model = self._cached_model(ticker, key, lambda: self.train_prophet(df, **params), refresh)
+            if not prophet_model:
+                return None
+            future = pd.DataFrame({'ds': fintrix_trend.forecast_dates(df.index[-1], days)})
             forecast = prophet_model.predict(future)
-            prophet_predictions = forecast['yhat'].tail(days).values
-            results['Prophet'] = prophet_predictions
+            return forecast['yhat'].values
+    
+    def predict_trend(self, ticker, df, days, refresh=False, **params):
+        """Closed-form trend/seasonality path (fintrix_trend.py) for the ``days``
+        calendar days after the last bar; takes Prophet's parameters"""
+        key = 'Trend' + params_tag('Prophet', params)
+        closes = df['close'].dropna()
+        if len(closes) < 2:
+            return None
+        model = self._cached_model(ticker, key, lambda: fintrix_trend.fit(closes.index, closes.values, **params),
+                                   refresh)
+        return model.predict(fintrix_trend.forecast_dates(df.index[-1], days))[:, 0]
+    
+    def fit_trend_batch(self, frames, refresh=False, **params):
+        """Fit the trend engine for many tickers in one batched solve and cache the fits.
+        
+        Tickers are aligned on the union of their dates, each fit leaving out
+        its missing bars; tickers that already have a fit are skipped unless
+        ``refresh``. ``params`` default to Config.MODEL_PARAMS['Prophet'];
+        tickers with tuned parameters use a different cache key and are still
+        fitted on their own when analyzed. Returns {ticker: fit}.
+        """
+        params = params or dict(config.MODEL_PARAMS['Prophet'])
+        key = 'Trend' + params_tag('Prophet', params)
+        with self._model_cache_lock:
+            todo = {t: df for t, df in frames.items() if refresh or (t, key) not in self._model_cache}
+        if not todo:
+            return {}
+        fits = fintrix_trend.fit_frames(todo, **params)
+        self.use_trend_fits(fits, **params)
+        return fits
+    
+    def use_trend_fits(self, fits, **params):
+        """Cache trend fits made elsewhere (e.g. by the batch master), {ticker: fit}"""
+        key = 'Trend' + params_tag('Prophet', params or config.MODEL_PARAMS['Prophet'])
+        now = time.time()
+        with self._model_cache_lock:
+            for ticker, fit in fits.items():
+                self._cache_model(ticker, key, fit)
+                self._built_at[(ticker, 'Trend')] = now
+    
+    def _garch_fit(self, ticker, df, refresh=False):
+        """GARCH result on the latest returns, with the cached parameters
+        (refitted only when the model is found stale)"""
+        if df is None or len(df) < 100:
+            return None
+        params = self._cached_model(ticker, 'GARCH', lambda: self.train_garch(df).params, refresh)
+        returns = df['close'].astype(np.float64).pct_change().dropna() * 100
+        return arch_model(returns, vol='Garch', p=1, q=1).fix(params)
+    
+    def predict_garch(self, ticker, df, days, refresh=False):
+        """Forecast volatility path (cheap, not governed)"""
+        fit = self._garch_fit(ticker, df, refresh)
+        if fit is None:
+            return None
+        forecasts = fit.forecast(horizon=days)
+        return np.sqrt(forecasts.variance.values[-1, :])
+    
+    def risk_profile(self, ticker, budget, horizon='short', shares=None, df=None, current_price=None):
+        """Monte Carlo risk of a position over the horizon, from the GARCH fit.
+        
+        ``shares`` defaults to what ``budget`` buys at the current price.
+        Returns None without enough history; simulations are cached per
+        ticker, fit and horizon (see fintrix_risk.py).
+        """
+        days = config.SHORT_TERM_DAYS if horizon == 'short' else config.LONG_TERM_DAYS
+        if df is None:
+            df = self.data_collector.get_stock_data(ticker)
+        fit = self._garch_fit(ticker, df)
+        if fit is None:
+            return None
+        as_of = df.index[-1].strftime('%Y-%m-%d')
+        key = (ticker, as_of, tuple(np.round(fit.params.values, 10)))
+        outcomes = self.risk.outcomes(key, garch_state(fit), days)
+        
+        if current_price is None:
+            current_price = self.data_collector.get_current_price(ticker)
+        price = float(current_price if current_price is not None else df['close'].iloc[-1])
+        if shares is None:
+            shares = int(budget / price)
+        return dict(risk_report(outcomes, price, shares), ticker=ticker, horizon=horizon, days=days,
+                    as_of=as_of, price=price, budget=budget)
+    
+    def is_fitted(self, ticker, name, df, days):
+        """Whether predicting with model ``name`` (an engine, e.g. 'Trend') needs no training:
+        its fit is in this process's model cache or a compiled artifact is in the store"""
+        horizon = horizon_name(days)
+        if name == 'LSTM' and config.USE_GLOBAL_LSTM:
+            meta = self.model_store.load_meta(GLOBAL_MODEL_OWNER, steps_key('GlobalLSTM', horizon_checkpoints(days)))
+            if meta is not None and len(df) > meta['lookback']:
+                return True
+        if name in ('LSTM', 'Transformer'):
+            key = self._sequence_key(ticker, name, df, days)[3]
+            if config.USE_COMPILED_INFERENCE and self._has_stored_script(ticker, key):
+                return True
+        elif name in ('XGBoost', 'Prophet'):
+            key = name + params_tag(name, self.model_params(ticker, name, horizon))
+        elif name == 'Trend':
+            key = 'Trend' + params_tag('Prophet', self.model_params(ticker, 'Prophet', horizon))
+        else:
+            key = 'GARCH'
+        with self._model_cache_lock:
+            return (ticker, key) in self._model_cache
+    
+    def predict_future(self, ticker, days=30, df=None, deadline=None, engine=None):
+        """Make predictions using all models, cheapest first.
+        
+        With ``deadline`` (a time.perf_counter() value) members are picked by
+        plan_models() and any whose measured cost no longer fits in the
+        remaining time is skipped; the cheapest member always runs. Costs are
+        estimated apart for members already fitted and members that would
+        have to train first, so a cold ticker doesn't train past the deadline.
+        
+        ``engine`` picks what serves the seasonal 'Prophet' member ('prophet'
+        or 'trend'; default Config.SEASONAL_ENGINE). Results stay keyed by
+        member; costs and drift are tracked per engine.
+        """
+        engines = {'Prophet': SEASONAL_ENGINES[engine or config.SEASONAL_ENGINE]}
+        if df is None:
+            df = self.data_collector.get_stock_data(ticker)
+        if df is None:
+            return None
+        if self.retrainer.running:
+            self._check_drift(ticker, df)
             
-        # GARCH Prediction
-        garch_model = self.train_garch(df)
-        if garch_model:
-            # Forecast volatility
-            forecasts = garch_model.forecast(horizon=days)
-            results['GARCH'] = np.sqrt(forecasts.variance.values[-1, :])
+        fitted = {name: self.is_fitted(ticker, engines.get(name, name), df, days) for name in MODEL_ORDER}
+        if deadline is None:
+            plan = MODEL_ORDER
+        else:
+            plan = plan_models(self.cost_tracker, days, load_contributions(config.BACKTEST_REPORT_PATH),
+                               engines=engines, fitted=fitted)
+            
+        results = {}
+        shared = set()  # members served by a model this ticker doesn't own
+        for name in plan:
+            if deadline is not None and results:
+                remaining_ms = (deadline - time.perf_counter()) * 1000
+                if self.cost_tracker.estimate(engines.get(name, name), days, fitted[name]) > remaining_ms:
+                    continue
+                    
+            started = time.perf_counter()
+            if name == 'LSTM' and config.USE_GLOBAL_LSTM:
+                prediction = self.predict_global_lstm(ticker, df, days)
+                if prediction is not None:
+                    shared.add(name)
+                else:
+                    prediction = self.predict_sequence_model(ticker, df, days, name)
+            elif name in ('LSTM', 'Transformer'):
+                prediction = self.predict_sequence_model(ticker, df, days, name)
+            elif name == 'XGBoost':
+                # For XGBoost, we'll return the probability of price increase
+                prediction = self.predict_xgboost(ticker, df, horizon=horizon_name(days))
+            elif name == 'Prophet' and engines[name] == 'Trend':
+                prediction = self.predict_trend(ticker, df, days, **self.model_params(ticker, 'Prophet', horizon_name(days)))
+            elif name == 'Prophet':
+                prediction = self.predict_prophet(ticker, df, days, **self.model_params(ticker, 'Prophet', horizon_name(days)))
+            else:
+                prediction = self.predict_garch(ticker, df, days)
+            self.cost_tracker.record(engines.get(name, name), days, (time.perf_counter() - started) * 1000,
+                                     fitted[name])
             
+            if prediction is not None:
+                results[name] = prediction
+                
+        if config.RETRAIN_ENABLED and results:
+            # The global LSTM is retrained nightly by fintrix_global.py, not per ticker
+            own = {engines.get(name, name): value for name, value in results.items() if name not in shared}
+            self.drift.record(ticker, df.index[-1].strftime('%Y-%m-%d'), days, own, df['close'].iloc[-1])
         return results
     
-    def analyze_stock(self, ticker, budget, horizon='short'):
-        """Analyze a stock and return recommendation score"""
+    def _check_drift(self, ticker, df):
+        """Drop fits another process has replaced and queue stale models for retraining"""
+        report = self.drift.check(ticker, df)
+        if not report:
+            return
+        for row in report:
+            built_at = self._built_at.get((ticker, row['model']))
+            if built_at is not None and row['trained_at'] > built_at:
+                self._evict(ticker, row['model'])
+        stale = [(row['model'], row['days']) for row in report if row['stale']]
+        if stale:
+            self.retrainer.submit(ticker, stale, df)
+    
+    def retrain(self, ticker, jobs, df):
+        """Refit (model name, days) pairs of a ticker on ``df``; returns how many were refitted.
+        
+        Called by the RetrainScheduler. Models claimed by another process are
+        skipped; the ticker's cached results are dropped once any model changes.
+        """
+        as_of = df.index[-1].strftime('%Y-%m-%d')
+        governor.begin_job()
+        retrained = 0
+        for name, days in jobs:
+            if not self.drift.claim(ticker, name, days):
+                continue
+            if name in ('LSTM', 'Transformer'):
+                fitted = self.predict_sequence_model(ticker, df, days, name, refresh=True)
+            elif name == 'XGBoost':
+                fitted = self.predict_xgboost(ticker, df, refresh=True, horizon=horizon_name(days))
+            elif name == 'Prophet':
+                fitted = self.predict_prophet(ticker, df, 1, refresh=True, **self.model_params(ticker, 'Prophet', horizon_name(days)))
+            elif name == 'Trend':
+                fitted = self.predict_trend(ticker, df, 1, refresh=True, **self.model_params(ticker, 'Prophet', horizon_name(days)))
+            else:
+                fitted = self.predict_garch(ticker, df, 1, refresh=True)
+            if fitted is not None:
+                self.drift.trained(ticker, name, days, as_of)
+                retrained += 1
+                print(f"Retrained {name} for {ticker} (bars to {as_of})")
+        if retrained:
+            self.result_cache.invalidate(ticker)
+        return retrained
+    
+    def score_stock(self, ticker, horizon='short', df=None, current_price=None, latency_budget_ms=None,
+                    engine=None):
+        """Score a stock independently of the user's budget.
+        
+        Pass ``df``/``current_price`` when they were already fetched (e.g. by
+        a bulk download) to skip the per-ticker requests. Results are served
+        from the result cache until the next session close or a newer bar.
+        
+        With ``latency_budget_ms`` only the ensemble members expected to fit
+        in the budget run ("fast" mode); ``models`` in the result lists the
+        members that contributed and ``mode`` is "full" when all of them did.
+        
+        ``engine`` overrides Config.SEASONAL_ENGINE for this analysis; only
+        results of the configured engine are cached.
+        """
+        started = time.perf_counter()
+        engine = engine or config.SEASONAL_ENGINE
+        cacheable = engine == config.SEASONAL_ENGINE
+        deadline = started + latency_budget_ms / 1000 if latency_budget_ms else None
         if horizon == 'short':
             days = config.SHORT_TERM_DAYS
         else:
             days = config.LONG_TERM_DAYS
             
-        predictions = self.predict_future(ticker, days)
+        governor.begin_job()
+        result = {
+            'ticker': ticker,
+            'horizon': horizon,
+            'score': 0,
+            'recommendation': "Insufficient data",
+            'current_price': None,
+            'expected_return': None,
+            'volatility': None,
+            'as_of': None,
+            'queue_ms': 0.0,
+            'models': [],
+            'model_outputs': {},
+            'mode': 'full',
+            'engine': engine
+        }
+        
+        if df is not None and not df.empty:
+            bar_date = df.index[-1].strftime('%Y-%m-%d')
+        else:
+            bar_date = self.data_collector.last_bar_dates.get(ticker)
+        cached = self.result_cache.get(ticker, horizon, bar_date) if cacheable else None
+        if cached is not None:
+            return cached
+            
+        if df is None:
+            df = self.data_collector.get_stock_data(ticker)
+        predictions = self.predict_future(ticker, days, df=df, deadline=deadline, engine=engine)
+        result['queue_ms'] = governor.job_queue_ms()
         if not predictions:
-            return 0, "Insufficient data"
+            return result
+        result['models'] = [SEASONAL_ENGINES[engine] if name == 'Prophet' else name
+                            for name in MODEL_ORDER if name in predictions]
+        result['model_outputs'] = {SEASONAL_ENGINES[engine] if name == 'Prophet' else name: value
+                                   for name, value in model_outputs(predictions).items()}
+        if len(result['models']) < len(MODEL_ORDER):
+            result['mode'] = 'fast' if deadline is not None else 'partial'
+
+        result['as_of'] = df.index[-1].strftime('%Y-%m-%d')
             
         print(f"Analyzing {ticker}...")
-        current_price = self.data_collector.get_current_price(ticker)
+        if current_price is None:
+            current_price = self.data_collector.get_current_price(ticker)
         print(f"Current price: {current_price}")
         if current_price is None:
-            return 0, "Could not fetch current price"
-            
-        # Calculate how many shares can be bought
-        num_shares = int(budget / current_price)
-        if num_shares == 0:
-            return 0, "Budget too low for this stock"
+            result['recommendation'] = "Could not fetch current price"
+            return result
             
-        # Calculate composite score (simplified)
-        score = 0
-        
-        # Price increase predictions
-        if 'LSTM' in predictions and 'Transformer' in predictions and 'Prophet' in predictions:
-            avg_price_pred = (
-                predictions['LSTM'][-1] + 
-                predictions['Transformer'][-1] + 
-                predictions['Prophet'][-1]
-            ) / 3
-            price_return = (avg_price_pred - current_price) / current_price
-            score += price_return * 100  # Convert to percentage
-            
-        # Probability of increase from XGBoost
-        if 'XGBoost' in predictions:
-            score += (predictions['XGBoost'] - 0.5) * 50  # Scale to -25 to +25
-            
-        # Adjust for volatility (lower volatility is better)
-        if 'GARCH' in predictions:
-            avg_volatility = np.mean(predictions['GARCH'])
-            # Higher penalty for short term, lower for long term
-            if horizon == 'short':
-                score -= avg_volatility * 2
-            else:
-                score -= avg_volatility
-                
-        # Normalize score
-        score = max(0, min(100, score + 50))  # Convert to 0-100 scale
-        
-        # Generate recommendation text
-        if score >= 80:
-            reco = "Strong Buy"
-        elif score >= 60:
-            reco = "Buy"
-        elif score >= 40:
-            reco = "Hold"
-        elif score >= 20:
-            reco = "Sell"
+        score, expected_return, volatility = compute_score(predictions, current_price, horizon)
+        result.update({
+            'score': score,
+            'recommendation': score_to_recommendation(score),
+            'current_price': float(current_price),
+            'expected_return': expected_return,
+            'volatility': volatility,
+            'elapsed_ms': (time.perf_counter() - started) * 1000
+        })
+        if result['mode'] != 'fast' and cacheable:
+            self.result_cache.put(result)
+        return result
+    
+    def analyze_stock(self, ticker, budget, horizon='short', latency_budget_ms=None):
+        """Analyze a stock and return recommendation score"""
+        return apply_budget(self.score_stock(ticker, horizon, latency_budget_ms=latency_budget_ms), budget)
+
+def compute_score(predictions, current_price, horizon='short'):
+    """Combine model predictions into a 0-100 score.
+    
+    Returns (score, expected_return, volatility) where the last two are the
+    raw ensemble inputs (None when the corresponding models are missing).
+    """
+    score = 0
+    expected_return = None
+    volatility = None
+    
+    # Price increase predictions, averaged over whichever price models ran
+    price_preds = [predictions[name][-1] for name in PRICE_MODELS if name in predictions]
+    if price_preds:
+        avg_price_pred = sum(price_preds) / len(price_preds)
+        expected_return = float((avg_price_pred - current_price) / current_price)
+        score += expected_return * 100  # Convert to percentage
+        
+    # Probability of increase from XGBoost
+    if 'XGBoost' in predictions:
+        score += (predictions['XGBoost'] - 0.5) * 50  # Scale to -25 to +25
+        
+    # Adjust for volatility (lower volatility is better)
+    if 'GARCH' in predictions:
+        volatility = float(np.mean(predictions['GARCH']))
+        # Higher penalty for short term, lower for long term
+        if horizon == 'short':
+            score -= volatility * 2
         else:
-            reco = "Strong Sell"
+            score -= volatility
             
-        return score, reco
+    # Normalize score
+    score = float(max(0, min(100, score + 50)))  # Convert to 0-100 scale
+    return score, expected_return, volatility
+
+def model_outputs(predictions):
+    """Each model's own output: predicted final price, XGBoost's P(up), GARCH's mean volatility"""
+    outputs = {}
+    for name, prediction in predictions.items():
+        if name == 'XGBoost':
+            outputs[name] = float(prediction)
+        elif name == 'GARCH':
+            outputs[name] = float(np.mean(prediction))
+        else:
+            outputs[name] = float(prediction[-1])
+    return outputs
+
+def score_to_recommendation(score):
+    """Map a 0-100 score to recommendation text"""
+    if score >= 80:
+        return "Strong Buy"
+    elif score >= 60:
+        return "Buy"
+    elif score >= 40:
+        return "Hold"
+    elif score >= 20:
+        return "Sell"
+    return "Strong Sell"
+
+def apply_budget(result, budget):
+    """Turn a score_stock() result into the (score, recommendation) for a budget"""
+    if result['current_price'] is None:
+        return 0, result['recommendation']
+        
+    # Calculate how many shares can be bought
+    num_shares = int(budget / result['current_price'])
+    if num_shares == 0:
+        return 0, "Budget too low for this stock"
+    return result['score'], result['recommendation']
 
 def create_ui(analyzer):
     # Create widgets
@@ -444,6 +1262,8 @@ def create_ui(analyzer):
             tickers = analyzer.data_collector.nse_tickers + analyzer.data_collector.bse_tickers
             
             results = []
+            if analyzer.data_collector.quotes is not None:
+                analyzer.data_collector.quotes.subscribe(tickers[:10])
             for ticker in tickers[:10]:  # Limit to 10 for demo
                 current_price = analyzer.data_collector.get_current_price(ticker)
                 if current_price and current_price <= budget:
@@ -478,6 +1298,8 @@ def create_ui(analyzer):
 
 if __name__ == "__main__":
     analyzer = StockAnalyzer()
+    analyzer.data_collector.start_quotes()
+    analyzer.start_retraining()
     
     # Debug test
     test_ticker = "RELIANCE.NS"
@@ -0,0 +1,92 @@
+"""Ensemble member selection for latency-budgeted analysis.
+
+Each model's cost is measured as it runs (EWMA per model, horizon and
+whether it was already fitted or had to train first, which differ by orders
+of magnitude) and its usefulness comes from the last walk-forward backtest
+report (fintrix_backtest.py). plan_models() orders the members so that the
+cheap ones (GARCH, XGBoost) always run first and the expensive ones follow
+by contribution per millisecond; the caller skips members whose expected
+cost no longer fits in the remaining budget.
+"""
+import json
+import os
+import threading
+
+MODEL_ORDER = ('GARCH', 'XGBoost', 'LSTM', 'Transformer', 'Prophet')
+CHEAP_MODELS = ('GARCH', 'XGBoost')
+# Starting estimates until a model has been timed on this process: with training...
+DEFAULT_COST_MS = {'GARCH': 150, 'XGBoost': 300, 'LSTM': 3000, 'Transformer': 4000, 'Prophet': 6000,
+                   'Trend': 30}
+# ...and from a fitted model (in the model cache or the model store)
+DEFAULT_FITTED_COST_MS = {'GARCH': 30, 'XGBoost': 20, 'LSTM': 50, 'Transformer': 50, 'Prophet': 500,
+                          'Trend': 5}
+EWMA_ALPHA = 0.2
+
+class ModelCostTracker:
+    def __init__(self, priors=None, fitted_priors=None):
+        self._priors = {False: dict(DEFAULT_COST_MS, **(priors or {})),
+                        True: dict(DEFAULT_FITTED_COST_MS, **(fitted_priors or {}))}
+        self._costs = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, days, elapsed_ms, fitted=False):
+        key = (name, days, fitted)
+        with self._lock:
+            previous = self._costs.get(key)
+            if previous is None:
+                self._costs[key] = elapsed_ms
+            else:
+                self._costs[key] = (1 - EWMA_ALPHA) * previous + EWMA_ALPHA * elapsed_ms
+
+    def estimate(self, name, days, fitted=False):
+        with self._lock:
+            return self._costs.get((name, days, fitted), self._priors[fitted].get(name, 1000))
+
+    def snapshot(self):
+        with self._lock:
+            return {f"{name}/{days}/{'fitted' if fitted else 'train'}": round(ms, 1)
+                    for (name, days, fitted), ms in self._costs.items()}
+
+_contributions = {'mtime': None, 'values': {}}
+
+def load_contributions(report_path):
+    """Per-model edge from the last backtest report: accuracy above a coin flip.
+
+    Models the report doesn't score (e.g. GARCH, which adjusts for risk rather
+    than predicting direction) are absent and treated as fully useful.
+    """
+    try:
+        mtime = os.path.getmtime(report_path)
+    except OSError:
+        return {}
+    if _contributions['mtime'] != mtime:
+        values = {}
+        try:
+            with open(report_path) as f:
+                report = json.load(f)
+            for name, metrics in report.get('models', {}).items():
+                accuracy = metrics.get('directional_accuracy', metrics.get('accuracy'))
+                if accuracy is not None:
+                    values[name] = max(accuracy - 0.5, 0.0)
+        except (OSError, ValueError) as e:
+            print(f"Could not read backtest report: {e}")
+        _contributions.update(mtime=mtime, values=values)
+    return _contributions['values']
+
+def plan_models(tracker, days, contributions, models=MODEL_ORDER, engines=None, fitted=None):
+    """Order in which to run ensemble members under a latency budget.
+
+    Members with no edge in the backtest are left out entirely. ``engines``
+    maps a member to the model actually serving it (e.g. 'Prophet' to
+    'Trend'), whose cost and contribution are used instead. ``fitted`` maps
+    a member to whether its model is already fitted (default: not), which
+    picks the cost estimate.
+    """
+    engines = engines or {}
+    fitted = fitted or {}
+    edge = {m: contributions.get(engines.get(m, m), 1.0) for m in models}
+    cheap = [m for m in CHEAP_MODELS if m in models]
+    rest = [m for m in models if m not in cheap and edge[m] > 0]
+    rest.sort(key=lambda m: edge[m] / max(tracker.estimate(engines.get(m, m), days, fitted.get(m, False)), 1.0),
+              reverse=True)
+    return cheap + rest
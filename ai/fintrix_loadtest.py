@@ -0,0 +1,330 @@
+"""HTTP load test for the Flask API against deterministic local dependencies.
+
+Boots fintrix_flask_investment.py in a subprocess with:
+  * a synthetic market (seeded geometric Brownian motion per ticker) standing
+    in for yfinance, with a generated symbol master, and
+  * a stub OpenAI-compatible LLM server that the Groq client is pointed at
+    through GROQ_BASE_URL,
+with every database and model directory in a scratch directory. It then
+drives each endpoint at each concurrency level (closed loop: every client
+sends its next request when the previous one returns) and writes throughput,
+p50/p95/p99 latency and error rate per endpoint and level to a JSON report.
+
+Usage:
+    python fintrix_loadtest.py --endpoints analyze chat --concurrency 1 4 16 --duration 30
+    python fintrix_loadtest.py --target http://127.0.0.1:8888 --endpoints quote
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import requests
+
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'loadtest_report.json')
+DEFAULT_TICKERS = 20
+BARS_PER_YEAR = 252
+SESSION_MINUTES = 375  # 09:15-15:30
+CHAT_MESSAGES = ("What is diversification?", "Explain SIP investing", "How do index funds work?")
+
+class SyntheticMarket:
+    """Deterministic OHLCV history: the same seed and ticker give the same bars"""
+
+    def __init__(self, seed=42, count=DEFAULT_TICKERS, end=None):
+        self.seed = seed
+        self.tickers = [f"SYN{i:04d}.NS" for i in range(count)]
+        self.end = pd.Timestamp(end or pd.Timestamp.now(tz='Asia/Kolkata').normalize())
+
+    def _rng(self, ticker, *extra):
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.encode()), *extra])
+
+    def daily(self, ticker, bars):
+        rng = self._rng(ticker)
+        start_price = rng.uniform(50, 5000)
+        drift, vol = rng.uniform(-0.0002, 0.0008), rng.uniform(0.01, 0.03)
+        total = 10 * BARS_PER_YEAR  # the path never depends on how much is requested
+        close = start_price * np.exp(np.cumsum(drift + vol * rng.standard_normal(total)))
+        open_ = np.concatenate(([start_price], close[:-1])) * np.exp(0.002 * rng.standard_normal(total))
+        high = np.maximum(open_, close) * (1 + np.abs(0.005 * rng.standard_normal(total)))
+        low = np.minimum(open_, close) * (1 - np.abs(0.005 * rng.standard_normal(total)))
+        volume = rng.lognormal(13, 0.5, total).astype(np.int64)
+        bars = min(bars, total)
+        index = pd.bdate_range(end=self.end.tz_localize(None), periods=bars, name='Date').tz_localize('Asia/Kolkata')
+        return pd.DataFrame({'Open': open_[-bars:], 'High': high[-bars:], 'Low': low[-bars:],
+                             'Close': close[-bars:], 'Volume': volume[-bars:]}, index=index)
+
+    def minutes(self, ticker, days):
+        last_close = self.daily(ticker, 1)['Close'].iloc[-1]
+        sessions = pd.bdate_range(end=self.end.tz_localize(None), periods=days)
+        index = pd.DatetimeIndex(np.concatenate([
+            pd.date_range(day + pd.Timedelta(hours=9, minutes=15), periods=SESSION_MINUTES, freq='min').values
+            for day in sessions
+        ]), name='Datetime').tz_localize('Asia/Kolkata')
+        rng = self._rng(ticker, days)
+        close = last_close * np.exp(np.cumsum(0.0005 * rng.standard_normal(len(index))))
+        close *= last_close / close[-1]
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        return pd.DataFrame({'Open': open_, 'High': np.maximum(open_, close), 'Low': np.minimum(open_, close),
+                             'Close': close, 'Volume': rng.lognormal(8, 0.7, len(index)).astype(np.int64)},
+                            index=index)
+
+    def history(self, ticker, period='5y', interval='1d'):
+        if ticker not in self.tickers:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        if period.endswith('mo'):
+            amount, unit = int(period[:-2]), 'mo'
+        else:
+            amount, unit = int(period[:-1]), period[-1]
+        if interval == '1m':
+            return self.minutes(ticker, amount if unit == 'd' else 7)
+        bars = {'d': amount, 'mo': amount * 21, 'y': amount * BARS_PER_YEAR}.get(unit, BARS_PER_YEAR)
+        return self.daily(ticker, bars)
+
+    def write_symbol_master(self, path):
+        pd.DataFrame({'SYMBOL': self.tickers}).to_csv(path, index=False)
+        return path
+
+class FakeYFinance:
+    """The slice of the yfinance API the data layer uses, backed by SyntheticMarket"""
+
+    def __init__(self, market):
+        self.market = market
+
+    def Ticker(self, ticker):
+        market = self.market
+
+        class _Ticker:
+            def history(self, period='1mo', interval='1d', **kwargs):
+                return market.history(ticker, period, interval)
+        return _Ticker()
+
+    def download(self, tickers, period='1mo', interval='1d', **kwargs):
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        frames = {t: self.market.history(t, period, interval) for t in tickers}
+        frames = {t: df for t, df in frames.items() if not df.empty}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-style /chat/completions endpoint with a fixed reply after a fixed delay"""
+    latency_s = 0.2
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.latency_s)
+        body = json.dumps({
+            'id': 'stub', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'stub',
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': 'Diversify and invest for the long term.'}}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub_llm(latency_ms):
+    StubLLMHandler.latency_s = latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def serve(args):
+    """Run the Flask app in this process against the synthetic market"""
+    import fintrix_investment
+    import fintrix_quotes
+    market = SyntheticMarket(args.seed, args.tickers)
+    fake = FakeYFinance(market)
+    fintrix_investment.yf = fake
+    fintrix_quotes.yf = fake
+
+    config = fintrix_investment.config
+    instance = os.path.join(args.workdir, 'instance')
+    os.makedirs(instance, exist_ok=True)
+    config.NSE_TICKERS_URL = market.write_symbol_master(os.path.join(args.workdir, 'EQUITY_L.csv'))
+    config.DB_PATH = os.path.join(instance, 'tasks.db')
+    config.MODEL_STORE_DIR = os.path.join(instance, 'models')
+    config.INTRADAY_DIR = os.path.join(instance, 'intraday')
+    config.BACKTEST_REPORT_PATH = os.path.join(instance, 'backtest_report.json')
+    config.SECTORS_PATH = os.path.join(instance, 'sectors.csv')
+    config.QUOTE_SOURCE = 'poll'
+
+    import fintrix_flask_investment as server  # its task table stays in place; 'tasks' only reads it
+    server.app.run(host='127.0.0.1', port=args.port, threaded=True, debug=False)
+
+ENDPOINTS = {
+    'analyze': lambda tickers, args: ('POST', '/api/finance/analyze', dict(
+        {'ticker': random.choice(tickers), 'budget': 100000, 'horizon': 'short'},
+        **({'latency_budget_ms': args.latency_budget_ms} if args.latency_budget_ms else {}))),
+    'chat': lambda tickers, args: ('POST', '/api/finance/chat', {'message': random.choice(CHAT_MESSAGES)}),
+    'quote': lambda tickers, args: ('GET', f"/api/finance/quote/{random.choice(tickers)}", None),
+    'tasks': lambda tickers, args: ('GET', '/api/tasks?limit=50', None),
+}
+
+def wait_ready(base_url, timeout_s, process=None):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if requests.get(base_url + '/api/tasks?limit=1', timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout_s}s")
+
+def run_level(base_url, endpoint, concurrency, duration_s, tickers, args):
+    """Closed-loop load at one concurrency level; returns its summary"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration_s
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < stop_at:
+            method, path, body = ENDPOINTS[endpoint](tickers, args)
+            started = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, json=body, timeout=args.timeout)
+                ok = response.ok and response.headers.get('Content-Type', '').startswith('application/json')
+                if ok:
+                    payload = response.json()  # a list for /api/tasks
+                    ok = not isinstance(payload, dict) or payload.get('success', True) is not False
+                error = None if ok else f"HTTP {response.status_code}"
+            except Exception as e:  # count every failure; a dead client would vanish from the results
+                error = type(e).__name__
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed_ms)
+                if error:
+                    errors.append(error)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_s = time.perf_counter() - started
+
+    latency = np.array(latencies)
+    summary = {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(latency),
+        'errors': len(errors),
+        'error_rate': len(errors) / len(latency) if len(latency) else None,
+        'throughput_rps': (len(latency) - len(errors)) / wall_s,
+        'latency_ms': {
+            'p50': float(np.percentile(latency, 50)) if len(latency) else None,
+            'p95': float(np.percentile(latency, 95)) if len(latency) else None,
+            'p99': float(np.percentile(latency, 99)) if len(latency) else None,
+            'mean': float(latency.mean()) if len(latency) else None,
+            'max': float(latency.max()) if len(latency) else None,
+        },
+        'error_kinds': {kind: errors.count(kind) for kind in set(errors)}
+    }
+    print(f"{endpoint:>8} x{concurrency:<4} {summary['throughput_rps']:8.2f} req/s  "
+          f"p50 {summary['latency_ms']['p50'] or 0:8.1f}  p95 {summary['latency_ms']['p95'] or 0:8.1f}  "
+          f"p99 {summary['latency_ms']['p99'] or 0:8.1f} ms  errors {summary['errors']}")
+    return summary
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Fintrix Flask API")
+    sub = parser.add_subparsers(dest='command')
+    serve_parser = sub.add_parser('serve', help="(internal) run the app against the synthetic market")
+    serve_parser.add_argument('--port', type=int, required=True)
+    serve_parser.add_argument('--seed', type=int, default=42)
+    serve_parser.add_argument('--tickers', type=int, default=DEFAULT_TICKERS)
+    serve_parser.add_argument('--workdir', required=True)
+
+    parser.add_argument('--target', default=None, help="Test a running server instead of booting one")
+    parser.add_argument('--endpoints', nargs='+', choices=list(ENDPOINTS), default=['analyze', 'chat'])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--duration', type=float, default=30, help="Seconds per endpoint and level")
+    parser.add_argument('--warmup', type=float, default=0, help="Untimed seconds per endpoint first")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tickers', type=int, default=DEFAULT_TICKERS)
+    parser.add_argument('--port', type=int, default=8899)
+    parser.add_argument('--llm-latency-ms', type=float, default=200)
+    parser.add_argument('--latency-budget-ms', type=float, default=None)
+    parser.add_argument('--timeout', type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument('--ready-timeout', type=float, default=300)
+    parser.add_argument('--output', default=REPORT_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args)
+        return
+
+    random.seed(args.seed)
+    tickers = SyntheticMarket(args.seed, args.tickers).tickers
+    process = llm = None
+    workdir = tempfile.TemporaryDirectory(prefix='fintrix-loadtest-')
+    base_url = args.target
+    try:
+        if base_url is None:
+            llm = start_stub_llm(args.llm_latency_ms)
+            env = dict(os.environ, GROQ_BASE_URL=f"http://127.0.0.1:{llm.server_address[1]}")
+            process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), 'serve', '--port', str(args.port),
+                 '--seed', str(args.seed), '--tickers', str(args.tickers), '--workdir', workdir.name],
+                env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+            )
+            base_url = f"http://127.0.0.1:{args.port}"
+        wait_ready(base_url, args.ready_timeout, process)
+
+        results = []
+        for endpoint in args.endpoints:
+            if args.warmup:
+                run_level(base_url, endpoint, min(args.concurrency), args.warmup, tickers, args)
+            for concurrency in args.concurrency:
+                results.append(run_level(base_url, endpoint, concurrency, args.duration, tickers, args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if llm is not None:
+            llm.shutdown()
+        workdir.cleanup()
+
+    report = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'target': args.target or 'local',
+        'settings': {'seed': args.seed, 'tickers': args.tickers, 'duration_s': args.duration,
+                     'warmup_s': args.warmup, 'llm_latency_ms': args.llm_latency_ms,
+                     'latency_budget_ms': args.latency_budget_ms},
+        'results': results
+    }
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
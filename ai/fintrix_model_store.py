@@ -0,0 +1,124 @@
+"""On-disk store for trained and compiled model artifacts.
+
+Artifacts live under one root directory as <ticker>/<name>.<ext> with a JSON
+metadata file next to each, and are kept in memory once loaded (until the
+file on disk changes). Tuned hyperparameters (fintrix_tuning.py) are stored
+the same way as <owner>/params-<horizon>.json, the owner being a ticker or a sector.
+"""
+import os
+import json
+import re
+import threading
+from datetime import datetime
+
+import torch
+
+class ModelStore:
+    def __init__(self, root):
+        self.root = root
+        self._loaded = {}  # path -> (mtime, module or metadata)
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, ticker, name, ext):
+        ticker = re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+        name = re.sub(r'[^A-Za-z0-9._-]', '_', name)
+        return os.path.join(self.root, ticker, f"{name}.{ext}")
+
+    def save_meta(self, ticker, name, meta):
+        path = self._path(ticker, name, 'json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = dict(meta, saved_at=datetime.now().isoformat(timespec='seconds'))
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _cached(self, path):
+        """In-memory copy of an artifact, if it is still the version on disk"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None, None
+        with self._lock:
+            cached = self._loaded.get(path)
+        if cached is not None and cached[0] == mtime:
+            return mtime, cached[1]
+        return mtime, None
+
+    def _remember(self, path, mtime, value):
+        with self._lock:
+            self._loaded[path] = (mtime, value)
+
+    def load_meta(self, ticker, name):
+        """Metadata dict (shared; don't modify it), or None if never saved"""
+        path = self._path(ticker, name, 'json')
+        mtime, meta = self._cached(path)
+        if mtime is None or meta is not None:
+            return meta
+        with open(path) as f:
+            meta = json.load(f)
+        self._remember(path, mtime, meta)
+        return meta
+
+    def save_script(self, ticker, name, module, meta=None):
+        """Save a TorchScript module (torch.jit.ScriptModule)"""
+        path = self._path(ticker, name, 'pt')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        torch.jit.save(module, tmp_path)
+        os.replace(tmp_path, path)  # readers never see a half-written file
+        self.save_meta(ticker, name, meta or {})
+        self._remember(path, os.path.getmtime(path), module)
+
+    def load_script(self, ticker, name):
+        """Load a TorchScript module, or None if it was never saved.
+
+        Kept in memory, and reloaded when the file is replaced (e.g. by a
+        nightly retrain).
+        """
+        path = self._path(ticker, name, 'pt')
+        mtime, module = self._cached(path)
+        if mtime is None or module is not None:
+            return module
+        module = torch.jit.load(path, map_location='cpu')
+        module.eval()
+        self._remember(path, mtime, module)
+        return module
+
+    def delete_script(self, ticker, name):
+        """Remove a saved TorchScript module and its metadata, if present"""
+        for ext in ('pt', 'json'):
+            path = self._path(ticker, name, ext)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            with self._lock:
+                self._loaded.pop(path, None)
+
+    def preload(self):
+        """Load every stored script and metadata file into memory; returns how many"""
+        count = 0
+        for owner in os.listdir(self.root):
+            folder = os.path.join(self.root, owner)
+            if not os.path.isdir(folder):
+                continue
+            for filename in os.listdir(folder):
+                name, ext = os.path.splitext(filename)
+                try:
+                    if ext == '.pt':
+                        count += self.load_script(owner, name) is not None
+                    elif ext == '.json':
+                        count += self.load_meta(owner, name) is not None
+                except Exception as e:
+                    print(f"Could not preload {owner}/{filename}: {e}")
+        return count
+
+    def save_params(self, owner, params, horizon, meta=None):
+        """Save hyperparameters tuned at a horizon as {model: {'params': {...}, ...}}"""
+        self.save_meta(owner, f'params-{horizon}', dict(meta or {}, horizon=horizon, models=params))
+
+    def load_params(self, owner, horizon):
+        """Tuned hyperparameters for an owner and horizon ({} if none)"""
+        return (self.load_meta(owner, f'params-{horizon}') or {}).get('models', {})
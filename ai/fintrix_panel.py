@@ -0,0 +1,136 @@
+"""Shared-memory OHLCV panel for worker processes.
+
+The master loads the whole universe once into a single
+multiprocessing.shared_memory block: float32 prices shaped (days x tickers x
+OHLC), followed by float64 volume shaped (days x tickers), since float32 is
+exact only up to about 16.7M and NSE daily volumes exceed that. Workers
+attach to it by name, read-only, using a small handle (block name, ticker
+order and date axis) that is sent once when the worker starts. Tasks then
+only carry a ticker symbol, and memory stays at one copy no matter how many
+workers there are.
+"""
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+FIELDS = PRICE_FIELDS + ('volume',)
+DTYPE = np.float32  # prices
+VOLUME_DTYPE = np.float64  # exact for any real volume; NaN marks a missing bar
+
+def compact_frame(df):
+    """OHLCV frame with float32 prices and float64 volume, the layout of PricePanel.frame.
+
+    Half the memory of Yahoo's float64 prices, in the dtype the models train
+    on, so no stage converts them again. Volume keeps full precision.
+    """
+    return df[list(FIELDS)].astype({**{field: DTYPE for field in PRICE_FIELDS}, 'volume': VOLUME_DTYPE})
+
+def _attach_untracked(name):
+    """Attach without registering the block with this process's resource tracker.
+
+    Otherwise the tracker unlinks the block when the first worker exits.
+    """
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+class PricePanel:
+    def __init__(self, shm, tickers, dates, tz, owner):
+        self._shm = shm
+        self._owner = owner
+        self.tickers = list(tickers)
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')  # UTC
+        self.tz = tz
+        self._offsets = {ticker: i for i, ticker in enumerate(self.tickers)}
+        shape = (len(self.dates), len(self.tickers))
+        self.data = np.ndarray(shape + (len(PRICE_FIELDS),), dtype=DTYPE, buffer=shm.buf)
+        self.volume = np.ndarray(shape, dtype=VOLUME_DTYPE, buffer=shm.buf, offset=self._volume_offset(shape))
+        if not owner:
+            self.data.flags.writeable = False
+            self.volume.flags.writeable = False
+
+    @staticmethod
+    def _volume_offset(shape):
+        """Byte offset of the volume array: after the prices, 8-byte aligned"""
+        price_bytes = int(np.prod(shape)) * len(PRICE_FIELDS) * np.dtype(DTYPE).itemsize
+        return -(-price_bytes // 8) * 8
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.volume.nbytes
+
+    @classmethod
+    def create(cls, frames):
+        """Build a panel from {ticker: OHLCV DataFrame} (as returned by DataCollector)"""
+        tickers = sorted(frames)
+        if not tickers:
+            raise ValueError("No price data to build a panel from")
+        index = frames[tickers[0]].index
+        for ticker in tickers[1:]:
+            index = index.union(frames[ticker].index)
+        tz = str(index.tz) if index.tz is not None else None
+        utc_index = index.tz_convert('UTC').tz_localize(None) if tz else index
+
+        shape = (len(index), len(tickers))
+        size = cls._volume_offset(shape) + int(np.prod(shape)) * np.dtype(VOLUME_DTYPE).itemsize
+        shm = SharedMemory(create=True, size=max(size, 1))
+        panel = cls(shm, tickers, utc_index.values, tz, owner=True)
+        panel.data[:] = np.nan
+        panel.volume[:] = np.nan
+        for j, ticker in enumerate(tickers):
+            df = frames[ticker]
+            rows = index.get_indexer(df.index)
+            panel.data[rows, j, :] = df[list(PRICE_FIELDS)].values.astype(DTYPE)
+            panel.volume[rows, j] = df['volume'].values.astype(VOLUME_DTYPE)
+        return panel
+
+    def handle(self):
+        """Small picklable description used by workers to attach"""
+        return {'name': self._shm.name, 'tickers': self.tickers, 'dates': self.dates, 'tz': self.tz}
+
+    @classmethod
+    def attach(cls, handle):
+        """Read-only view of a panel created in another process"""
+        shm = _attach_untracked(handle['name'])
+        return cls(shm, handle['tickers'], handle['dates'], handle['tz'], owner=False)
+
+    def __contains__(self, ticker):
+        return ticker in self._offsets
+
+    def view(self, ticker):
+        """Zero-copy (days x OHLC) float32 view; NaN on days without a bar"""
+        return self.data[:, self._offsets[ticker], :]
+
+    def closes(self, tickers, days):
+        """(days x tickers) DataFrame of the last ``days`` closes, one vectorized slice; NaN where a ticker has no bar"""
+        columns = [self._offsets[ticker] for ticker in tickers]
+        values = self.data[-days:, columns, PRICE_FIELDS.index('close')]
+        index = pd.DatetimeIndex(self.dates[-days:], name='Date')
+        if self.tz:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return pd.DataFrame(values, index=index, columns=list(tickers))
+
+    def frame(self, ticker):
+        """OHLCV DataFrame for one ticker, in the shape DataPreprocessor expects"""
+        offset = self._offsets[ticker]
+        values = self.data[:, offset, :]
+        rows = ~np.isnan(values[:, PRICE_FIELDS.index('close')])
+        index = pd.DatetimeIndex(self.dates[rows], name='Date')
+        if self.tz:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        df = pd.DataFrame(values[rows], index=index, columns=list(PRICE_FIELDS))
+        df['volume'] = self.volume[rows, offset]
+        return df
+
+    def close(self):
+        """Detach; the creating process also frees the block"""
+        self.data = self.volume = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,193 @@
+"""Budget-constrained portfolio allocation over the scored universe.
+
+Expected returns come from the ensemble forecasts (score_stock's
+expected_return), per-name risk from the GARCH volatilities, and the
+correlation structure from daily returns shrunk towards the identity
+(Ledoit-Wolf intensity, computed in closed form). The long-only mean-variance
+problem
+
+    maximize  mu'w - (risk_aversion / 2) w'Sigma w
+    s.t.      0 <= w <= max_weight, sum(w) <= 1    (the rest stays in cash)
+
+is solved by accelerated projected gradient, which only needs matrix-vector
+products, so a 2000-symbol universe solves well within a second. The weights
+are then rounded to whole shares without exceeding the budget.
+"""
+import numpy as np
+import pandas as pd
+
+MIN_OBSERVATIONS = 20  # daily returns needed for a sample volatility fallback
+SOLVER_ITERATIONS = 300
+SOLVER_TOLERANCE = 1e-7  # max weight change between iterations
+BISECTION_STEPS = 40
+
+def daily_returns(closes):
+    """(days x tickers) log returns; NaN where either bar is missing"""
+    closes = np.asarray(closes, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.diff(np.log(closes), axis=0)
+
+def shrinkage_correlation(returns):
+    """Correlation matrix shrunk towards the identity.
+
+    Missing returns are treated as the ticker's mean (zero after centering).
+    Returns (correlation, shrinkage intensity in [0, 1]).
+    """
+    valid = ~np.isnan(returns)
+    counts = np.maximum(valid.sum(axis=0), 1)
+    centered = np.where(valid, returns, 0.0)
+    centered = np.where(valid, centered - centered.sum(axis=0) / counts, 0.0)
+    std = np.sqrt((centered ** 2).sum(axis=0) / counts)
+    z = centered / np.where(std > 0, std, 1.0)
+
+    t = len(z)
+    sample = z.T @ z / t
+    np.fill_diagonal(sample, 1.0)
+    # Ledoit-Wolf: sampling variance of the off-diagonal entries over their
+    # squared size. sum_t (z_ti z_tj)^2 for every pair is one matrix product.
+    z2 = z ** 2
+    variance = (z2.T @ z2 / t - sample ** 2) / t
+    off_diagonal = ~np.eye(len(sample), dtype=bool)
+    dispersion = (sample[off_diagonal] ** 2).sum()
+    intensity = float(np.clip(variance[off_diagonal].sum() / dispersion, 0.0, 1.0)) if dispersion > 0 else 1.0
+
+    correlation = (1 - intensity) * sample
+    np.fill_diagonal(correlation, 1.0)
+    return correlation, intensity
+
+def covariance(returns, volatility=None, days=1):
+    """Horizon covariance: shrunk correlation scaled by per-ticker volatility.
+
+    ``volatility`` is daily, as a fraction (NaN entries fall back to the sample
+    volatility of ``returns``); the result is scaled to ``days`` bars.
+    """
+    correlation, intensity = shrinkage_correlation(returns)
+    sample_vol = np.nanstd(returns, axis=0)
+    sample_vol[(~np.isnan(returns)).sum(axis=0) < MIN_OBSERVATIONS] = np.nan
+    if volatility is None:
+        volatility = sample_vol
+    else:
+        volatility = np.where(np.isnan(volatility), sample_vol, volatility)
+    volatility = np.where(np.isnan(volatility), np.nanmax(volatility) if np.isfinite(volatility).any() else 0.0, volatility)
+    scale = volatility * np.sqrt(days)
+    return correlation * np.outer(scale, scale), intensity
+
+def project_capped_simplex(v, cap):
+    """Euclidean projection onto {0 <= w <= cap, sum(w) <= 1}"""
+    w = np.clip(v, 0.0, cap)
+    if w.sum() <= 1.0:
+        return w
+    lo, hi = v.min() - cap, v.max()
+    for _ in range(BISECTION_STEPS):
+        tau = (lo + hi) / 2
+        if np.clip(v - tau, 0.0, cap).sum() > 1.0:
+            lo = tau
+        else:
+            hi = tau
+    return np.clip(v - hi, 0.0, cap)
+
+def _largest_eigenvalue(matrix, iterations=30):
+    v = np.full(len(matrix), 1 / np.sqrt(len(matrix)))
+    value = 0.0
+    for _ in range(iterations):
+        w = matrix @ v
+        value = np.linalg.norm(w)
+        if value == 0:
+            return 0.0
+        v = w / value
+    return value * 1.05  # power iteration undershoots; keep the step size safe
+
+def mean_variance_weights(mu, cov, risk_aversion, max_weight=1.0):
+    """Long-only mean-variance weights (FISTA); uninvested weight is cash"""
+    mu = np.asarray(mu, dtype=np.float64)
+    lipschitz = risk_aversion * _largest_eigenvalue(cov)
+    if lipschitz <= 0:
+        return project_capped_simplex(mu, max_weight)
+    step = 1.0 / lipschitz
+    w = project_capped_simplex(np.zeros_like(mu), max_weight)
+    y, t = w, 1.0
+    for _ in range(SOLVER_ITERATIONS):
+        gradient = risk_aversion * (cov @ y) - mu
+        w_next = project_capped_simplex(y - step * gradient, max_weight)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_next + ((t - 1) / t_next) * (w_next - w)
+        converged = np.abs(w_next - w).max() < SOLVER_TOLERANCE
+        w, t = w_next, t_next
+        if converged:
+            break
+    return w
+
+def integer_shares(weights, prices, budget):
+    """Round target weights to whole shares without exceeding ``budget``.
+
+    Floors every position, then spends the leftover cash one share at a time
+    on the positions furthest below target (largest remainder first).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    target = weights * budget / prices
+    shares = np.floor(target).astype(np.int64)
+    cash = budget - float(shares @ prices)
+    for i in np.argsort(-(target - shares)):
+        if target[i] - shares[i] <= 0:
+            break
+        if prices[i] <= cash:
+            shares[i] += 1
+            cash -= prices[i]
+    return shares
+
+def allocate(scores, closes, budget, days, risk_aversion, max_weight):
+    """Integer-share allocation of ``budget`` over scored tickers.
+
+    ``scores`` are score_stock() results (or stored score rows) and ``closes``
+    a DataFrame of daily closes with one column per ticker. Tickers without
+    a price, an expected return or price history are left out, as are those
+    whose forecast is not positive or whose price exceeds the budget.
+    """
+    rows = pd.DataFrame([s for s in scores if s.get('current_price') and s.get('expected_return') is not None])
+    if rows.empty:
+        return _summary([], budget, 0.0, 0.0, 0.0)
+    rows = rows.drop_duplicates('ticker').set_index('ticker')
+    rows = rows[(rows['expected_return'] > 0) & (rows['current_price'] <= budget)]
+    rows = rows[rows.index.isin(closes.columns)]
+    if rows.empty:
+        return _summary([], budget, 0.0, 0.0, 0.0)
+
+    tickers = list(rows.index)
+    mu = rows['expected_return'].values.astype(np.float64)
+    prices = rows['current_price'].values.astype(np.float64)
+    # score_stock reports GARCH volatility as a daily percentage
+    volatility = pd.to_numeric(rows['volatility'], errors='coerce').values / 100
+    cov, intensity = covariance(daily_returns(closes[tickers].values), volatility, days)
+
+    weights = mean_variance_weights(mu, cov, risk_aversion, max_weight)
+    shares = integer_shares(weights, prices, budget)
+    held = shares > 0
+    values = shares * prices
+    invested = float(values.sum())
+    realized = values / budget
+    positions = [{
+        'ticker': tickers[i],
+        'shares': int(shares[i]),
+        'price': float(prices[i]),
+        'value': float(values[i]),
+        'weight': float(realized[i]),
+        'target_weight': float(weights[i]),
+        'expected_return': float(mu[i]),
+        'score': float(rows['score'].iloc[i]) if 'score' in rows else None
+    } for i in np.flatnonzero(held)]
+    positions.sort(key=lambda p: p['value'], reverse=True)
+    expected_return = float(realized @ mu)
+    risk = float(np.sqrt(max(realized @ cov @ realized, 0.0)))
+    return _summary(positions, budget, invested, expected_return, risk, intensity, len(tickers))
+
+def _summary(positions, budget, invested, expected_return, volatility, shrinkage=None, candidates=0):
+    return {
+        'positions': positions,
+        'budget': budget,
+        'invested': invested,
+        'cash': budget - invested,
+        'expected_return': expected_return,
+        'volatility': volatility,
+        'shrinkage': shrinkage,
+        'candidates': candidates
+    }
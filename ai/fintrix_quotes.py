@@ -0,0 +1,254 @@
+"""Push-based live quotes.
+
+A QuoteService runs one adapter on a background thread and keeps the last
+trade per ticker in an in-memory table. Reads are a dict lookup (no lock, no
+network), so DataCollector.get_current_price costs microseconds once a
+ticker is subscribed. Quotes carry their trade time; a quote older than
+max_age_s while the market is open (or older than the last session close
+while it is shut) is stale and, at most once per poll interval per ticker,
+refreshed through the polling fallback.
+
+Adapters:
+    YahooStreamAdapter  Yahoo Finance websocket (yfinance >= 0.2.55)
+    PollingAdapter      one batched 1-minute download for every subscribed
+                        ticker per interval
+    ReplayAdapter       replays recorded trades from a CSV file (tests, demos)
+"""
+import csv
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import pandas as pd
+import yfinance as yf
+
+from fintrix_calendar import is_session_open, previous_session_close
+
+Quote = namedtuple('Quote', ['price', 'trade_time', 'received_at', 'source'])
+
+RESTART_DELAY_S = 5  # after an adapter error, before reconnecting
+
+class QuoteAdapter:
+    """Source of trades. run() blocks, calling on_trade(ticker, price,
+    trade_time) with trade_time in epoch seconds, until close() is called."""
+    name = 'adapter'
+
+    def __init__(self):
+        self._closed = threading.Event()
+        self._tickers = set()
+
+    def subscribe(self, tickers):
+        self._tickers.update(tickers)
+
+    def run(self, on_trade):
+        raise NotImplementedError
+
+    def close(self):
+        self._closed.set()
+
+class YahooStreamAdapter(QuoteAdapter):
+    name = 'yahoo'
+
+    def __init__(self):
+        super().__init__()
+        if not hasattr(yf, 'WebSocket'):
+            raise ImportError("yfinance.WebSocket needs yfinance >= 0.2.55")
+        self._ws = None
+
+    def subscribe(self, tickers):
+        super().subscribe(tickers)
+        if self._ws is not None:
+            self._ws.subscribe(list(tickers))
+
+    def run(self, on_trade):
+        def handle(message):
+            try:
+                on_trade(message['id'], float(message['price']), int(message['time']) / 1000)
+            except (KeyError, TypeError, ValueError):
+                pass  # heartbeats and partial messages
+        self._ws = yf.WebSocket(verbose=False)
+        try:
+            if self._tickers:
+                self._ws.subscribe(list(self._tickers))
+            self._ws.listen(handle)
+        finally:
+            self._ws = None
+
+    def close(self):
+        super().close()
+        if self._ws is not None:
+            self._ws.close()
+
+class PollingAdapter(QuoteAdapter):
+    name = 'poll'
+
+    def __init__(self, interval_s=15):
+        super().__init__()
+        self.interval_s = interval_s
+
+    def run(self, on_trade):
+        while not self._closed.is_set():
+            tickers = sorted(self._tickers)
+            if tickers:
+                raw = yf.download(tickers, period='1d', interval='1m', group_by='ticker',
+                                  threads=True, progress=False)
+                for ticker in tickers:
+                    try:
+                        close = (raw[ticker] if isinstance(raw.columns, pd.MultiIndex) else raw)['Close'].dropna()
+                    except KeyError:
+                        continue
+                    if not close.empty:
+                        on_trade(ticker, float(close.iloc[-1]), close.index[-1].timestamp())
+            self._closed.wait(self.interval_s)
+
+class ReplayAdapter(QuoteAdapter):
+    """Replays a CSV with ticker, price and time columns (epoch seconds or ISO).
+
+    With speed=None trades are emitted as fast as possible; otherwise the gaps
+    between trade times are replayed divided by ``speed``.
+    """
+    name = 'replay'
+
+    def __init__(self, path, speed=None):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+
+    @staticmethod
+    def _epoch(value):
+        try:
+            return float(value)
+        except ValueError:
+            return datetime.fromisoformat(value).timestamp()
+
+    def run(self, on_trade):
+        previous = None
+        with open(self.path, newline='') as f:
+            for row in csv.DictReader(f):
+                if self._closed.is_set():
+                    return
+                trade_time = self._epoch(row['time'])
+                if self.speed and previous is not None and trade_time > previous:
+                    if self._closed.wait((trade_time - previous) / self.speed):
+                        return
+                previous = trade_time
+                on_trade(row['ticker'].strip().upper(), float(row['price']), trade_time)
+        self._closed.wait()  # keep the last trades; stay "connected" until closed
+
+def make_adapter(source, poll_interval_s=15):
+    """Adapter for a source spec: 'yahoo', 'poll', 'replay:<csv path>' or 'off'"""
+    source = (source or 'off').strip()
+    if source == 'off':
+        return None
+    if source == 'yahoo':
+        try:
+            return YahooStreamAdapter()
+        except ImportError as e:
+            print(f"Live quotes: {e}; polling instead")
+            return PollingAdapter(poll_interval_s)
+    if source == 'poll':
+        return PollingAdapter(poll_interval_s)
+    if source.startswith('replay:'):
+        return ReplayAdapter(source[len('replay:'):])
+    raise ValueError(f"Unknown quote source: {source}")
+
+class QuoteService:
+    def __init__(self, adapter, fallback=None, max_age_s=60, poll_interval_s=15):
+        self.adapter = adapter
+        self.fallback = fallback  # ticker -> (price, bar time) or None
+        self.max_age_s = max_age_s
+        self.poll_interval_s = poll_interval_s
+        self._quotes = {}  # ticker -> Quote; replaced whole, so reads need no lock
+        self._polled_at = {}
+        self._subscribed = set()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+        self._fresh_after = (0, 0.0)  # (second it was computed for, threshold)
+        self._counters = {'trades': 0, 'hits': 0, 'stale': 0, 'polls': 0, 'restarts': 0}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='quote-service', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._closed.is_set():
+            try:
+                self.adapter.run(self._on_trade)
+            except Exception as e:
+                print(f"Quote adapter '{self.adapter.name}' failed: {e}")
+            if self._closed.wait(RESTART_DELAY_S):
+                return
+            self._counters['restarts'] += 1
+
+    def close(self):
+        self._closed.set()
+        self.adapter.close()
+
+    def subscribe(self, tickers):
+        with self._lock:
+            new = set(tickers) - self._subscribed
+            self._subscribed.update(new)
+        if new:
+            self.adapter.subscribe(new)
+
+    def _on_trade(self, ticker, price, trade_time, source=None):
+        self._quotes[ticker] = Quote(price, trade_time, time.time(), source or self.adapter.name)
+        self._counters['trades'] += 1
+
+    def _threshold(self, now):
+        """Oldest trade time that still counts as current"""
+        second, threshold = self._fresh_after
+        if second != int(now):
+            if is_session_open():
+                threshold = now - self.max_age_s
+            else:
+                threshold = previous_session_close().timestamp() - self.max_age_s
+            self._fresh_after = (int(now), threshold)
+        return threshold
+
+    def is_stale(self, quote, now=None):
+        now = now or time.time()
+        return quote.trade_time < self._threshold(now)
+
+    def price(self, ticker):
+        """Last trade price, refreshed through the fallback when stale"""
+        quote = self._quotes.get(ticker)
+        now = time.time()
+        if quote is not None and not self.is_stale(quote, now):
+            self._counters['hits'] += 1
+            return quote.price
+        self._counters['stale'] += 1
+        self.subscribe([ticker])
+        if self.fallback is not None and now - self._polled_at.get(ticker, 0) >= self.poll_interval_s:
+            self._polled_at[ticker] = now
+            self._counters['polls'] += 1
+            polled = self.fallback(ticker)
+            if polled is not None:
+                # Stamped with the bar's own time, so a stale close stays stale
+                price, bar_time = polled
+                if quote is None or bar_time >= quote.trade_time:
+                    self._on_trade(ticker, float(price), bar_time, source='fallback')
+                    return float(price)
+        return quote.price if quote is not None else None
+
+    def quote(self, ticker):
+        """Last trade with staleness metadata, or None if none was seen"""
+        quote = self._quotes.get(ticker)
+        if quote is None:
+            return None
+        now = time.time()
+        return {
+            'ticker': ticker,
+            'price': quote.price,
+            'trade_time': datetime.fromtimestamp(quote.trade_time).isoformat(timespec='seconds'),
+            'age_s': round(now - quote.trade_time, 3),
+            'stale': self.is_stale(quote, now),
+            'source': quote.source
+        }
+
+    def stats(self):
+        return dict(self._counters, adapter=self.adapter.name, tickers=len(self._quotes),
+                    subscribed=len(self._subscribed))
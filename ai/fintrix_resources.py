@@ -0,0 +1,86 @@
+"""CPU resource governor for the analysis layer.
+
+The Flask apps run threaded, so without a cap every concurrent request starts
+its own torch intra-op pool, XGBoost threads and cmdstan process at once. The
+governor splits the machine into a fixed number of heavy-stage slots, each
+with a thread budget of cores // slots, so the total never oversubscribes the
+CPU. Time spent waiting for a slot is recorded per stage and per job.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import torch
+
+class ResourceGovernor:
+    def __init__(self, max_heavy_jobs=None, total_cores=None):
+        self._requested_jobs = max_heavy_jobs
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._job = threading.local()
+        self.resize(total_cores)
+
+    def resize(self, total_cores=None):
+        """Split ``total_cores`` (default: every core) into slots.
+        
+        Used by forked server workers to take only their share of the CPU;
+        call it before any job runs.
+        """
+        self.total_cores = max(1, total_cores or os.cpu_count() or 1)
+        self.max_heavy_jobs = max(1, min(self._requested_jobs or self.total_cores // 2 or 1, self.total_cores))
+        self.threads_per_job = max(1, self.total_cores // self.max_heavy_jobs)
+        self._slots = threading.BoundedSemaphore(self.max_heavy_jobs)
+        self._apply_thread_limits()
+
+    def _apply_thread_limits(self):
+        # torch's intra-op pool is process wide: size it for one slot, since at
+        # most max_heavy_jobs slots run at a time
+        torch.set_num_threads(self.threads_per_job)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # can only be set before torch runs any parallel work
+
+    def begin_job(self):
+        """Start accounting queueing time for the job on this thread"""
+        self._job.queue_ms = 0.0
+
+    def job_queue_ms(self):
+        """Total time the current thread's job spent waiting for slots"""
+        return getattr(self._job, 'queue_ms', 0.0)
+
+    @contextmanager
+    def stage(self, name):
+        """Run a heavy stage in one of the governed slots"""
+        queued_at = time.perf_counter()
+        with self._slots:
+            started_at = time.perf_counter()
+            try:
+                yield self.threads_per_job
+            finally:
+                finished_at = time.perf_counter()
+                self._record(name, (started_at - queued_at) * 1000, (finished_at - started_at) * 1000)
+
+    def _record(self, name, queue_ms, run_ms):
+        self._job.queue_ms = self.job_queue_ms() + queue_ms
+        with self._stats_lock:
+            stats = self._stats.setdefault(name, {'count': 0, 'queue_ms': 0.0, 'run_ms': 0.0, 'max_queue_ms': 0.0})
+            stats['count'] += 1
+            stats['queue_ms'] += queue_ms
+            stats['run_ms'] += run_ms
+            stats['max_queue_ms'] = max(stats['max_queue_ms'], queue_ms)
+
+    def stats(self):
+        """Configuration and per-stage counters (totals and means in ms)"""
+        with self._stats_lock:
+            stages = {
+                name: dict(s, avg_queue_ms=s['queue_ms'] / s['count'], avg_run_ms=s['run_ms'] / s['count'])
+                for name, s in self._stats.items()
+            }
+        return {
+            'total_cores': self.total_cores,
+            'max_heavy_jobs': self.max_heavy_jobs,
+            'threads_per_job': self.threads_per_job,
+            'stages': stages
+        }
@@ -0,0 +1,235 @@
+"""Preforking production server for the Flask API.
+
+The master process binds the listening socket, builds the StockAnalyzer
+(symbol master, result cache), loads every stored model into memory and
+preloads daily history for the universe into a PricePanel. It then forks
+the workers. gc.freeze() runs first, so the garbage collector never touches
+(and so never copies) the preloaded objects: workers share them
+copy-on-write, and each one only adds its own request state.
+
+Each worker serves the shared socket with a threaded werkzeug server, takes
+an equal share of the CPU for its ResourceGovernor, and starts its own live
+quote thread. A worker is recycled after --max-requests requests (with
+jitter) or --max-age seconds. It stops accepting, lets in-flight requests
+finish (up to --graceful-timeout), exits, and the master forks a
+replacement. SIGHUP reloads the preloaded data and rolls every worker;
+SIGTERM/SIGINT shut down gracefully.
+
+The first worker (and the first one after each reload) also runs the
+background warm-up of the hot list (fintrix_warmup.py). Trained models and
+scores land in the shared model store and score table, so the other
+workers pick them up without repeating the work.
+
+Liveness and readiness: GET /api/health and /api/ready.
+
+Usage:
+    python fintrix_server.py --workers 4 --port 8888
+    kill -HUP <master pid>     # reload models/prices and roll the workers
+"""
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+import fintrix_flask_investment as api
+from fintrix_investment import StockAnalyzer, config, governor
+from fintrix_batch import to_yahoo_symbol
+from fintrix_panel import PricePanel
+
+CRASH_BACKOFF_S = 1  # before replacing a worker that died right after starting
+MIN_WORKER_LIFE_S = 5
+
+def preload(universe, period):
+    """Build the shared analyzer and price panel in the master"""
+    started = time.time()
+    analyzer = StockAnalyzer()
+    api.analyzer = analyzer
+    models = analyzer.model_store.preload()
+    panel = None
+    if universe:
+        collector = analyzer.data_collector
+        tickers = [to_yahoo_symbol(t) for t in collector.nse_tickers[:universe]]
+        frames = collector.get_bulk_stock_data(tickers, period)
+        if frames:
+            panel = PricePanel.create(frames)
+            collector.attach_panel(panel, period)
+    print(f"Preloaded {models} model artifacts and {len(panel.tickers) if panel else 0} price "
+          f"histories in {time.time() - started:.1f}s")
+    gc.collect()
+    gc.freeze()  # keep the collector off the shared pages
+    return panel
+
+def run_worker(sock, args, warm=False):
+    """Worker process body; never returns"""
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the master handles Ctrl-C
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    random.seed()
+
+    governor.resize(max(1, (os.cpu_count() or 1) // args.workers))
+    with api.app.app_context():
+        api.db.engine.dispose(close=False)  # never share pooled SQLite connections across fork
+    api.get_analyzer().data_collector.start_quotes()
+    api.get_analyzer().start_retraining()  # claims in SQLite keep workers from duplicating retrains
+    if warm:
+        api.start_warmup()
+
+    limit = args.max_requests + random.randint(0, args.max_requests // 10) if args.max_requests else None
+    served = [0]
+    lock = threading.Lock()
+
+    def app(environ, start_response):
+        with lock:
+            served[0] += 1
+            if limit and served[0] >= limit:
+                stopping.set()
+        return api.app(environ, start_response)
+
+    server = make_server(args.host, args.port, app, threaded=True, fd=sock.fileno())
+    server.daemon_threads = False  # server_close() waits for in-flight requests
+    server.block_on_close = True
+
+    def recycle():
+        stopping.wait(args.max_age or None)
+        server.shutdown()
+        # Don't wait forever on a stuck request
+        threading.Timer(args.graceful_timeout, os._exit, (0,)).start()
+    threading.Thread(target=recycle, daemon=True).start()
+
+    try:
+        server.serve_forever()
+        server.server_close()
+    finally:
+        api.score_history.close()  # os._exit skips atexit
+        api.score_store.flush_requests()
+        os._exit(0)
+
+class Master:
+    def __init__(self, sock, args):
+        self.sock = sock
+        self.args = args
+        self.workers = {}  # pid -> start time
+        self.stopping = False
+        self.reload_requested = False
+
+    def spawn(self, warm=False):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.sock, self.args, warm)
+            finally:
+                os._exit(1)
+        self.workers[pid] = time.time()
+        return pid
+
+    def reap(self):
+        """Collect exited workers; replace them unless shutting down"""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0:
+                print(f"Worker {pid} exited with {code}")
+            if time.time() - started < MIN_WORKER_LIFE_S:
+                time.sleep(CRASH_BACKOFF_S)
+            self.spawn()
+
+    def reload(self):
+        """Reload the shared data, then replace the workers one at a time"""
+        self.reload_requested = False
+        gc.unfreeze()
+        old_panel = api.analyzer.data_collector.panel if api.analyzer else None
+        preload(self.args.preload_tickers, self.args.period)
+        for i, pid in enumerate(list(self.workers)):
+            self.spawn(warm=i == 0)
+            self.stop_worker(pid)
+        if old_panel is not None:
+            old_panel.close()
+
+    def stop_worker(self, pid):
+        try:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
+        self.workers.pop(pid, None)
+
+    def run(self):
+        def stop(*_):
+            self.stopping = True
+
+        def request_reload(*_):
+            self.reload_requested = True
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGHUP, request_reload)
+
+        for i in range(self.args.workers):
+            self.spawn(warm=i == 0)
+        print(f"Master {os.getpid()} serving on http://{self.args.host}:{self.args.port} "
+              f"with {self.args.workers} workers")
+        while not self.stopping:
+            self.reap()
+            if self.reload_requested:
+                self.reload()
+            time.sleep(0.2)
+        self.shutdown()
+
+    def shutdown(self):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.workers.pop(pid, None)
+        deadline = time.time() + self.args.graceful_timeout
+        while self.workers and time.time() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.sock.close()
+        panel = api.analyzer.data_collector.panel if api.analyzer else None
+        if panel is not None:
+            panel.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Preforking server for the Fintrix API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-requests', type=int, default=1000, help="Recycle a worker after this many (0 = never)")
+    parser.add_argument('--max-age', type=float, default=6 * 3600, help="Recycle a worker after this many seconds (0 = never)")
+    parser.add_argument('--graceful-timeout', type=float, default=30)
+    parser.add_argument('--preload-tickers', type=int, default=config.SERVER_PRELOAD_TICKERS,
+                        help="Preload daily history for the first N NSE symbols (0 = none)")
+    parser.add_argument('--period', default='5y')
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET6 if ':' in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    preload(args.preload_tickers, args.period)
+    Master(sock, args).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Single-flight coalescing of concurrent identical calls.
+
+The first caller for a key runs the function; callers arriving while it is
+still running wait on the same future and get the same result (or the same
+exception). Once the call finishes the key is released, so later callers run
+it again (caching results is a separate concern).
+"""
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._stats = {'calls': 0, 'coalesced': 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per key at a time.
+
+        Returns (result, shared) where shared is True for callers that waited
+        on another caller's execution.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self._stats['calls'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, inflight=len(self._inflight))
@@ -0,0 +1,249 @@
+"""Per-ticker or per-sector hyperparameter search.
+
+Each group (one ticker, or every ticker of a sector) is tuned in its own
+worker process. Trials are drawn at random from SEARCH_SPACE, the config
+defaults always being the first, and scored on expanding walk-forward folds:
+train on bars before the fold, validate on the FOLD_BARS after it. A trial is
+pruned as soon as its mean error over the folds so far is worse than the
+median of the finished trials at the same fold. Closes, sliding windows and
+tabular features are built once per ticker and shared by every trial. LSTM
+trials train with fit_sequence_model, as served models do, so they are
+compared at convergence.
+
+The best parameters are saved per horizon with ModelStore.save_params,
+where StockAnalyzer.model_params picks them up for forecasts at that horizon
+(ticker values override sector values, which override Config.MODEL_PARAMS).
+
+While Config.USE_GLOBAL_LSTM is on, 'LSTM' is served by the global model
+(fintrix_global.py) and per-ticker LSTM parameters only apply where no
+global model is trained, so the LSTM is not tuned unless asked for.
+
+Usage:
+    python fintrix_tuning.py --tickers RELIANCE.NS TCS.NS --models LSTM XGBoost --horizon long
+    python fintrix_tuning.py --universe 200 --by sector --trials 30 --workers 8
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import torch
+import xgboost as xgb
+from numpy.lib.stride_tricks import sliding_window_view
+from prophet import Prophet
+from sklearn.metrics import log_loss
+
+from fintrix_investment import (
+    DataCollector, DataPreprocessor, LSTMModel, TABULAR_FEATURES,
+    config, fit_sequence_model, horizon_checkpoints, sector_owner
+)
+from fintrix_batch import to_yahoo_symbol
+from fintrix_panel import DTYPE
+from fintrix_model_store import ModelStore
+
+SEARCH_SPACE = {
+    'LSTM': {'lookback': [30, 60, 90, 120], 'hidden_size': [32, 50, 64, 128], 'num_layers': [1, 2, 3]},
+    'XGBoost': {'lookback': [20, 40, 60, 90], 'max_depth': [2, 3, 4, 6],
+                'learning_rate': [0.03, 0.05, 0.1, 0.2]},
+    'Prophet': {'changepoint_prior_scale': [0.001, 0.005, 0.01, 0.05, 0.1, 0.5]},
+}
+FOLDS = 4
+FOLD_BARS = 60
+MIN_TRIALS_FOR_PRUNING = 4
+
+class TuningData:
+    """One ticker's arrays, built once and reused by every trial"""
+
+    def __init__(self, df, days):
+        self.df = df.dropna()
+        self.close = self.df['close'].to_numpy(DTYPE)  # windows and targets go to torch without a copy
+        self.steps = np.array(horizon_checkpoints(days))
+        self._windows = {}
+        self._features = {}
+        n = len(self.close)
+        self.folds = [(n - (FOLDS - k) * FOLD_BARS, n - (FOLDS - k - 1) * FOLD_BARS) for k in range(FOLDS)]
+
+    def windows(self, lookback):
+        if lookback not in self._windows:
+            self._windows[lookback] = sliding_window_view(self.close, lookback)
+        return self._windows[lookback]
+
+    def features(self, lookback):
+        """(X, y, bar position of each row) for the tabular model"""
+        if lookback not in self._features:
+            frame = DataPreprocessor().tabular_features(self.df, lookback=lookback)
+            self._features[lookback] = (frame[TABULAR_FEATURES].values, frame['target'].values,
+                                        self.df.index.get_indexer(frame.index))
+        return self._features[lookback]
+
+def _lstm_error(data, params, train_end, val_end):
+    """Mean absolute percentage error of direct multi-horizon forecasts"""
+    lookback, steps = params['lookback'], data.steps
+    lo, hi = data.close[:train_end].min(), data.close[:train_end].max()
+    scale = (hi - lo) or 1.0
+    windows = (data.windows(lookback) - lo) / scale  # row j covers bars j .. j+lookback-1
+
+    # Sample i: window ending at bar i-1, targets at bars i-1+steps
+    train_i = np.arange(lookback, train_end - steps[-1] + 1)
+    val_i = np.arange(train_end, min(val_end, len(data.close) - steps[-1] + 1))
+    if len(train_i) < lookback or len(val_i) == 0:
+        return np.nan
+
+    model = LSTMModel(hidden_size=params['hidden_size'], num_layers=params['num_layers'],
+                      output_size=len(steps))
+    X = windows[train_i - lookback][..., None]
+    y = (data.close[(train_i - 1)[:, None] + steps[None, :]] - lo) / scale
+    # Trained like the serving path, early-stopped on the tail of the training windows
+    split = int(len(X) * (1 - config.TEST_SIZE))
+    fit_sequence_model(model, X[:split], y[:split], X[split:], y[split:])
+    with torch.no_grad():
+        pred = model(torch.from_numpy(windows[val_i - lookback]).unsqueeze(-1)).numpy() * scale + lo
+    actual = data.close[(val_i - 1)[:, None] + steps[None, :]]
+    return float(np.mean(np.abs(pred / actual - 1)))
+
+def _xgboost_error(data, params, train_end, val_end):
+    """Log loss of the next-day direction on the validation fold"""
+    X, y, pos = data.features(params['lookback'])
+    train = pos < train_end - 1  # label uses the next bar
+    val = (pos >= train_end) & (pos < val_end - 1)
+    if train.sum() < params['lookback'] or not val.any() or len(np.unique(y[train])) < 2:
+        return np.nan
+    model = xgb.XGBClassifier(
+        objective='binary:logistic', n_estimators=100, max_depth=params['max_depth'],
+        learning_rate=params['learning_rate'], random_state=config.RANDOM_STATE, n_jobs=1
+    )
+    model.fit(X[train], y[train])
+    return float(log_loss(y[val], model.predict_proba(X[val])[:, 1], labels=[0, 1]))
+
+def _prophet_error(data, params, train_end, val_end):
+    """Mean absolute percentage error of yhat over the validation fold"""
+    dates = data.df.index.tz_localize(None)
+    model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False,
+                    changepoint_prior_scale=params['changepoint_prior_scale'])
+    model.fit(pd.DataFrame({'ds': dates[:train_end], 'y': data.close[:train_end]}))
+    forecast = model.predict(pd.DataFrame({'ds': dates[train_end:val_end]}))
+    return float(np.mean(np.abs(forecast['yhat'].values / data.close[train_end:val_end] - 1)))
+
+EVALUATORS = {'LSTM': _lstm_error, 'XGBoost': _xgboost_error, 'Prophet': _prophet_error}
+
+def candidates(name, trials, seed):
+    """Config defaults first, then up to trials - 1 distinct random grid points"""
+    space = SEARCH_SPACE[name]
+    keys = sorted(space)
+    defaults = config.MODEL_PARAMS[name]
+    grid = [dict(zip(keys, values)) for values in product(*(space[k] for k in keys))]
+    baseline = {k: defaults[k] for k in keys}
+    grid = [params for params in grid if params != baseline]
+    random.Random(seed).shuffle(grid)
+    return [baseline] + grid[:trials - 1]
+
+def tune_model(name, datasets, trials, seed=None):
+    """Search one model's parameters on a group of tickers, with median pruning"""
+    evaluate = EVALUATORS[name]
+    history = []  # running mean error per fold, for finished trials
+    best, pruned = None, 0
+    for params in candidates(name, trials, seed):
+        running, errors = [], []
+        for k in range(FOLDS):
+            fold_errors = [evaluate(data, params, *data.folds[k]) for data in datasets]
+            errors.append(np.nanmean(fold_errors) if not np.all(np.isnan(fold_errors)) else np.nan)
+            running.append(np.nanmean(errors) if not np.all(np.isnan(errors)) else np.nan)
+            finished = [h[k] for h in history if not np.isnan(h[k])]
+            if len(finished) >= MIN_TRIALS_FOR_PRUNING and running[-1] > np.median(finished):
+                break
+        else:
+            history.append(running)
+            error = running[-1]
+            if not np.isnan(error) and (best is None or error < best['error']):
+                best = {'params': params, 'error': float(error)}
+            continue
+        pruned += 1
+    if best is None:
+        return None
+    baseline = history[0][-1] if history else np.nan
+    return dict(best, trials=len(history) + pruned, pruned=pruned,
+                baseline_error=None if np.isnan(baseline) else float(baseline))
+
+def tune_group(owner, frames, models, trials, horizon, seed=None):
+    """Tune every model for one ticker or sector; runs in a worker process"""
+    days = config.SHORT_TERM_DAYS if horizon == 'short' else config.LONG_TERM_DAYS
+    min_bars = FOLDS * FOLD_BARS + 2 * max(max(SEARCH_SPACE['LSTM']['lookback']), days)
+    datasets = [TuningData(df, days) for df in frames.values() if len(df.dropna()) >= min_bars]
+    results = {}
+    if not datasets:
+        return owner, results
+    for name in models:
+        try:
+            result = tune_model(name, datasets, trials, seed)
+        except Exception as e:
+            print(f"{owner}: tuning {name} failed: {e}")
+            continue
+        if result is not None:
+            results[name] = result
+    return owner, results
+
+def _init_worker():
+    torch.set_num_threads(1)  # one process per core already
+
+def run_tuning(frames, groups, models, trials, horizon='short', workers=None, seed=None, store=None):
+    """Tune {owner: [tickers]} groups over {ticker: OHLCV DataFrame}; saves and returns the results"""
+    store = store or ModelStore(config.MODEL_STORE_DIR)
+    start = time.time()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(tune_group, owner, {t: frames[t] for t in tickers if t in frames},
+                        tuple(models), trials, horizon, seed)
+            for owner, tickers in groups.items()
+        ]
+        for future in as_completed(futures):
+            owner, tuned = future.result()
+            results[owner] = tuned
+            if tuned:
+                store.save_params(owner, tuned, horizon, {'tickers': groups[owner]})
+            summary = ', '.join(f"{name} {result['error']:.4f}" for name, result in tuned.items())
+            print(f"{owner}: {summary or 'skipped'} ({len(results)}/{len(groups)}, {time.time() - start:.0f}s)")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Hyperparameter search for the ensemble models")
+    parser.add_argument('--tickers', nargs='+', default=None)
+    parser.add_argument('--universe', type=int, default=None, help="Use the first N NSE symbols")
+    parser.add_argument('--by', choices=('ticker', 'sector'), default='ticker')
+    parser.add_argument('--models', nargs='+', choices=list(SEARCH_SPACE), default=None,
+                        help="Defaults to XGBoost, plus LSTM when Config.USE_GLOBAL_LSTM is off")
+    parser.add_argument('--trials', type=int, default=20)
+    parser.add_argument('--horizon', choices=('short', 'long'), default='short')
+    parser.add_argument('--period', default='5y')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=config.RANDOM_STATE)
+    args = parser.parse_args()
+
+    models = args.models or (['XGBoost'] if config.USE_GLOBAL_LSTM else ['LSTM', 'XGBoost'])
+    if config.USE_GLOBAL_LSTM and 'LSTM' in models:
+        print("Note: the global LSTM serves 'LSTM'; tuned LSTM parameters only apply where it is unavailable")
+
+    collector = DataCollector()
+    tickers = args.tickers or [to_yahoo_symbol(t) for t in collector.nse_tickers]
+    if args.universe:
+        tickers = tickers[:args.universe]
+
+    if args.by == 'sector':
+        groups = {}
+        for ticker in tickers:
+            sector = collector.sector(ticker)
+            if sector is None:
+                print(f"{ticker}: no sector in {config.SECTORS_PATH}, skipped")
+                continue
+            groups.setdefault(sector_owner(sector), []).append(ticker)
+    else:
+        groups = {ticker: [ticker] for ticker in tickers}
+
+    frames = collector.get_bulk_stock_data(tickers, period=args.period)
+    run_tuning(frames, groups, models, args.trials, args.horizon, args.workers, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Background warm-up of hot tickers after startup.
+
+The first live analysis of a ticker pays for its data download and for
+loading or training every ensemble member. A Warmup runs those analyses for
+a hot list on one background thread as soon as the server starts, so the
+server serves (and reports ready) immediately while the models, the result
+cache and the score table fill in. Only one ticker is analyzed at a time,
+so warm-up holds at most one heavy-job slot and live requests keep the rest.
+
+The hot list is Config.WARMUP_TICKERS when set; otherwise the most
+requested tickers of the last WARMUP_LOOKBACK_DAYS days (ScoreStore counts
+analyze requests), topped up with DataCollector.FALLBACK_NSE_TICKERS.
+"""
+import threading
+import time
+
+HORIZONS = ('short', 'long')
+
+def hot_tickers(store, fallback, limit, lookback_days, configured=None):
+    """Tickers to warm, most important first"""
+    if configured:
+        return list(dict.fromkeys(configured))[:limit]
+    ranked = store.most_requested(limit, lookback_days)
+    return list(dict.fromkeys(ranked + list(fallback)))[:limit]
+
+class Warmup:
+    """Runs score(ticker, horizon) for each hot ticker on a background thread.
+
+    ``fresh(ticker, horizon)`` (optional) returns True when the ticker is
+    already answerable without live analysis (a fresh batch score), in
+    which case it is skipped.
+    """
+
+    def __init__(self, score, fresh=None):
+        self._score = score
+        self._fresh = fresh
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'state': 'idle', 'total': 0, 'warmed': 0, 'skipped': 0, 'failed': 0,
+                       'current': None, 'started_at': None, 'finished_at': None}
+
+    def start(self, tickers, horizons=HORIZONS):
+        """Begin warming in the background; no-op if already started.
+
+        ``tickers`` is a list, or a callable returning one; a callable is
+        evaluated on the warm-up thread, so building the hot list doesn't
+        delay startup either.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._stats.update(state='running', started_at=time.time())
+            self._thread = threading.Thread(target=self._run, args=(tickers, horizons),
+                                            name='warmup', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, tickers, horizons):
+        try:
+            tickers = tickers() if callable(tickers) else tickers
+        except Exception as e:
+            print(f"Warm-up could not build its hot list: {e}")
+            tickers = []
+        jobs = [(ticker, horizon) for ticker in tickers for horizon in horizons]
+        with self._lock:
+            self._stats['total'] = len(jobs)
+        for ticker, horizon in jobs:
+            if self._stop.is_set():
+                break
+            with self._lock:
+                self._stats['current'] = f"{ticker}/{horizon}"
+            outcome = 'warmed'
+            try:
+                if self._fresh is not None and self._fresh(ticker, horizon):
+                    outcome = 'skipped'
+                else:
+                    self._score(ticker, horizon)
+            except Exception as e:
+                print(f"Warm-up of {ticker} ({horizon}) failed: {e}")
+                outcome = 'failed'
+            with self._lock:
+                self._stats[outcome] += 1
+        with self._lock:
+            self._stats.update(state='stopped' if self._stop.is_set() else 'done',
+                               current=None, finished_at=time.time())
+
+    def close(self):
+        """Stop after the ticker in progress"""
+        self._stop.set()
+
+    @property
+    def done(self):
+        """False only while warming (a process that never warms has nothing to wait for)"""
+        return self._stats['state'] != 'running'
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        if stats['started_at'] is not None:
+            end = stats['finished_at'] or time.time()
+            stats['elapsed_s'] = round(end - stats['started_at'], 1)
+        del stats['started_at'], stats['finished_at']
+        return stats
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import torch
+
+from fintrix_global import train_global
+from fintrix_investment import GLOBAL_MODEL_OWNER, GlobalLSTMModel, horizon_checkpoints, config
+from fintrix_inference import steps_key
+from fintrix_model_store import ModelStore
+
+def _frames(n_tickers=4, bars=400, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2020-01-01', periods=bars, freq='B', name='Date')
+    return {f"T{i}.NS": pd.DataFrame({'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))}, index=index)
+            for i in range(n_tickers)}
+
+def test_unseen_ticker_gets_trained_deterministic_context(tmp_path):
+    frames = _frames()
+    steps = horizon_checkpoints(config.SHORT_TERM_DAYS)
+    torch.manual_seed(0)
+    initial = GlobalLSTMModel(len(frames), 0, hidden_size=8, output_size=len(steps)).ticker_embedding.weight[0].clone()
+
+    torch.manual_seed(0)  # same initialization inside train_global
+    store = ModelStore(str(tmp_path))
+    meta = train_global(frames, {}, 'short', lookback=20, epochs=3, hidden_size=8, store=store)
+    model = store.load_script(GLOBAL_MODEL_OWNER, steps_key('GlobalLSTM', steps))
+
+    assert 'NEW.NS' not in meta['ticker_ids']
+    assert not torch.allclose(model.ticker_embedding.weight[0], initial)  # the unknown slot was trained
+    window = torch.zeros(1, 20, 1)
+    unknown = torch.zeros(1, dtype=torch.long)
+    with torch.no_grad():
+        first = model(window, unknown, unknown)
+        second = model(window, unknown, unknown)
+    assert torch.equal(first, second)